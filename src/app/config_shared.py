@@ -197,8 +197,11 @@ def get_rabbitmq_exchange() -> str:
 def get_rabbitmq_routing_key() -> str:
     """Retrieve the RabbitMQ routing key.
 
+    The key may contain message fields, e.g. 'ichimoku.{symbol}', which are
+    rendered for each published result.
+
     Returns:
-        str: Routing key for message publishing.
+        str: Routing key (or key template) for message publishing.
 
     Defaults to 'stock_data' if not set.
 
@@ -219,6 +222,74 @@ def get_rabbitmq_queue() -> str:
     return get_config_value_cached("RABBITMQ_QUEUE", "default_queue")
 
 
+@lru_cache
+def get_rabbitmq_heartbeat() -> int:
+    """Retrieve the AMQP heartbeat interval negotiated by the publisher connection.
+
+    Returns:
+        int: Heartbeat interval in seconds; 0 disables heartbeats.
+
+    Defaults to 60 if not set.
+
+    """
+    return int(get_config_value_cached("RABBITMQ_HEARTBEAT", "60"))
+
+
+@lru_cache
+def get_rabbitmq_blocked_connection_timeout() -> float:
+    """Retrieve how long a publish may wait while the broker blocks the connection.
+
+    Returns:
+        float: Timeout in seconds before the blocked connection is dropped.
+
+    Defaults to 30 if not set.
+
+    """
+    return float(get_config_value_cached("RABBITMQ_BLOCKED_CONNECTION_TIMEOUT", "30"))
+
+
+@lru_cache
+def get_rabbitmq_publisher_confirms() -> bool:
+    """Determine whether RabbitMQ publishes wait for publisher confirms.
+
+    With confirms, source messages are only acknowledged once the broker has
+    confirmed every result published for them.
+
+    Returns:
+        bool: True if publisher confirms are enabled.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("RABBITMQ_PUBLISHER_CONFIRMS", False)
+
+
+@lru_cache
+def get_rabbitmq_confirm_window() -> int:
+    """Retrieve the maximum number of publishes awaiting a broker confirm.
+
+    Returns:
+        int: Size of the confirm window.
+
+    Defaults to 256 if not set.
+
+    """
+    return int(get_config_value_cached("RABBITMQ_CONFIRM_WINDOW", "256"))
+
+
+@lru_cache
+def get_rabbitmq_confirm_timeout() -> float:
+    """Retrieve how long, in seconds, a publish may wait for its broker confirm.
+
+    Returns:
+        float: Confirm timeout in seconds.
+
+    Defaults to 30 if not set.
+
+    """
+    return float(get_config_value_cached("RABBITMQ_CONFIRM_TIMEOUT", "30"))
+
+
 @lru_cache
 def get_dlq_name() -> str:
     """Retrieve the name of the Dead Letter Queue (DLQ) for failed messages.
@@ -258,6 +329,126 @@ def get_sqs_region() -> str:
     return get_config_value_cached("SQS_REGION", "us-east-1")
 
 
+@lru_cache
+def get_sqs_visibility_timeout() -> int:
+    """Retrieve the visibility timeout, in seconds, requested for received SQS messages.
+
+    The visibility heartbeat re-applies this timeout while a message is in flight.
+
+    Returns:
+        int: Visibility timeout in seconds.
+
+    Defaults to 60 if not set.
+
+    """
+    return int(get_config_value_cached("SQS_VISIBILITY_TIMEOUT", "60"))
+
+
+@lru_cache
+def get_sqs_heartbeat_interval() -> float:
+    """Retrieve how often, in seconds, in-flight SQS messages have their visibility extended.
+
+    Returns:
+        float: Heartbeat interval in seconds.
+
+    Defaults to 20 if not set.
+
+    """
+    return float(get_config_value_cached("SQS_HEARTBEAT_INTERVAL", "20"))
+
+
+@lru_cache
+def get_aws_endpoint_url() -> str | None:
+    """Retrieve the endpoint URL override for AWS clients, e.g. for LocalStack.
+
+    Returns:
+        Optional[str]: Endpoint URL, or None to use the AWS default endpoints.
+
+    Defaults to None if not set.
+
+    """
+    return get_config_value_cached("AWS_ENDPOINT_URL", "") or None
+
+
+@lru_cache
+def get_aws_max_pool_connections() -> int:
+    """Retrieve the HTTP connection pool size of each cached AWS client.
+
+    Returns:
+        int: Maximum pooled connections per client.
+
+    Defaults to 50 if not set.
+
+    """
+    return int(get_config_value_cached("AWS_MAX_POOL_CONNECTIONS", "50"))
+
+
+@lru_cache
+def get_file_queue_path() -> str:
+    """Retrieve the JSONL/NDJSON file or directory read by the `file` queue type.
+
+    Returns:
+        str: Path to a message file or a directory of message files.
+
+    Defaults to an empty string if not set.
+
+    """
+    return get_config_value_cached("FILE_QUEUE_PATH", "")
+
+
+@lru_cache
+def get_file_queue_mmap() -> bool:
+    """Determine whether the `file` queue type memory-maps its input files.
+
+    Returns:
+        bool: True to read files through mmap.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("FILE_QUEUE_MMAP", False)
+
+
+@lru_cache
+def get_file_queue_replay() -> str:
+    """Retrieve how the `file` queue type paces messages.
+
+    Returns:
+        str: 'max' to replay as fast as possible, or 'recorded' to follow the
+            timestamps recorded in the messages.
+
+    Defaults to 'max' if not set.
+
+    """
+    return get_config_value_cached("FILE_QUEUE_REPLAY", "max").lower()
+
+
+@lru_cache
+def get_file_queue_speed() -> float:
+    """Retrieve the speed multiplier for recorded-rate file replay.
+
+    Returns:
+        float: Replay speed; 2.0 replays twice as fast as recorded.
+
+    Defaults to 1.0 if not set.
+
+    """
+    return float(get_config_value_cached("FILE_QUEUE_SPEED", "1.0"))
+
+
+@lru_cache
+def get_file_queue_timestamp_field() -> str:
+    """Retrieve the message field that holds the recorded time for file replay.
+
+    Returns:
+        str: Payload field name.
+
+    Defaults to 'timestamp' if not set.
+
+    """
+    return get_config_value_cached("FILE_QUEUE_TIMESTAMP_FIELD", "timestamp")
+
+
 @lru_cache
 def get_log_level() -> str:
     """Retrieve the application log level.
@@ -1672,3 +1863,571 @@ def get_rest_output_url() -> str:
 
     """
     return get_config_value_cached("REST_OUTPUT_URL")
+
+
+@lru_cache
+def get_publish_batching_enabled() -> bool:
+    """Determine whether queue output is buffered and published in micro-batches.
+
+    Buffered results are acknowledged to the source before they are published.
+    Unless OUTBOX_ENABLED spools failed results, a micro-batch that still fails
+    after PUBLISH_RETRY_ATTEMPTS is lost, so delivery is at most once.
+
+    Returns:
+        bool: True if the background batching publisher is used.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("PUBLISH_BATCHING_ENABLED", False)
+
+
+@lru_cache
+def get_publish_batch_max_messages() -> int:
+    """Retrieve how many buffered messages trigger a publish flush.
+
+    Returns:
+        int: Maximum messages per flush.
+
+    Defaults to 100 if not set.
+
+    """
+    return int(get_config_value_cached("PUBLISH_BATCH_MAX_MESSAGES", "100"))
+
+
+@lru_cache
+def get_publish_batch_max_bytes() -> int:
+    """Retrieve how many buffered bytes trigger a publish flush.
+
+    Returns:
+        int: Maximum encoded bytes per flush.
+
+    Defaults to 262144 (256 KB) if not set.
+
+    """
+    return int(get_config_value_cached("PUBLISH_BATCH_MAX_BYTES", "262144"))
+
+
+@lru_cache
+def get_publish_linger_ms() -> float:
+    """Retrieve how long, in milliseconds, a buffered message may wait to be published.
+
+    Returns:
+        float: Linger time in milliseconds.
+
+    Defaults to 5 if not set.
+
+    """
+    return float(get_config_value_cached("PUBLISH_LINGER_MS", "5"))
+
+
+@lru_cache
+def get_publish_buffer_capacity() -> int:
+    """Retrieve the maximum number of buffered messages before publishing blocks.
+
+    Returns:
+        int: Buffer capacity in messages.
+
+    Defaults to 10000 if not set.
+
+    """
+    return int(get_config_value_cached("PUBLISH_BUFFER_CAPACITY", "10000"))
+
+
+@lru_cache
+def get_publish_retry_attempts() -> int:
+    """Retrieve how many times a buffered micro-batch is published before it is dropped.
+
+    Not used with OUTBOX_ENABLED, where a failed micro-batch is spooled at once.
+
+    Returns:
+        int: Publish attempts per micro-batch.
+
+    Defaults to 3 if not set.
+
+    """
+    return int(get_config_value_cached("PUBLISH_RETRY_ATTEMPTS", "3"))
+
+
+@lru_cache
+def get_publish_bundle_enabled() -> bool:
+    """Determine whether queue output packs many results into one envelope message.
+
+    Returns:
+        bool: True if results are bundled.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("PUBLISH_BUNDLE_ENABLED", False)
+
+
+@lru_cache
+def get_publish_bundle_max_results() -> int:
+    """Retrieve the maximum number of results per envelope message.
+
+    Returns:
+        int: Maximum results per envelope.
+
+    Defaults to 100 if not set.
+
+    """
+    return int(get_config_value_cached("PUBLISH_BUNDLE_MAX_RESULTS", "100"))
+
+
+@lru_cache
+def get_publish_bundle_max_bytes() -> int:
+    """Retrieve the maximum encoded size of the results in one envelope message.
+
+    Returns:
+        int: Maximum result bytes per envelope.
+
+    Defaults to 196608 (192 KB) if not set, leaving headroom below the SQS message limit.
+
+    """
+    return int(get_config_value_cached("PUBLISH_BUNDLE_MAX_BYTES", "196608"))
+
+
+@lru_cache
+def get_outbox_enabled() -> bool:
+    """Determine whether unpublishable results are spooled to the local outbox.
+
+    Returns:
+        bool: True if the outbox is used.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("OUTBOX_ENABLED", False)
+
+
+@lru_cache
+def get_outbox_path() -> str:
+    """Retrieve the SQLite file backing the outbox.
+
+    Returns:
+        str: Path to the outbox database.
+
+    Defaults to 'outbox/outbox.sqlite3' if not set.
+
+    """
+    return get_config_value_cached("OUTBOX_PATH", "outbox/outbox.sqlite3")
+
+
+@lru_cache
+def get_outbox_max_bytes() -> int:
+    """Retrieve the maximum size of the spooled results.
+
+    Returns:
+        int: Maximum spooled bytes; further results are rejected.
+
+    Defaults to 268435456 (256 MB) if not set.
+
+    """
+    return int(get_config_value_cached("OUTBOX_MAX_BYTES", "268435456"))
+
+
+@lru_cache
+def get_outbox_drain_interval() -> float:
+    """Retrieve how often, in seconds, publishing spooled results is attempted.
+
+    Returns:
+        float: Drain interval in seconds.
+
+    Defaults to 1 if not set.
+
+    """
+    return float(get_config_value_cached("OUTBOX_DRAIN_INTERVAL", "1"))
+
+
+@lru_cache
+def get_outbox_drain_batch() -> int:
+    """Retrieve the maximum number of spooled results published per drain step.
+
+    Returns:
+        int: Results per drain step.
+
+    Defaults to 100 if not set.
+
+    """
+    return int(get_config_value_cached("OUTBOX_DRAIN_BATCH", "100"))
+
+
+@lru_cache
+def get_outbox_max_attempts() -> int:
+    """Retrieve how many failed drains a spooled result survives before it is quarantined.
+
+    Returns:
+        int: Maximum drain attempts per result.
+
+    Defaults to 10 if not set.
+
+    """
+    return int(get_config_value_cached("OUTBOX_MAX_ATTEMPTS", "10"))
+
+
+@lru_cache
+def get_last_value_cache_enabled() -> bool:
+    """Determine whether results identical to the last published ones are suppressed.
+
+    Returns:
+        bool: True if the last-value cache is used.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("LAST_VALUE_CACHE_ENABLED", False)
+
+
+@lru_cache
+def get_last_value_heartbeat_seconds() -> float:
+    """Retrieve how often an unchanged result is published again.
+
+    Returns:
+        float: Heartbeat interval in seconds.
+
+    Defaults to 300 if not set.
+
+    """
+    return float(get_config_value_cached("LAST_VALUE_HEARTBEAT_SECONDS", "300"))
+
+
+@lru_cache
+def get_last_value_cache_size() -> int:
+    """Retrieve the maximum number of symbol and timeframe keys in the last-value cache.
+
+    Returns:
+        int: Maximum number of cached keys.
+
+    Defaults to 100000 if not set.
+
+    """
+    return int(get_config_value_cached("LAST_VALUE_CACHE_SIZE", "100000"))
+
+
+# --- Pipeline Configuration ---
+
+
+@lru_cache
+def get_stage_queue_size() -> int:
+    """Retrieve the capacity of each stage queue between consumers and processors.
+
+    When the queue is full, consumers stop fetching (SQS) or the broker stops
+    delivering because prefetch credit is exhausted (RabbitMQ).
+
+    Returns:
+        int: Maximum number of in-process messages waiting for processing.
+
+    Defaults to 100 if not set.
+
+    """
+    return int(get_config_value_cached("STAGE_QUEUE_SIZE", "100"))
+
+
+@lru_cache
+def get_processing_lanes() -> int:
+    """Retrieve the number of symbol-sharded processing lanes.
+
+    Messages are assigned to a lane by a hash of their symbol, so per-symbol
+    ordering is preserved while different symbols are processed in parallel.
+
+    Returns:
+        int: Number of processing worker lanes.
+
+    Defaults to 1 if not set.
+
+    """
+    return int(get_config_value_cached("PROCESSING_LANES", "1"))
+
+
+@lru_cache
+def get_adaptive_batching_enabled() -> bool:
+    """Retrieve whether batch and prefetch sizes adapt to observed latency.
+
+    Returns:
+        bool: True if ADAPTIVE_BATCHING is enabled, else False.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("ADAPTIVE_BATCHING", False)
+
+
+@lru_cache
+def get_adaptive_batch_min() -> int:
+    """Retrieve the lower bound for adaptive batch sizing.
+
+    Returns:
+        int: Minimum batch size.
+
+    Defaults to 1 if not set.
+
+    """
+    return int(get_config_value_cached("ADAPTIVE_BATCH_MIN", "1"))
+
+
+@lru_cache
+def get_adaptive_batch_max() -> int:
+    """Retrieve the upper bound for adaptive batch sizing.
+
+    Returns:
+        int: Maximum batch size.
+
+    Defaults to 100 if not set.
+
+    """
+    return int(get_config_value_cached("ADAPTIVE_BATCH_MAX", "100"))
+
+
+@lru_cache
+def get_target_batch_latency_ms() -> int:
+    """Retrieve the target time to process and publish one batch.
+
+    Returns:
+        int: Target batch latency in milliseconds.
+
+    Defaults to 1000 if not set.
+
+    """
+    return int(get_config_value_cached("TARGET_BATCH_LATENCY_MS", "1000"))
+
+
+@lru_cache
+def get_dedup_enabled() -> bool:
+    """Retrieve whether already-processed (redelivered) messages are skipped.
+
+    Returns:
+        bool: True if DEDUP_ENABLED is enabled, else False.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("DEDUP_ENABLED", False)
+
+
+@lru_cache
+def get_dedup_cache_size() -> int:
+    """Retrieve the maximum number of message keys kept in the dedup cache.
+
+    Returns:
+        int: Maximum number of cached keys.
+
+    Defaults to 100000 if not set.
+
+    """
+    return int(get_config_value_cached("DEDUP_CACHE_SIZE", "100000"))
+
+
+@lru_cache
+def get_dedup_ttl_seconds() -> int:
+    """Retrieve how long a processed message key is remembered.
+
+    Returns:
+        int: Time-to-live in seconds.
+
+    Defaults to 3600 if not set.
+
+    """
+    return int(get_config_value_cached("DEDUP_TTL_SECONDS", "3600"))
+
+
+@lru_cache
+def get_dedup_cache_path() -> str:
+    """Retrieve the SQLite file used to persist the dedup cache across restarts.
+
+    Returns:
+        str: File path, or empty string to keep the cache in memory only.
+
+    Defaults to empty string if not set.
+
+    """
+    return get_config_value_cached("DEDUP_CACHE_PATH", "")
+
+
+@lru_cache
+def get_coalesce_by_symbol() -> bool:
+    """Retrieve whether batches keep only the newest message per symbol and timeframe.
+
+    Superseded messages are acknowledged without being analyzed or published.
+
+    Returns:
+        bool: True if COALESCE_BY_SYMBOL is enabled, else False.
+
+    Defaults to False if not set.
+
+    """
+    return get_config_bool("COALESCE_BY_SYMBOL", False)
+
+
+@lru_cache
+def get_json_codec() -> str:
+    """Retrieve the JSON backend used to encode and decode messages.
+
+    Returns:
+        str: One of 'auto', 'orjson', 'msgspec' or 'json'.
+
+    Defaults to 'auto' (fastest installed backend) if not set.
+
+    """
+    return get_config_value_cached("JSON_CODEC", "auto")
+
+
+@lru_cache
+def get_message_compression() -> str:
+    """Retrieve the compression applied to published message bodies.
+
+    Returns:
+        str: One of 'none', 'gzip' or 'zstd'.
+
+    Defaults to 'none' if not set.
+
+    """
+    return get_config_value_cached("MESSAGE_COMPRESSION", "none")
+
+
+@lru_cache
+def get_compression_min_bytes() -> int:
+    """Retrieve the body size, in bytes, from which published messages are compressed.
+
+    Returns:
+        int: Minimum body size to compress.
+
+    Defaults to 1024 if not set.
+
+    """
+    return int(get_config_value_cached("COMPRESSION_MIN_BYTES", "1024"))
+
+
+@lru_cache
+def get_max_delivery_attempts() -> int:
+    """Retrieve how many times a failing message is delivered before it is dead-lettered.
+
+    Returns:
+        int: Maximum delivery attempts per message.
+
+    Defaults to 5 if not set.
+
+    """
+    return int(get_config_value_cached("MAX_DELIVERY_ATTEMPTS", "5"))
+
+
+@lru_cache
+def get_dlq_batch_size() -> int:
+    """Retrieve how many dead letters are buffered before they are published together.
+
+    Returns:
+        int: Dead-letter batch size.
+
+    Defaults to 10 if not set.
+
+    """
+    return int(get_config_value_cached("DLQ_BATCH_SIZE", "10"))
+
+
+@lru_cache
+def get_dlq_replay_rate() -> float:
+    """Retrieve the default rate, in messages per second, for replaying dead letters.
+
+    Returns:
+        float: Replay rate; 0 disables throttling.
+
+    Defaults to 10 if not set.
+
+    """
+    return float(get_config_value_cached("DLQ_REPLAY_RATE", "10"))
+
+
+@lru_cache
+def get_drain_timeout() -> float:
+    """Retrieve how long, in seconds, queued messages keep being processed on shutdown.
+
+    Messages still queued after this deadline are handed back to the broker.
+
+    Returns:
+        float: Drain timeout in seconds.
+
+    Defaults to 20 if not set.
+
+    """
+    return float(get_config_value_cached("DRAIN_TIMEOUT", "20"))
+
+
+@lru_cache
+def get_consumer_processes() -> int:
+    """Retrieve how many consumer processes the supervisor forks.
+
+    Returns:
+        int: Number of consumer processes; 1 consumes in the main process.
+
+    Defaults to 1 if not set.
+
+    """
+    return int(get_config_value_cached("CONSUMER_PROCESSES", "1"))
+
+
+# --- Fake Broker Configuration ---
+
+
+@lru_cache
+def get_fake_broker_latency_ms() -> float:
+    """Retrieve the latency, in milliseconds, the fake broker adds to every call.
+
+    Returns:
+        float: Per-call latency in milliseconds.
+
+    Defaults to 0 if not set.
+
+    """
+    return float(get_config_value_cached("FAKE_BROKER_LATENCY_MS", "0"))
+
+
+@lru_cache
+def get_fake_broker_throttle_rate() -> float:
+    """Retrieve the calls per second the fake broker allows before throttling.
+
+    Returns:
+        float: Throttle rate; 0 disables throttling.
+
+    Defaults to 0 if not set.
+
+    """
+    return float(get_config_value_cached("FAKE_BROKER_THROTTLE_RATE", "0"))
+
+
+@lru_cache
+def get_fake_broker_redelivery_rate() -> float:
+    """Retrieve the probability that the fake broker loses an ack and redelivers.
+
+    Returns:
+        float: Probability between 0 and 1.
+
+    Defaults to 0 if not set.
+
+    """
+    return float(get_config_value_cached("FAKE_BROKER_REDELIVERY_RATE", "0"))
+
+
+@lru_cache
+def get_fake_broker_drop_rate() -> float:
+    """Retrieve the probability that a fake broker call drops the connection.
+
+    Returns:
+        float: Probability between 0 and 1.
+
+    Defaults to 0 if not set.
+
+    """
+    return float(get_config_value_cached("FAKE_BROKER_DROP_RATE", "0"))
+
+
+@lru_cache
+def get_fake_broker_seed() -> int:
+    """Retrieve the seed for the fake broker's fault injection.
+
+    Returns:
+        int: Random seed.
+
+    Defaults to 0 if not set.
+
+    """
+    return int(get_config_value_cached("FAKE_BROKER_SEED", "0"))
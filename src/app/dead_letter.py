@@ -0,0 +1,538 @@
+"""Dead-letter queue publishing and replay.
+
+Messages that cannot be decoded or processed are collected by a
+DeadLetterBatcher and published to DLQ_NAME in batches. Each dead letter
+carries the failure reason, the pipeline stage that failed and the delivery
+attempt, as RabbitMQ headers or SQS message attributes. The original message
+is only acknowledged once its copy has been published.
+
+Dead letters can be moved back to the source queue at a controlled rate::
+
+    python -m app.dead_letter --rate 10 --limit 500
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import pika
+
+import app.config_shared as config
+from app.utils import aws_clients, codec, compression
+from app.utils.metrics import (
+    dead_letter_delete_failures_total,
+    dead_letters_replayed_total,
+    dead_letters_total,
+)
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ATTEMPT_HEADER = "x-delivery-attempt"
+FAILURE_REASON_HEADER = "x-failure-reason"
+FAILURE_STAGE_HEADER = "x-failure-stage"
+FAILURE_HEADERS = (ATTEMPT_HEADER, FAILURE_REASON_HEADER, FAILURE_STAGE_HEADER)
+
+SQS_MAX_BATCH_ENTRIES = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
+
+
+class DeadLetter:
+    """A failed message waiting to be published to the dead-letter queue."""
+
+    __slots__ = ("attempt", "body", "reason", "source", "stage")
+
+    def __init__(
+        self, body: bytes | str, reason: str, stage: str, attempt: int, source: Any = None
+    ) -> None:
+        """Initialize a DeadLetter.
+
+        Args:
+            body (bytes | str): Raw message body, published unchanged.
+            reason (str): Why the message failed (e.g. "undecodable", "rejected").
+            stage (str): Pipeline stage that failed (e.g. "decode", "process").
+            attempt (int): Delivery attempt on which the message failed.
+            source (Any): Broker-specific handle used to settle the original message.
+
+        """
+        self.body = body
+        self.reason = reason
+        self.stage = stage
+        self.attempt = attempt
+        self.source = source
+
+
+class DeadLetterBatcher:
+    """Thread-safe buffer that publishes dead letters in batches."""
+
+    def __init__(self, publish: Callable[[list[DeadLetter]], None], max_batch: int) -> None:
+        """Initialize a DeadLetterBatcher.
+
+        Args:
+            publish (Callable[[list[DeadLetter]], None]): Publishes a batch to the DLQ
+                and settles the original messages.
+            max_batch (int): Number of buffered dead letters that triggers a flush.
+
+        Raises:
+            ValueError: If max_batch is non-positive.
+
+        """
+        if max_batch <= 0:
+            raise ValueError("max_batch must be greater than 0")
+
+        self._publish = publish
+        self._max_batch = max_batch
+        self._pending: list[DeadLetter] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of dead letters waiting to be published."""
+        return len(self._pending)
+
+    def add(self, letter: DeadLetter) -> None:
+        """Buffer a dead letter, flushing once the batch is full.
+
+        Args:
+            letter (DeadLetter): Failed message.
+
+        """
+        dead_letters_total.labels(stage=letter.stage, reason=letter.reason).inc()
+        with self._lock:
+            self._pending.append(letter)
+            full = len(self._pending) >= self._max_batch
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Publish every buffered dead letter.
+
+        Publishing errors are logged, not raised; the original messages stay
+        unacknowledged and are redelivered by the broker.
+
+        Returns:
+            int: Number of dead letters handed to the publisher.
+
+        """
+        with self._lock:
+            letters, self._pending = self._pending, []
+        if not letters:
+            return 0
+        try:
+            self._publish(letters)
+        except Exception:
+            logger.error("❌ Failed to publish %d dead letter(s) (details redacted)", len(letters))
+        return len(letters)
+
+
+def publish_rabbitmq(channel: Any, dlq_name: str, letters: list[DeadLetter]) -> None:
+    """Publish dead letters to a RabbitMQ queue and ack the originals.
+
+    Must run on the connection's thread, where an exception would tear down
+    the consumer, so failures are logged instead of raised. If a publish
+    fails, the originals not yet copied are nacked back to the source queue
+    to be redelivered.
+
+    `DeadLetter.source` is the original `(delivery_tag, properties)` pair.
+
+    Args:
+        channel: Channel the original messages were received on.
+        dlq_name (str): Dead-letter queue name.
+        letters (list[DeadLetter]): Dead letters to publish.
+
+    """
+    for i, letter in enumerate(letters):
+        try:
+            _publish_rabbitmq_letter(channel, dlq_name, letter)
+        except Exception:
+            logger.error(
+                "❌ Dead-letter publish failed; requeueing %d message(s) (details redacted)",
+                len(letters) - i,
+            )
+            _requeue_rabbitmq(channel, letters[i:])
+            return
+    logger.warning("☠️ Published %d message(s) to dead-letter queue", len(letters))
+
+
+def _publish_rabbitmq_letter(channel: Any, dlq_name: str, letter: DeadLetter) -> None:
+    """Publish one dead letter to RabbitMQ and ack its original.
+
+    Args:
+        channel: Channel the original message was received on.
+        dlq_name (str): Dead-letter queue name.
+        letter (DeadLetter): Dead letter to publish.
+
+    """
+    delivery_tag, properties = letter.source
+    headers = {
+        **(properties.headers or {}),
+        ATTEMPT_HEADER: letter.attempt,
+        FAILURE_REASON_HEADER: letter.reason,
+        FAILURE_STAGE_HEADER: letter.stage,
+    }
+    channel.basic_publish(
+        exchange="",
+        routing_key=dlq_name,
+        body=letter.body,
+        properties=pika.BasicProperties(
+            headers=headers,
+            delivery_mode=2,
+            message_id=properties.message_id,
+            content_type=properties.content_type,
+            content_encoding=properties.content_encoding,
+        ),
+    )
+    channel.basic_ack(delivery_tag=delivery_tag)
+
+
+def _requeue_rabbitmq(channel: Any, letters: list[DeadLetter]) -> None:
+    """Nack the originals of unpublished dead letters back to their queue.
+
+    If the channel itself is gone, the broker requeues them on its own.
+
+    Args:
+        channel: Channel the original messages were received on.
+        letters (list[DeadLetter]): Dead letters whose originals to requeue.
+
+    """
+    try:
+        for letter in letters:
+            channel.basic_nack(delivery_tag=letter.source[0], requeue=True)
+    except Exception:
+        logger.error("❌ Could not requeue dead letters; the broker will redeliver them")
+
+
+def publish_sqs(sqs: Any, dlq_url: str | None, queue_url: str, letters: list[DeadLetter]) -> None:
+    """Publish dead letters to an SQS queue and delete the originals.
+
+    Only originals whose copy was accepted are deleted; the rest become
+    visible again and are redelivered. Originals SQS fails to delete are
+    logged and counted, since they will be dead-lettered again. `DeadLetter.source` is the original
+    message as returned by `receive_message`.
+
+    Args:
+        sqs: boto3 SQS client.
+        dlq_url (Optional[str]): Dead-letter queue URL, if it could be resolved.
+        queue_url (str): Source queue URL.
+        letters (list[DeadLetter]): Dead letters to publish.
+
+    """
+    if dlq_url is None:
+        logger.error("❌ SQS dead-letter queue is not available; %d message(s) kept", len(letters))
+        return
+
+    for chunk in _sqs_chunks(letters):
+        response = sqs.send_message_batch(
+            QueueUrl=dlq_url,
+            Entries=[
+                {
+                    "Id": str(i),
+                    "MessageBody": letter.body,
+                    "MessageAttributes": _sqs_attributes(letter),
+                }
+                for i, letter in enumerate(chunk)
+            ],
+        )
+        sent = [int(entry["Id"]) for entry in response.get("Successful", [])]
+        if response.get("Failed"):
+            logger.error("❌ %d dead letter(s) rejected by SQS", len(response["Failed"]))
+        if sent:
+            deleted = sqs.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": chunk[i].source["ReceiptHandle"]} for i in sent
+                ],
+            )
+            logger.warning("☠️ Published %d message(s) to dead-letter queue", len(sent))
+            failed = deleted.get("Failed", [])
+            if failed:
+                dead_letter_delete_failures_total.inc(len(failed))
+                logger.error(
+                    "❌ %d dead-lettered original(s) not deleted and will be redelivered: %s",
+                    len(failed),
+                    sorted({str(failure.get("Code")) for failure in failed}),
+                )
+
+
+def publish_file(path: str, letters: list[DeadLetter]) -> None:
+    """Append dead letters to a JSONL file.
+
+    Used by the `file` queue type; `DeadLetter.source` is the message ID.
+
+    Args:
+        path (str): Dead-letter file.
+        letters (list[DeadLetter]): Dead letters to write.
+
+    """
+    with open(path, "ab") as f:
+        for letter in letters:
+            body = (
+                letter.body.decode("utf-8", "replace")
+                if isinstance(letter.body, bytes)
+                else letter.body
+            )
+            record = {
+                "message_id": letter.source,
+                "reason": letter.reason,
+                "stage": letter.stage,
+                "attempt": letter.attempt,
+                "body": body,
+            }
+            f.write(codec.dumps(record) + b"\n")
+    logger.warning("☠️ Wrote %d message(s) to dead-letter file", len(letters))
+
+
+def publish_fake(broker: Any, dlq_name: str, letters: list[DeadLetter]) -> None:
+    """Publish dead letters to a fake-broker queue and ack the originals.
+
+    `DeadLetter.source` is the original delivery's receipt.
+
+    Args:
+        broker: The in-process FakeBroker.
+        dlq_name (str): Dead-letter queue name.
+        letters (list[DeadLetter]): Dead letters to publish.
+
+    """
+    for letter in letters:
+        broker.publish(
+            dlq_name,
+            letter.body,
+            {
+                ATTEMPT_HEADER: letter.attempt,
+                FAILURE_REASON_HEADER: letter.reason,
+                FAILURE_STAGE_HEADER: letter.stage,
+            },
+        )
+        broker.ack(letter.source)
+
+
+def _sqs_attributes(letter: DeadLetter) -> dict[str, dict[str, str]]:
+    """Build the SQS message attributes describing a failure.
+
+    Args:
+        letter (DeadLetter): Dead letter.
+
+    Returns:
+        dict[str, dict[str, str]]: Message attributes.
+
+    """
+    return {
+        **compression.sqs_encoding_attributes(compression.sqs_encoding(letter.source)),
+        "failure_reason": {"DataType": "String", "StringValue": letter.reason},
+        "failure_stage": {"DataType": "String", "StringValue": letter.stage},
+        "delivery_attempt": {"DataType": "Number", "StringValue": str(letter.attempt)},
+    }
+
+
+def _sqs_chunks(letters: list[DeadLetter]) -> Iterator[list[DeadLetter]]:
+    """Split dead letters into chunks that fit in one SQS batch request.
+
+    Args:
+        letters (list[DeadLetter]): Dead letters to split.
+
+    Yields:
+        list[DeadLetter]: Up to 10 dead letters totalling at most 256 KB.
+
+    """
+    chunk: list[DeadLetter] = []
+    size = 0
+    for letter in letters:
+        body_size = len(
+            letter.body.encode("utf-8") if isinstance(letter.body, str) else letter.body
+        )
+        if chunk and (
+            len(chunk) == SQS_MAX_BATCH_ENTRIES or size + body_size > SQS_MAX_BATCH_BYTES
+        ):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(letter)
+        size += body_size
+    if chunk:
+        yield chunk
+
+
+class _Pacer:
+    """Spaces out work to a fixed number of items per second."""
+
+    def __init__(self, rate: float) -> None:
+        """Initialize a pacer for `rate` items per second (0 disables pacing)."""
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = time.monotonic()
+
+    def wait(self, items: int = 1) -> None:
+        """Sleep until `items` more items may be sent."""
+        now = time.monotonic()
+        if self._next_at > now:
+            time.sleep(self._next_at - now)
+            now = self._next_at
+        self._next_at = now + items * self._interval
+
+
+def replay_rabbitmq(rate: float, limit: int = 0) -> int:
+    """Move dead letters back to the RabbitMQ source queue.
+
+    Failure headers are stripped so that replayed messages get a fresh set
+    of delivery attempts. Only the messages present when the replay starts
+    are moved, so messages that fail again are not replayed in a loop.
+
+    Args:
+        rate (float): Messages per second; 0 replays as fast as possible.
+        limit (int): Maximum number of messages to replay; 0 replays all.
+
+    Returns:
+        int: Number of messages replayed.
+
+    """
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters(
+            host=config.get_rabbitmq_host(),
+            port=config.get_rabbitmq_port(),
+            virtual_host=config.get_rabbitmq_vhost(),
+            credentials=pika.PlainCredentials(
+                config.get_rabbitmq_user(), config.get_rabbitmq_password()
+            ),
+        )
+    )
+    channel = connection.channel()
+    dlq_name = config.get_dlq_name()
+    queue_name = config.get_rabbitmq_queue()
+    available = channel.queue_declare(queue=dlq_name, durable=True).method.message_count
+    remaining = min(available, limit) if limit else available
+    pacer = _Pacer(rate)
+    replayed = 0
+
+    try:
+        while replayed < remaining:
+            method, properties, body = channel.basic_get(queue=dlq_name, auto_ack=False)
+            if method is None:
+                break
+            pacer.wait()
+            headers = {
+                k: v for k, v in (properties.headers or {}).items() if k not in FAILURE_HEADERS
+            }
+            channel.basic_publish(
+                exchange="",
+                routing_key=queue_name,
+                body=body,
+                properties=pika.BasicProperties(
+                    headers=headers,
+                    delivery_mode=2,
+                    message_id=properties.message_id,
+                    content_type=properties.content_type,
+                    content_encoding=properties.content_encoding,
+                ),
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            replayed += 1
+            dead_letters_replayed_total.inc()
+    finally:
+        connection.close()
+    return replayed
+
+
+def replay_sqs(rate: float, limit: int = 0, sqs: Any = None) -> int:
+    """Move dead letters back to the SQS source queue.
+
+    Only the messages present when the replay starts are moved, as reported
+    by `ApproximateNumberOfMessages`, so messages that fail again are not
+    replayed in a loop.
+
+    Args:
+        rate (float): Messages per second; 0 replays as fast as possible.
+        limit (int): Maximum number of messages to replay; 0 replays all.
+        sqs: boto3 SQS client; created from configuration if omitted.
+
+    Returns:
+        int: Number of messages replayed.
+
+    """
+    sqs = sqs or aws_clients.get_client("sqs", config.get_sqs_region())
+    dlq_url = sqs.get_queue_url(QueueName=config.get_dlq_name())["QueueUrl"]
+    queue_url = config.get_sqs_queue_url()
+    available = int(
+        sqs.get_queue_attributes(QueueUrl=dlq_url, AttributeNames=["ApproximateNumberOfMessages"])[
+            "Attributes"
+        ]["ApproximateNumberOfMessages"]
+    )
+    remaining = min(available, limit) if limit else available
+    pacer = _Pacer(rate)
+    replayed = 0
+
+    while replayed < remaining:
+        messages = sqs.receive_message(
+            QueueUrl=dlq_url,
+            MaxNumberOfMessages=min(SQS_MAX_BATCH_ENTRIES, remaining - replayed),
+            WaitTimeSeconds=1,
+            MessageAttributeNames=[compression.SQS_ENCODING_ATTRIBUTE],
+        ).get("Messages", [])
+        if not messages:
+            break
+
+        pacer.wait(len(messages))
+        response = sqs.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {
+                    "Id": str(i),
+                    "MessageBody": m["Body"],
+                    "MessageAttributes": compression.sqs_encoding_attributes(
+                        compression.sqs_encoding(m)
+                    ),
+                }
+                for i, m in enumerate(messages)
+            ],
+        )
+        sent = [int(entry["Id"]) for entry in response.get("Successful", [])]
+        if response.get("Failed"):
+            logger.error("❌ %d message(s) could not be replayed", len(response["Failed"]))
+        if sent:
+            sqs.delete_message_batch(
+                QueueUrl=dlq_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": messages[i]["ReceiptHandle"]} for i in sent
+                ],
+            )
+        replayed += len(sent)
+        dead_letters_replayed_total.inc(len(sent))
+        if not sent:
+            break
+    return replayed
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Replay dead letters for the configured QUEUE_TYPE.
+
+    Args:
+        argv (Optional[list[str]]): Command-line arguments; defaults to sys.argv.
+
+    Returns:
+        int: Process exit code.
+
+    """
+    parser = argparse.ArgumentParser(description="Replay messages from the dead-letter queue.")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=config.get_dlq_replay_rate(),
+        help="messages per second (0 = unthrottled)",
+    )
+    parser.add_argument("--limit", type=int, default=0, help="maximum messages to replay (0 = all)")
+    args = parser.parse_args(argv)
+
+    queue_type = config.get_queue_type().lower()
+    if queue_type == "rabbitmq":
+        replayed = replay_rabbitmq(args.rate, args.limit)
+    elif queue_type == "sqs":
+        replayed = replay_sqs(args.rate, args.limit)
+    else:
+        logger.error("❌ Unsupported QUEUE_TYPE for replay: %s", queue_type)
+        return 1
+
+    logger.info("🔁 Replayed %d dead-lettered message(s)", replayed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Envelope bundling of many results into one queue message.
+
+With PUBLISH_BUNDLE_ENABLED, `publish_to_queue` packs up to
+PUBLISH_BUNDLE_MAX_RESULTS results, and at most PUBLISH_BUNDLE_MAX_BYTES of
+them, into a single JSON envelope:
+
+    {"results": [...], "index": [...], "count": 3, "bundle": 1}
+
+Each index entry holds the result's `symbol` and `timeframe` plus the byte
+`offset` and `length` of the result within the envelope body. Consumers can
+filter by symbol, or decode a single result with `read_result()`, without
+parsing the whole envelope. `unbundle()` turns any received message,
+bundled or not, into its list of results. The envelope is assembled from
+the results' existing encodings, so nothing is encoded twice.
+"""
+
+from collections.abc import Iterator
+from typing import Any
+
+from app.utils import codec
+
+BUNDLE_VERSION = 1
+_PREFIX = b'{"results":['
+
+
+def bundle(
+    payload: list[dict[str, Any]], bodies: list[bytes], max_results: int, max_bytes: int
+) -> tuple[list[dict[str, Any]], list[bytes]]:
+    """Pack encoded results into envelopes.
+
+    Args:
+        payload (list[dict[str, Any]]): Results to bundle.
+        bodies (list[bytes]): The results encoded with `codec.dumps`.
+        max_results (int): Maximum results per envelope.
+        max_bytes (int): Maximum encoded result bytes per envelope; a larger
+            result gets an envelope of its own.
+
+    Returns:
+        tuple[list[dict[str, Any]], list[bytes]]: A summary of each envelope
+            (the envelope without its results, for logging) and the envelope bodies.
+
+    """
+    summaries: list[dict[str, Any]] = []
+    envelopes: list[bytes] = []
+    for start, end in _chunks(bodies, max_results, max_bytes):
+        summary, envelope = _envelope(payload[start:end], bodies[start:end])
+        summaries.append(summary)
+        envelopes.append(envelope)
+    return summaries, envelopes
+
+
+def _chunks(bodies: list[bytes], max_results: int, max_bytes: int) -> Iterator[tuple[int, int]]:
+    """Yield the (start, end) ranges of results that share an envelope.
+
+    Args:
+        bodies (list[bytes]): Encoded results.
+        max_results (int): Maximum results per envelope.
+        max_bytes (int): Maximum encoded result bytes per envelope.
+
+    Yields:
+        tuple[int, int]: Slice bounds into `bodies`.
+
+    """
+    start = size = 0
+    for i, body in enumerate(bodies):
+        if i > start and (i - start == max_results or size + len(body) > max_bytes):
+            yield start, i
+            start, size = i, 0
+        size += len(body)
+    if start < len(bodies):
+        yield start, len(bodies)
+
+
+def _envelope(payload: list[dict[str, Any]], bodies: list[bytes]) -> tuple[dict[str, Any], bytes]:
+    """Build one envelope from encoded results.
+
+    Args:
+        payload (list[dict[str, Any]]): Results in the envelope.
+        bodies (list[bytes]): The results encoded with `codec.dumps`.
+
+    Returns:
+        tuple[dict[str, Any], bytes]: The envelope summary and body.
+
+    """
+    index = []
+    offset = len(_PREFIX)
+    for result, body in zip(payload, bodies, strict=True):
+        index.append(
+            {
+                "symbol": result.get("symbol") if isinstance(result, dict) else None,
+                "timeframe": result.get("timeframe") if isinstance(result, dict) else None,
+                "offset": offset,
+                "length": len(body),
+            }
+        )
+        offset += len(body) + 1  # the separating comma
+    summary = {"index": index, "count": len(bodies), "bundle": BUNDLE_VERSION}
+    envelope = _PREFIX + b",".join(bodies) + b"]," + codec.dumps(summary)[1:]
+    return summary, envelope
+
+
+def is_bundle(message: Any) -> bool:
+    """Check whether a decoded message is an envelope.
+
+    Args:
+        message (Any): Decoded message body.
+
+    Returns:
+        bool: True if the message is a bundle envelope.
+
+    """
+    return (
+        isinstance(message, dict)
+        and message.get("bundle") == BUNDLE_VERSION
+        and isinstance(message.get("results"), list)
+    )
+
+
+def unbundle(message: Any) -> list[Any]:
+    """Return the results carried by a decoded message.
+
+    Args:
+        message (Any): Decoded message body, bundled or not.
+
+    Returns:
+        list[Any]: The envelope's results, or the message itself if it is not bundled.
+
+    """
+    return message["results"] if is_bundle(message) else [message]
+
+
+def read_result(body: bytes, entry: dict[str, Any]) -> Any:
+    """Decode a single result of an envelope without decoding the others.
+
+    Args:
+        body (bytes): Raw (decompressed) envelope body.
+        entry (dict[str, Any]): The result's entry from the envelope index.
+
+    Returns:
+        Any: The decoded result.
+
+    """
+    offset = entry["offset"]
+    return codec.loads(body[offset : offset + entry["length"]])
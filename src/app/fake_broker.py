@@ -0,0 +1,306 @@
+"""In-process message broker with fault injection, for tests and benchmarks.
+
+Selected with QUEUE_TYPE=fake. The listener and `publish_to_queue` share one
+FakeBroker per process, so published messages can be consumed again without
+any network. The broker models at-least-once delivery: unacknowledged
+messages are redelivered after a connection drop, acks can be lost, and
+every call can be slowed down or throttled. All randomness comes from a
+seeded generator, so a benchmark run is reproducible.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any
+
+import app.config_shared as config
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class FakeConnectionError(ConnectionError):
+    """Raised when the fake broker simulates a dropped connection."""
+
+
+class FakeThrottlingError(Exception):
+    """Raised when a call exceeds the fake broker's throttle rate."""
+
+
+class FakeMessage:
+    """A message delivered by the fake broker."""
+
+    __slots__ = ("attempt", "body", "headers", "message_id", "receipt")
+
+    def __init__(
+        self, body: bytes, headers: dict[str, Any], message_id: str, receipt: str, attempt: int
+    ) -> None:
+        """Initialize a FakeMessage.
+
+        Args:
+            body (bytes): Raw message body.
+            headers (dict[str, Any]): Message headers.
+            message_id (str): ID assigned on publish; stable across redeliveries.
+            receipt (str): Handle for settling this delivery.
+            attempt (int): 1-based delivery count.
+
+        """
+        self.body = body
+        self.headers = headers
+        self.message_id = message_id
+        self.receipt = receipt
+        self.attempt = attempt
+
+
+class FakeBroker:
+    """Thread-safe in-memory broker with configurable latency and faults."""
+
+    def __init__(
+        self,
+        latency_sec: float = 0.0,
+        throttle_rate: float = 0.0,
+        redelivery_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Initialize a FakeBroker.
+
+        Args:
+            latency_sec (float): Delay added to every broker call.
+            throttle_rate (float): Calls per second before FakeThrottlingError is
+                raised; 0 disables throttling.
+            redelivery_rate (float): Probability that an ack is lost and the
+                message is delivered again.
+            drop_rate (float): Probability that a call fails with
+                FakeConnectionError, returning every unacked message to its queue.
+            seed (int): Seed for the fault-injection random generator.
+
+        Raises:
+            ValueError: If a rate is out of range.
+
+        """
+        if latency_sec < 0 or throttle_rate < 0:
+            raise ValueError("latency_sec and throttle_rate must not be negative")
+        if not 0 <= redelivery_rate <= 1 or not 0 <= drop_rate <= 1:
+            raise ValueError("redelivery_rate and drop_rate must be between 0 and 1")
+
+        self.latency_sec = latency_sec
+        self.throttle_rate = throttle_rate
+        self.redelivery_rate = redelivery_rate
+        self.drop_rate = drop_rate
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "acked": 0,
+            "redelivered": 0,
+            "dropped": 0,
+            "throttled": 0,
+        }
+        self._random = random.Random(seed)
+        self._queues: dict[str, deque[list[Any]]] = {}
+        self._in_flight: dict[str, tuple[str, list[Any]]] = {}
+        self._delayed: list[tuple[float, int, str, list[Any]]] = []
+        self._counter = itertools.count()
+        self._tokens = throttle_rate
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    def depth(self, queue: str) -> int:
+        """Return the number of messages ready for delivery on a queue.
+
+        Args:
+            queue (str): Queue name.
+
+        Returns:
+            int: Ready messages, excluding in-flight and delayed ones.
+
+        """
+        with self._lock:
+            return len(self._queues.get(queue, ()))
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of delivered but unsettled messages."""
+        return len(self._in_flight)
+
+    def publish(self, queue: str, body: bytes, headers: dict[str, Any] | None = None) -> str:
+        """Append a message to a queue.
+
+        Args:
+            queue (str): Queue name; created on first use.
+            body (bytes): Raw message body.
+            headers (Optional[dict[str, Any]]): Message headers.
+
+        Returns:
+            str: The assigned message ID.
+
+        Raises:
+            FakeConnectionError: If a connection drop is injected.
+            FakeThrottlingError: If the throttle rate is exceeded.
+
+        """
+        self._call()
+        message_id = uuid.uuid4().hex
+        with self._available:
+            self._queues.setdefault(queue, deque()).append([message_id, body, headers or {}, 0])
+            self.stats["published"] += 1
+            self._available.notify()
+        return message_id
+
+    def receive(self, queue: str, max_messages: int, timeout: float = 0.0) -> list[FakeMessage]:
+        """Deliver up to `max_messages` messages, waiting for the first one.
+
+        Args:
+            queue (str): Queue name.
+            max_messages (int): Maximum number of messages to deliver.
+            timeout (float): Maximum seconds to wait for a message.
+
+        Returns:
+            list[FakeMessage]: Delivered messages (empty if the timeout expired).
+
+        Raises:
+            FakeConnectionError: If a connection drop is injected.
+            FakeThrottlingError: If the throttle rate is exceeded.
+
+        """
+        self._call()
+        deadline = time.monotonic() + timeout
+        with self._available:
+            ready = self._queues.setdefault(queue, deque())
+            while True:
+                self._promote_delayed()
+                remaining = deadline - time.monotonic()
+                if ready or remaining <= 0:
+                    break
+                self._available.wait(min(remaining, 0.05) if self._delayed else remaining)
+
+            messages = []
+            for _ in range(min(max_messages, len(ready))):
+                record = ready.popleft()
+                record[3] += 1
+                receipt = uuid.uuid4().hex
+                self._in_flight[receipt] = (queue, record)
+                messages.append(FakeMessage(record[1], record[2], record[0], receipt, record[3]))
+            self.stats["delivered"] += len(messages)
+            self.stats["redelivered"] += sum(m.attempt > 1 for m in messages)
+        return messages
+
+    def ack(self, receipt: str) -> None:
+        """Settle a delivery.
+
+        Args:
+            receipt (str): Receipt of the delivery.
+
+        Raises:
+            FakeConnectionError: If a connection drop is injected.
+            FakeThrottlingError: If the throttle rate is exceeded.
+            KeyError: If the receipt is unknown, e.g. after a connection drop.
+
+        """
+        self._call()
+        with self._available:
+            queue, record = self._in_flight.pop(receipt)
+            if self._random.random() < self.redelivery_rate:
+                # The ack is lost: the broker redelivers the message.
+                self._queues[queue].append(record)
+                self._available.notify()
+                return
+            self.stats["acked"] += 1
+
+    def nack(self, receipt: str, delay_sec: float = 0.0) -> None:
+        """Return a delivery to its queue, optionally after a delay.
+
+        Args:
+            receipt (str): Receipt of the delivery.
+            delay_sec (float): Seconds before the message can be delivered again.
+
+        Raises:
+            FakeConnectionError: If a connection drop is injected.
+            FakeThrottlingError: If the throttle rate is exceeded.
+            KeyError: If the receipt is unknown, e.g. after a connection drop.
+
+        """
+        self._call()
+        with self._available:
+            queue, record = self._in_flight.pop(receipt)
+            if delay_sec > 0:
+                due = time.monotonic() + delay_sec
+                heapq.heappush(self._delayed, (due, next(self._counter), queue, record))
+            else:
+                self._queues[queue].append(record)
+            self._available.notify()
+
+    def _call(self) -> None:
+        """Apply latency, throttling and connection drops to one broker call."""
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        with self._available:
+            if self.throttle_rate:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.throttle_rate,
+                    self._tokens + (now - self._last_refill) * self.throttle_rate,
+                )
+                self._last_refill = now
+                if self._tokens < 1:
+                    self.stats["throttled"] += 1
+                    raise FakeThrottlingError("fake broker throttled the call")
+                self._tokens -= 1
+
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                self.stats["dropped"] += 1
+                for queue, record in self._in_flight.values():
+                    self._queues[queue].appendleft(record)
+                self._in_flight.clear()
+                self._available.notify_all()
+                raise FakeConnectionError("fake broker dropped the connection")
+
+    def _promote_delayed(self) -> None:
+        """Move delayed messages that are due back to their queues (lock held)."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, queue, record = heapq.heappop(self._delayed)
+            self._queues[queue].append(record)
+
+
+_broker: FakeBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> FakeBroker:
+    """Return the process-wide FakeBroker, creating it from configuration.
+
+    Returns:
+        FakeBroker: The shared broker.
+
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = FakeBroker(
+                latency_sec=config.get_fake_broker_latency_ms() / 1000,
+                throttle_rate=config.get_fake_broker_throttle_rate(),
+                redelivery_rate=config.get_fake_broker_redelivery_rate(),
+                drop_rate=config.get_fake_broker_drop_rate(),
+                seed=config.get_fake_broker_seed(),
+            )
+            logger.info("🧪 Using in-process fake broker")
+        return _broker
+
+
+def reset_broker(broker: FakeBroker | None = None) -> None:
+    """Replace the process-wide FakeBroker, e.g. between benchmark runs.
+
+    Args:
+        broker (Optional[FakeBroker]): New broker; None recreates it from configuration
+            on next use.
+
+    """
+    global _broker
+    with _broker_lock:
+        _broker = broker
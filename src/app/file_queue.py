@@ -0,0 +1,184 @@
+"""Local file source for the `file` QUEUE_TYPE.
+
+Reads messages from a JSONL/NDJSON file, or from a directory of `.json`
+(one message per file) and `.jsonl`/`.ndjson` files processed in name order,
+optionally through `mmap`. Used to replay a captured trading day through the
+real processing pipeline without a broker, either as fast as possible or
+paced by the timestamps recorded in the messages.
+"""
+
+import heapq
+import itertools
+import mmap
+import os
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LINE_SUFFIXES = (".jsonl", ".ndjson")
+MESSAGE_SUFFIXES = (".json",) + LINE_SUFFIXES
+
+
+def read_messages(path: str, use_mmap: bool = False) -> Iterator[tuple[str, bytes]]:
+    """Yield raw message bodies from a file or a directory of files.
+
+    Args:
+        path (str): JSONL/NDJSON file, or a directory of message files.
+        use_mmap (bool): Map files into memory instead of reading them through
+            buffered I/O.
+
+    Yields:
+        tuple[str, bytes]: A stable message ID ("<file>:<line>") and the raw body.
+
+    Raises:
+        FileNotFoundError: If the path does not exist.
+
+    """
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.endswith(MESSAGE_SUFFIXES))
+        files = [os.path.join(path, name) for name in names]
+    elif os.path.exists(path):
+        files = [path]
+    else:
+        raise FileNotFoundError(path)
+
+    for file_path in files:
+        name = os.path.basename(file_path)
+        if not file_path.endswith(LINE_SUFFIXES):
+            with open(file_path, "rb") as f:
+                yield f"{name}:1", f.read()
+            continue
+        for line_no, line in enumerate(_read_lines(file_path, use_mmap), start=1):
+            line = line.strip()
+            if line:
+                yield f"{name}:{line_no}", line
+
+
+def _read_lines(file_path: str, use_mmap: bool) -> Iterator[bytes]:
+    """Yield the lines of a file.
+
+    Args:
+        file_path (str): File to read.
+        use_mmap (bool): Read through a read-only memory map.
+
+    Yields:
+        bytes: Lines, including their trailing newline.
+
+    """
+    with open(file_path, "rb") as f:
+        # Empty files cannot be memory-mapped.
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+            yield from f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b"")
+
+
+class ReplayClock:
+    """Paces replayed messages by the timestamps recorded in them."""
+
+    def __init__(self, field: str, speed: float = 1.0) -> None:
+        """Initialize a ReplayClock.
+
+        Args:
+            field (str): Payload field holding the recorded time (epoch seconds or
+                milliseconds, or an ISO-8601 string).
+            speed (float): Replay speed multiplier; 2.0 replays twice as fast.
+
+        Raises:
+            ValueError: If speed is non-positive.
+
+        """
+        if speed <= 0:
+            raise ValueError("speed must be greater than 0")
+
+        self._field = field
+        self._speed = speed
+        self._origin: tuple[float, float] | None = None
+
+    def wait(self, payload: Any) -> None:
+        """Sleep until the message is due relative to the first replayed message.
+
+        Messages without a parseable timestamp are released immediately.
+
+        Args:
+            payload (Any): Decoded message body.
+
+        """
+        recorded = _recorded_time(payload.get(self._field) if isinstance(payload, dict) else None)
+        if recorded is None:
+            return
+        if self._origin is None:
+            self._origin = (recorded, time.monotonic())
+            return
+
+        first_recorded, started = self._origin
+        delay = started + (recorded - first_recorded) / self._speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _recorded_time(value: Any) -> float | None:
+    """Convert a recorded timestamp to epoch seconds.
+
+    Args:
+        value (Any): Epoch seconds or milliseconds, or an ISO-8601 string.
+
+    Returns:
+        Optional[float]: Epoch seconds, or None if the value cannot be parsed.
+
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Values this large are epoch milliseconds.
+        return value / 1000 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class RetrySchedule:
+    """Thread-safe schedule of messages waiting out their retry backoff."""
+
+    def __init__(self) -> None:
+        """Initialize an empty RetrySchedule."""
+        self._heap: list[tuple[float, int, Any]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of scheduled retries."""
+        return len(self._heap)
+
+    def schedule(self, delay_sec: float, item: Any) -> None:
+        """Schedule an item to become due after a delay.
+
+        Args:
+            delay_sec (float): Seconds until the item is due.
+            item (Any): Item to return from `pop_due()`.
+
+        """
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + delay_sec, next(self._counter), item))
+
+    def pop_due(self) -> list[Any]:
+        """Remove and return every item that is due, in due order.
+
+        Returns:
+            list[Any]: Due items.
+
+        """
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+        return due
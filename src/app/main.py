@@ -11,6 +11,7 @@ import traceback
 from app import config_shared
 from app.output_handler import output_handler
 from app.queue_handler import consume_messages
+from app.supervisor import Supervisor
 from app.utils.metrics_server import start_metrics_server
 from app.utils.setup_logger import setup_logger
 
@@ -63,21 +64,34 @@ def validate_output_config() -> None:
         logger.debug("📝 Insert SQL: %s", redact(insert_sql))
 
 
+def consume() -> None:
+    """Consume messages from the configured queue using the output handler."""
+    consume_messages(output_handler.send, flush=output_handler.flush)
+
+
 def main() -> None:
     """Start the data processing service.
 
     This function performs startup tasks and begins consuming messages
-    from the configured queue using the output handler.
+    from the configured queue using the output handler. With
+    CONSUMER_PROCESSES > 1, consumption runs in supervised child processes.
     """
     logger.info("🚀 Starting processing service...")
 
-    start_metrics_server()
     validate_output_config()
+    processes = config_shared.get_consumer_processes()
 
     logger.info(
         "✅ Ready. Listening for messages on queue type: %s", config_shared.get_queue_type()
     )
-    consume_messages(output_handler.send)
+    if processes > 1:
+        exit_code = Supervisor(consume, processes).run()
+        if exit_code:
+            sys.exit(exit_code)
+        return
+
+    start_metrics_server()
+    consume()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,415 @@
+"""Durable local outbox for results that could not be published.
+
+With OUTBOX_ENABLED, a publish that still fails after its retries is spooled
+to a SQLite database in WAL mode instead of being lost, so the source
+messages are not reprocessed after a broker blip. A background thread drains
+the outbox in insertion order once the broker is reachable again. While
+anything is spooled, new results are appended behind it, so results are
+never published out of order. Drains from several consumer processes sharing
+the file are serialized by an advisory lock on a sidecar file, and no
+database lock is held while publishing, so spooling is never blocked by a
+slow broker.
+Delivery is at least once: a result may be published again if the process
+dies between publishing and deleting it.
+
+When only part of a publish fails, only the failed results are spooled, and
+results the broker rejected permanently are quarantined straight away. A
+spooled result that still fails after OUTBOX_MAX_ATTEMPTS drains is moved to
+the `quarantine` table too, so one bad result cannot stall the outbox. The
+drain backs off exponentially while publishes keep failing.
+"""
+
+import fcntl
+import itertools
+import os
+import sqlite3
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.utils.metrics import (
+    outbox_drained_messages_total,
+    outbox_dropped_messages_total,
+    outbox_pending_bytes,
+    outbox_pending_messages,
+    outbox_quarantined_messages_total,
+    outbox_spooled_messages_total,
+)
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Destination = tuple[str | None, str | None]
+DrainFn = Callable[[list[bytes], Destination], None]
+
+MAX_DRAIN_BACKOFF_SEC = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT,
+    exchange TEXT,
+    body BLOB NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS quarantine (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT,
+    exchange TEXT,
+    body BLOB NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT
+);
+"""
+
+
+class PartialPublishError(Exception):
+    """Raised when only some messages of a publish were accepted."""
+
+    def __init__(self, message: str, unsent: list[int], rejected: list[int] | None = None) -> None:
+        """Initialize a PartialPublishError.
+
+        Args:
+            message (str): Error description.
+            unsent (list[int]): Indices of the messages worth publishing again.
+            rejected (Optional[list[int]]): Indices of the messages the broker
+                rejected permanently.
+
+        """
+        super().__init__(message)
+        self.unsent = unsent
+        self.rejected = rejected or []
+
+
+class OutboxFullError(Exception):
+    """Raised when results must queue behind spooled ones but the outbox is full."""
+
+
+def failed_indices(error: Exception, count: int) -> tuple[list[int], list[int]]:
+    """Return which messages of a failed publish to retry and which were rejected.
+
+    Args:
+        error (Exception): The publish error.
+        count (int): Number of messages in the publish.
+
+    Returns:
+        tuple[list[int], list[int]]: Indices of the unsent and of the permanently
+            rejected messages; every message is unsent unless the error says otherwise.
+
+    """
+    if isinstance(error, PartialPublishError):
+        return error.unsent, error.rejected
+    return list(range(count)), []
+
+
+@dataclass
+class _DrainStep:
+    """What one drain step published and how to settle its rows."""
+
+    sent: list[tuple[Any, ...]] = field(default_factory=list)
+    retried: list[tuple[Any, ...]] = field(default_factory=list)
+    quarantined: list[tuple[list[tuple[Any, ...]], str]] = field(default_factory=list)
+    stalled: bool = False
+
+
+class Outbox:
+    """SQLite-backed FIFO of encoded messages awaiting publication."""
+
+    def __init__(
+        self,
+        path: str,
+        publish: DrainFn,
+        max_bytes: int,
+        drain_interval_sec: float = 1.0,
+        drain_batch: int = 100,
+        max_attempts: int = 10,
+    ) -> None:
+        """Open (or create) an outbox.
+
+        Args:
+            path (str): SQLite database file.
+            publish (DrainFn): Publishes encoded messages to one destination, raising
+                on failure.
+            max_bytes (int): Maximum spooled bytes; further messages are rejected.
+            drain_interval_sec (float): Seconds between drain attempts while messages
+                are spooled.
+            drain_batch (int): Maximum messages published per drain step.
+            max_attempts (int): Failed drains after which a message is quarantined.
+
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._publish = publish
+        self._max_bytes = max_bytes
+        self._drain_interval_sec = drain_interval_sec
+        self._drain_batch = drain_batch
+        self._max_attempts = max_attempts
+        self._stalled = False
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._drain_lock_file = open(f"{path}.drain.lock", "a+b")  # noqa: SIM115
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "attempts" not in columns:
+            # Outbox created before attempts were counted.
+            self._db.execute("ALTER TABLE outbox ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._pending, self._bytes = self._stats()
+        self._update_gauges()
+        if self._pending:
+            logger.warning("📦 Outbox holds %d message(s) from a previous run", self._pending)
+
+    def __len__(self) -> int:
+        """Return the number of spooled messages known to this process."""
+        return self._pending
+
+    def put(self, bodies: list[bytes], destination: Destination) -> bool:
+        """Spool encoded messages for later publication.
+
+        Args:
+            bodies (list[bytes]): Encoded messages, in publish order.
+            destination (Destination): Queue and exchange overrides.
+
+        Returns:
+            bool: False if the outbox is full and nothing was spooled.
+
+        """
+        size = sum(len(body) for body in bodies)
+        queue, exchange = destination
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                pending, spooled = self._stats()
+                if spooled + size > self._max_bytes:
+                    self._db.execute("ROLLBACK")
+                    outbox_dropped_messages_total.inc(len(bodies))
+                    logger.error("❌ Outbox is full; %d message(s) not spooled", len(bodies))
+                    return False
+                self._db.executemany(
+                    "INSERT INTO outbox (queue, exchange, body) VALUES (?, ?, ?)",
+                    [(queue, exchange, body) for body in bodies],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._pending, self._bytes = pending + len(bodies), spooled + size
+        outbox_spooled_messages_total.inc(len(bodies))
+        self._update_gauges()
+        return True
+
+    def quarantine(self, bodies: list[bytes], destination: Destination, error: str) -> None:
+        """Set aside messages that can never be published, e.g. rejected by the broker.
+
+        Args:
+            bodies (list[bytes]): Encoded messages.
+            destination (Destination): Queue and exchange overrides.
+            error (str): Why the messages were not published.
+
+        """
+        queue, exchange = destination
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO quarantine (queue, exchange, body, attempts, error)"
+                    " VALUES (?, ?, ?, 0, ?)",
+                    [(queue, exchange, body, error) for body in bodies],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        outbox_quarantined_messages_total.inc(len(bodies))
+        logger.error("☠️ Quarantined %d unpublishable message(s): %s", len(bodies), error)
+
+    def drain(self) -> int:
+        """Publish spooled messages in order until the outbox is empty or a publish fails.
+
+        Each step reads a batch in a short transaction, publishes it with no
+        lock on the database, then settles its rows in a second transaction.
+        If another process is already draining the outbox, nothing is done.
+
+        Returns:
+            int: Number of messages published.
+
+        """
+        with self._drain_lock:
+            try:
+                fcntl.flock(self._drain_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            try:
+                return self._drain_locked()
+            finally:
+                fcntl.flock(self._drain_lock_file, fcntl.LOCK_UN)
+
+    def start(self) -> None:
+        """Start the background drain thread."""
+        self._thread = threading.Thread(target=self._run, name="outbox-drain", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the drain thread; spooled messages stay on disk for the next run."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._db.close()
+        self._drain_lock_file.close()
+
+    def _drain_locked(self) -> int:
+        """Drain the outbox step by step (drain lock held)."""
+        drained = 0
+        self._stalled = False
+        while not self._stalled:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, queue, exchange, body, attempts FROM outbox ORDER BY id LIMIT ?",
+                    (self._drain_batch,),
+                ).fetchall()
+                if not rows:
+                    self._pending, self._bytes = 0, 0
+            if not rows:
+                self._update_gauges()
+                break
+
+            step = self._publish_rows(rows)
+            self._settle(step)
+            self._stalled = step.stalled
+
+            drained += len(step.sent)
+            if step.sent:
+                outbox_drained_messages_total.inc(len(step.sent))
+            self._update_gauges()
+        if drained:
+            logger.info("📦 Drained %d message(s) from the outbox", drained)
+        return drained
+
+    def _publish_rows(self, rows: list[tuple[Any, ...]]) -> _DrainStep:
+        """Publish rows in order, one call per run with the same destination (no lock held).
+
+        Rows that fail have their attempts counted and are quarantined once they
+        reach max_attempts, and rejected rows are quarantined at once. The step
+        stalls at the first failed row that is kept, so later rows are not
+        published ahead of it.
+
+        Args:
+            rows (list[tuple[Any, ...]]): (id, queue, exchange, body, attempts) rows.
+
+        Returns:
+            _DrainStep: The rows to delete, retry and quarantine.
+
+        """
+        step = _DrainStep()
+        for destination, run in itertools.groupby(rows, key=lambda row: (row[1], row[2])):
+            if self._publish_run(list(run), destination, step):
+                step.stalled = True
+                break
+        return step
+
+    def _publish_run(
+        self, run: list[tuple[Any, ...]], destination: Destination, step: _DrainStep
+    ) -> bool:
+        """Publish rows with the same destination and record the outcome in step.
+
+        If the whole run fails without saying which rows failed, its rows are
+        published one at a time, so only the failing row has its attempt counted.
+
+        Args:
+            run (list[tuple[Any, ...]]): Rows to publish.
+            destination (Destination): Their queue and exchange overrides.
+            step (_DrainStep): Outcome of the drain step so far.
+
+        Returns:
+            bool: Whether the drain stalled.
+
+        """
+        try:
+            self._publish([row[3] for row in run], destination)
+        except Exception as e:
+            if len(run) > 1 and not isinstance(e, PartialPublishError):
+                return any(self._publish_run([row], destination, step) for row in run)
+
+            unsent, rejected = failed_indices(e, len(run))
+            failed = set(unsent) | set(rejected)
+            exhausted = [run[i] for i in unsent if run[i][4] + 1 >= self._max_attempts]
+            retained = [run[i] for i in unsent if run[i][4] + 1 < self._max_attempts]
+            step.sent.extend(row for i, row in enumerate(run) if i not in failed)
+            step.quarantined.append(([run[i] for i in rejected] + exhausted, str(e)))
+            step.retried.extend(retained)
+            if retained:
+                logger.warning("⚠️ Outbox drain paused, publish still failing: %s", e)
+            return bool(retained)
+        step.sent.extend(run)
+        return False
+
+    def _settle(self, step: _DrainStep) -> None:
+        """Delete, count attempts on and quarantine the rows of a drain step."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete([row[0] for row in step.sent])
+                for rows, error in step.quarantined:
+                    self._quarantine_rows(rows, error)
+                self._db.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1 WHERE id = ?",
+                    [(row[0],) for row in step.retried],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._pending, self._bytes = self._stats()
+
+    def _delete(self, ids: list[int]) -> None:
+        """Delete rows from the outbox (lock held)."""
+        self._db.executemany("DELETE FROM outbox WHERE id = ?", [(id_,) for id_ in ids])
+
+    def _quarantine_rows(self, rows: list[tuple[Any, ...]], error: str) -> None:
+        """Move rows from the outbox to the quarantine table (lock held)."""
+        if not rows:
+            return
+        self._db.executemany(
+            "INSERT INTO quarantine (queue, exchange, body, attempts, error)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(row[1], row[2], row[3], row[4] + 1, error) for row in rows],
+        )
+        self._delete([row[0] for row in rows])
+        outbox_quarantined_messages_total.inc(len(rows))
+        logger.error("☠️ Quarantined %d spooled message(s): %s", len(rows), error)
+
+    def _stats(self) -> tuple[int, int]:
+        """Return the number and total size of spooled messages."""
+        count, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM outbox"
+        ).fetchone()
+        return count, size
+
+    def _update_gauges(self) -> None:
+        """Export the outbox size."""
+        outbox_pending_messages.set(self._pending)
+        outbox_pending_bytes.set(self._bytes)
+
+    def _run(self) -> None:
+        """Drain loop: retry while messages are spooled, backing off while publishes fail."""
+        delay = self._drain_interval_sec
+        while not self._stopping.wait(delay):
+            if not self._pending:
+                continue
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("❌ Outbox drain failed")
+                self._stalled = True
+            if self._stalled:
+                delay = min(max(delay, 0.001) * 2, MAX_DRAIN_BACKOFF_SEC)
+            else:
+                delay = self._drain_interval_sec
@@ -4,24 +4,27 @@ Supports logging, stdout, queue publishing, REST, S3, and database sinks.
 Includes retry logic, validation, and optional metrics integration.
 """
 
-import json
 import time
 import uuid
 from collections.abc import Callable
 from typing import Any
 
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
 from app import config_shared
-from app.queue_sender import publish_to_queue
+from app.outbox import PartialPublishError, failed_indices
+from app.queue_handler import MessageOutcome
+from app.queue_sender import flush_publish_buffer, get_publisher, publish_to_queue
+from app.rabbitmq_publisher import PublishNotConfirmedError
+from app.utils import aws_clients, codec
 from app.utils.metrics import (
     record_output_metrics,
     record_paper_trade_metrics,
     record_sink_metrics,
 )
-from app.utils.redactor import redact_dict
+from app.utils.redactor import has_sensitive_keys, redact_dict
 from app.utils.setup_logger import setup_logger
-from app.utils.types import OutputMode, validate_list_of_dicts
+from app.utils.types import OutputMode
 
 logger = setup_logger(__name__)
 
@@ -33,16 +36,27 @@ class OutputDispatcher:
         """Initialize dispatcher with configured output modes."""
         self.output_modes = config_shared.get_output_modes()
 
-    def send(self, data: list[dict[str, Any]]) -> None:
+    def send(self, data: list[dict[str, Any]]) -> list[MessageOutcome] | None:
         """Dispatch processed analysis output to one or more configured destinations.
 
+        The batch is encoded at most once and the bytes are shared by every sink.
+
         Args:
             data (list[dict[str, Any]]): List of data payloads to send.
 
+        Returns:
+            Optional[list[MessageOutcome]]: One outcome per message if anything
+                failed: RETRY for messages that could not be published, DEAD_LETTER
+                for malformed messages or ones the broker rejected permanently, and
+                SUCCESS for the rest. None if every message was sent.
+
         """
-        try:
-            validate_list_of_dicts(data, required_keys=["text"])
+        malformed = [i for i, item in enumerate(data) if not isinstance(item, dict)]
+        if malformed:
+            return self._dead_letter_malformed(data, malformed)
 
+        batch = codec.EncodedBatch(data)
+        try:
             if config_shared.get_paper_trading_enabled():
                 paper_mode = config_shared.get_paper_trade_mode()
                 logger.debug("📄 Paper trading enabled — dispatching to %s mode", paper_mode)
@@ -50,12 +64,12 @@ class OutputDispatcher:
                     dispatch_method = self._get_dispatch_method(OutputMode[paper_mode])
                 except KeyError:
                     logger.warning("⚠️ Invalid paper trading output mode: %s", paper_mode)
-                    return
+                    return None
                 if dispatch_method:
-                    dispatch_method(data)
+                    dispatch_method(batch)
                 else:
                     logger.warning("⚠️ Invalid paper trading output mode: %s", paper_mode)
-                return
+                return None
 
             for mode in self.output_modes:
                 try:
@@ -64,12 +78,66 @@ class OutputDispatcher:
                     logger.warning("⚠️ Invalid output mode: %s", mode)
                     continue
                 if dispatch_method:
-                    dispatch_method(data)
+                    dispatch_method(batch)
                 else:
                     logger.warning("⚠️ Unhandled output mode: %s", mode)
 
+        except PartialPublishError as e:
+            unsent, rejected = failed_indices(e, len(data))
+            logger.error(
+                "❌ Output partly published, retrying %d and dead-lettering %d message(s): %s",
+                len(unsent),
+                len(rejected),
+                e,
+            )
+            outcomes = [MessageOutcome.SUCCESS] * len(data)
+            for i in unsent:
+                outcomes[i] = MessageOutcome.RETRY
+            for i in rejected:
+                outcomes[i] = MessageOutcome.DEAD_LETTER
+            return outcomes
         except Exception as e:
-            logger.error("❌ Failed to send output: %s", e)
+            malformed = [i for i, item in enumerate(data) if not _encodable(item)]
+            if malformed:
+                return self._dead_letter_malformed(data, malformed)
+            logger.error("❌ Failed to send output, retrying batch: %s", e)
+            return [MessageOutcome.RETRY] * len(data)
+        return None
+
+    def _dead_letter_malformed(
+        self, data: list[dict[str, Any]], malformed: list[int]
+    ) -> list[MessageOutcome]:
+        """Dead-letter malformed messages and send the rest.
+
+        Args:
+            data (list[dict[str, Any]]): The batch being sent.
+            malformed (list[int]): Indices of the messages that can never be sent.
+
+        Returns:
+            list[MessageOutcome]: One outcome per message of the batch.
+
+        """
+        logger.error("❌ Dead-lettering %d malformed message(s)", len(malformed))
+        outcomes = [MessageOutcome.DEAD_LETTER] * len(data)
+        skipped = set(malformed)
+        valid = [i for i in range(len(data)) if i not in skipped]
+        if valid:
+            sent = self.send([data[i] for i in valid])
+            for i, outcome in zip(
+                valid, sent or [MessageOutcome.SUCCESS] * len(valid), strict=True
+            ):
+                outcomes[i] = outcome
+        return outcomes
+
+    def flush(self) -> None:
+        """Flush output buffered by the sinks before shutdown.
+
+        Publishes whatever the batching queue publisher still holds, waiting at
+        most the drain timeout.
+        """
+        logger.debug("🧹 Flushing output sinks")
+        if not flush_publish_buffer(config_shared.get_drain_timeout()):
+            logger.warning("⚠️ Buffered queue output was not fully published before shutdown")
 
     def send_trade_simulation(self, data: dict[str, Any]) -> None:
         """Send simulated trade data to the appropriate paper trade destination.
@@ -87,9 +155,7 @@ class OutputDispatcher:
             logger.error("❌ Failed to send paper trade: %s", e)
             record_paper_trade_metrics("queue", success=False, duration_sec=0)
 
-    def _get_dispatch_method(
-        self, mode: OutputMode
-    ) -> Callable[[list[dict[str, Any]]], None] | None:
+    def _get_dispatch_method(self, mode: OutputMode) -> Callable[[codec.EncodedBatch], None] | None:
         """Resolve the output dispatch method based on the mode.
 
         Args:
@@ -108,45 +174,57 @@ class OutputDispatcher:
             OutputMode.DATABASE: self._output_to_database,
         }.get(mode)
 
-    def _output_to_log(self, data: list[dict[str, Any]]) -> None:
-        """Log each item in the data list.
+    def _output_to_log(self, batch: codec.EncodedBatch) -> None:
+        """Log each item in the batch, redacting sensitive fields.
+
+        Items without sensitive fields reuse the batch's shared encoding.
 
         Args:
-            data (list[dict[str, Any]]): Data to log.
+            batch (codec.EncodedBatch): Data to log.
 
         """
-        for item in data:
-            logger.info("📝 Processed message:\n%s", json.dumps(redact_dict(item), indent=4))
+        for item, text in zip(batch.messages, batch.pretty(), strict=True):
+            if has_sensitive_keys(item):
+                text = codec.dumps_str(redact_dict(item), indent=True)
+            logger.info("📝 Processed message:\n%s", text)
 
-    def _output_to_stdout(self, data: list[dict[str, Any]]) -> None:
-        """Print each item in the data list to standard output.
+    def _output_to_stdout(self, batch: codec.EncodedBatch) -> None:
+        """Print each item in the batch to standard output.
 
         Args:
-            data (list[dict[str, Any]]): Data to print.
+            batch (codec.EncodedBatch): Data to print.
 
         """
-        for item in data:
-            print(json.dumps(item, indent=4))
-
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
-    def _output_to_queue(self, data: list[dict[str, Any]]) -> None:
-        """Publish the data to the configured queue.
-
-        Retries on failure using exponential backoff.
+        for text in batch.pretty():
+            print(text)
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_not_exception_type((PartialPublishError, PublishNotConfirmedError)),
+        reraise=True,
+    )
+    def _output_to_queue(self, batch: codec.EncodedBatch) -> None:
+        """Publish the batch to the configured queue.
+
+        Retries on failure using exponential backoff. A publish that was partly
+        published or not confirmed is not retried as a whole, because that would
+        publish the messages the broker already accepted again; the source
+        messages of the unsent results are redelivered instead.
 
         Args:
-            data (list[dict[str, Any]]): Data to publish.
+            batch (codec.EncodedBatch): Data to publish.
 
         """
-        publish_to_queue(data)
-        logger.info("✅ Output published to queue: %d message(s)", len(data))
+        publish_to_queue(batch.messages, encoded=batch.bodies())
+        logger.info("✅ Output published to queue: %d message(s)", len(batch))
         record_output_metrics("queue", success=True, duration_sec=0)
 
-    def _output_to_rest(self, data: list[dict[str, Any]]) -> None:
-        """Send the data to the configured REST endpoint.
+    def _output_to_rest(self, batch: codec.EncodedBatch) -> None:
+        """Send the batch to the configured REST endpoint.
 
         Args:
-            data (list[dict[str, Any]]): Data to post to REST API.
+            batch (codec.EncodedBatch): Data to post to REST API.
 
         """
         import requests
@@ -155,7 +233,7 @@ class OutputDispatcher:
         headers = {"Content-Type": "application/json"}
         start = time.perf_counter()
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            response = requests.post(url, data=batch.array(), headers=headers, timeout=10)
             duration = time.perf_counter() - start
             record_sink_metrics("rest", str(response.status_code), duration, failed=not response.ok)
 
@@ -167,21 +245,19 @@ class OutputDispatcher:
             logger.error("❌ REST output error: %s", e)
             record_sink_metrics("rest", "exception", 0, failed=True)
 
-    def _output_to_s3(self, data: list[dict[str, Any]]) -> None:
-        """Upload the data as a JSON file to an S3 bucket.
+    def _output_to_s3(self, batch: codec.EncodedBatch) -> None:
+        """Upload the batch as a JSON file to an S3 bucket.
 
         Args:
-            data (list[dict[str, Any]]): Data to upload.
+            batch (codec.EncodedBatch): Data to upload.
 
         """
-        import boto3
-
-        s3 = boto3.client("s3")
+        s3 = aws_clients.get_client("s3", config_shared.get_s3_output_region())
         bucket = config_shared.get_s3_output_bucket()
         key = f"outputs/{uuid.uuid4()}.json"
         start = time.perf_counter()
         try:
-            s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(data).encode("utf-8"))
+            s3.put_object(Bucket=bucket, Key=key, Body=batch.array())
             duration = time.perf_counter() - start
             record_sink_metrics("s3", "200", duration, failed=False)
             logger.info("🚚 Uploaded output to S3: %s/%s", bucket, key)
@@ -189,13 +265,14 @@ class OutputDispatcher:
             logger.error("❌ S3 upload failed: %s", e)
             record_sink_metrics("s3", "exception", 0, failed=True)
 
-    def _output_to_database(self, data: list[dict[str, Any]]) -> None:
-        """Write the data to the configured database using raw SQL inserts.
+    def _output_to_database(self, batch: codec.EncodedBatch) -> None:
+        """Write the batch to the configured database using raw SQL inserts.
 
         Args:
-            data (list[dict[str, Any]]): Data records to insert.
+            batch (codec.EncodedBatch): Data records to insert.
 
         """
+        data = batch.messages
         import sqlalchemy
 
         engine = sqlalchemy.create_engine(config_shared.get_database_output_url())
@@ -222,10 +299,11 @@ class OutputDispatcher:
             data (dict[str, Any]): Simulated trade to queue.
 
         """
-        queue_name = config_shared.get_paper_trading_queue_name()
-        exchange = config_shared.get_paper_trading_exchange()
-        publish_to_queue([data], queue=queue_name, exchange=exchange)
-        logger.info("🪙 Paper trade sent to queue:\n%s", json.dumps(redact_dict(data), indent=4))
+        publisher = get_publisher()
+        publisher.publish([data], publisher.paper)
+        logger.info(
+            "🪙 Paper trade sent to queue:\n%s", codec.dumps_str(redact_dict(data), indent=True)
+        )
         record_paper_trade_metrics("queue", success=True, duration_sec=0)
 
     def _output_paper_trade_to_database(self, data: dict[str, Any]) -> None:
@@ -239,6 +317,25 @@ class OutputDispatcher:
         logger.info("📊 Skipped paper trade (DB output not implemented).")
 
 
+def _encodable(item: Any) -> bool:
+    """Return whether a message is a JSON-encodable dict.
+
+    Args:
+        item (Any): Message to check.
+
+    Returns:
+        bool: False for a malformed message that can never be sent.
+
+    """
+    if not isinstance(item, dict):
+        return False
+    try:
+        codec.dumps(item)
+    except Exception:
+        return False
+    return True
+
+
 output_handler = OutputDispatcher()
 
 
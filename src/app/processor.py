@@ -5,97 +5,109 @@ Provides `analyze()` as the main entry point for queue-based workflows.
 
 from typing import Any
 
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
+from app.schema import IchimokuRequest, SchemaError, decode_request
 from app.utils.setup_logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-def analyze(data: dict[str, Any]) -> dict[str, Any]:
+def analyze(data: dict[str, Any] | IchimokuRequest) -> dict[str, Any]:
     """Analyzes stock data and returns Ichimoku Cloud indicators.
 
     Args:
-    ----
-        data (dict): Dictionary with 'symbol', 'timestamp', and 'data' (historical OHLC list).
-
-    :param data: dict[str:
-    :param Any: param data: dict[str:
-    :param Any: param data: dict[str:
-    :param Any: param data:
-    :param Any: param data:
-    :param data: dict[str:
-    :param data: dict[str:
-    :param Any: param data: dict[str:
-    :param Any:
-    :param data: dict[str:
-    :param Any]:
+        data (dict[str, Any] | IchimokuRequest): Request message with 'symbol',
+            'timestamp' and 'data' (historical OHLC bars or columns), or an
+            already decoded request.
+
+    Returns:
+        dict[str, Any]: Result with the per-bar 'analysis', or an 'error' entry.
 
     """
     try:
-        symbol = data.get("symbol", "N/A")
-        timestamp = data.get("timestamp", "N/A")
-        df = pd.DataFrame(data.get("data", []))
+        request = data if isinstance(data, IchimokuRequest) else decode_request(data)
+    except SchemaError as e:
+        symbol = data.get("symbol", "N/A") if isinstance(data, dict) else "N/A"
+        logger.warning("Invalid or missing OHLC columns for: %s (%s)", symbol, e)
+        return {
+            "symbol": symbol,
+            "timestamp": data.get("timestamp", "N/A") if isinstance(data, dict) else "N/A",
+            "error": "Missing or invalid OHLC columns",
+        }
 
-        if df.empty or not {"High", "Low", "Close"}.issubset(df.columns):
-            logger.warning("Invalid or missing OHLC columns for: %s", symbol)
+    try:
+        if not len(request):
+            logger.warning("Invalid or missing OHLC columns for: %s", request.symbol)
             return {
-                "symbol": symbol,
-                "timestamp": timestamp,
+                "symbol": request.symbol,
+                "timestamp": request.timestamp,
                 "error": "Missing or invalid OHLC columns",
             }
 
-        df = compute_ichimoku_cloud(df)
+        indicators = compute_ichimoku_arrays(request.high, request.low, request.close)
         return {
-            "symbol": symbol,
-            "timestamp": timestamp,
+            "symbol": request.symbol,
+            "timestamp": request.timestamp,
             "source": "IchimokuCloud",
-            "analysis": df.to_dict(orient="records"),
+            "analysis": _to_records(request, indicators),
         }
 
     except Exception as e:
         logger.error("Ichimoku analysis failed: %s", e)
         return {
-            "symbol": data.get("symbol", "N/A"),
-            "timestamp": data.get("timestamp", "N/A"),
+            "symbol": request.symbol,
+            "timestamp": request.timestamp,
             "error": str(e),
         }
 
 
-def compute_ichimoku_cloud(df: pd.DataFrame) -> pd.DataFrame:
-    """Computes Ichimoku Cloud indicators and adds them to the DataFrame.
+def compute_ichimoku_arrays(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray
+) -> dict[str, np.ndarray]:
+    """Computes Ichimoku Cloud indicators directly on price arrays.
+
+    Windows that are incomplete or contain NaN yield NaN, matching pandas
+    `rolling(window).max()/min()` semantics.
 
     Args:
-    ----
-        df (pd.DataFrame): DataFrame with 'High', 'Low', 'Close' columns.
+        high (np.ndarray): High prices.
+        low (np.ndarray): Low prices.
+        close (np.ndarray): Close prices.
 
-    :param df: pd.DataFrame:
-    :param df: pd.DataFrame:
-    :param df: pd.DataFrame:
-    :param df: type df: pd.DataFrame :
-    :param df: type df: pd.DataFrame :
-    :param df: pd.DataFrame:
-    :param df: pd.DataFrame:
-    :param df: pd.DataFrame:
-    :param df: pd.DataFrame:
+    Returns:
+        dict[str, np.ndarray]: Indicator name to float64 array of the same length.
 
     """
-    try:
-        df["tenkan_sen"] = (
-            df["High"].rolling(window=9).max() + df["Low"].rolling(window=9).min()
-        ) / 2
+    tenkan_sen = _rolling_midpoint(high, low, 9)
+    kijun_sen = _rolling_midpoint(high, low, 26)
+    return {
+        "tenkan_sen": tenkan_sen,
+        "kijun_sen": kijun_sen,
+        "senkou_span_a": _shift((tenkan_sen + kijun_sen) / 2, 26),
+        "senkou_span_b": _shift(_rolling_midpoint(high, low, 52), 26),
+        "chikou_span": _shift(np.asarray(close, dtype=np.float64), -26),
+    }
 
-        df["kijun_sen"] = (
-            df["High"].rolling(window=26).max() + df["Low"].rolling(window=26).min()
-        ) / 2
 
-        df["senkou_span_a"] = ((df["tenkan_sen"] + df["kijun_sen"]) / 2).shift(26)
+def compute_ichimoku_cloud(df: pd.DataFrame) -> pd.DataFrame:
+    """Computes Ichimoku Cloud indicators and adds them to the DataFrame.
 
-        df["senkou_span_b"] = (
-            (df["High"].rolling(window=52).max() + df["Low"].rolling(window=52).min()) / 2
-        ).shift(26)
+    Args:
+    ----
+        df (pd.DataFrame): DataFrame with 'High', 'Low', 'Close' columns.
 
-        df["chikou_span"] = df["Close"].shift(-26)
+    """
+    try:
+        indicators = compute_ichimoku_arrays(
+            df["High"].to_numpy(dtype=np.float64),
+            df["Low"].to_numpy(dtype=np.float64),
+            df["Close"].to_numpy(dtype=np.float64),
+        )
+        for name, values in indicators.items():
+            df[name] = values
 
         logger.info("Ichimoku Cloud indicators calculated successfully.")
         return df
@@ -103,3 +115,51 @@ def compute_ichimoku_cloud(df: pd.DataFrame) -> pd.DataFrame:
     except Exception as e:
         logger.error("Error computing Ichimoku Cloud: %s", e)
         return df
+
+
+def _rolling_midpoint(high: np.ndarray, low: np.ndarray, window: int) -> np.ndarray:
+    """Return (rolling max of high + rolling min of low) / 2 over `window` bars."""
+    out = np.full(len(high), np.nan)
+    if len(high) >= window:
+        highest = sliding_window_view(high, window).max(axis=1)
+        lowest = sliding_window_view(low, window).min(axis=1)
+        out[window - 1 :] = (highest + lowest) / 2
+    return out
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """Shift values like `pd.Series.shift`, filling vacated slots with NaN."""
+    out = np.full(len(values), np.nan)
+    if periods >= 0:
+        if periods < len(values):
+            out[periods:] = values[: len(values) - periods]
+    elif -periods < len(values):
+        out[:periods] = values[-periods:]
+    return out
+
+
+def _to_records(
+    request: IchimokuRequest, indicators: dict[str, np.ndarray]
+) -> list[dict[str, Any]]:
+    """Combine the request bars with indicator values into per-bar records.
+
+    Args:
+        request (IchimokuRequest): Decoded request.
+        indicators (dict[str, np.ndarray]): Output of `compute_ichimoku_arrays`.
+
+    Returns:
+        list[dict[str, Any]]: One record per bar with the original fields plus indicators.
+
+    """
+    columns = {name: values.tolist() for name, values in indicators.items()}
+    if request.bars is not None:
+        base = request.bars
+    else:
+        base = [
+            {"High": h, "Low": lo, "Close": c}
+            for h, lo, c in zip(request.high.tolist(), request.low.tolist(), request.close.tolist())
+        ]
+    names = list(columns)
+    return [
+        {**bar, **dict(zip(names, values))} for bar, values in zip(base, zip(*columns.values()))
+    ]
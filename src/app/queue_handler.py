@@ -1,28 +1,65 @@
 """Generic queue handler for RabbitMQ or SQS with batching and retries.
 
-This module supports consuming messages from either RabbitMQ or Amazon SQS.
-It provides batching, retry logic, graceful shutdown handling, and clean logging
-with optional redaction of sensitive values.
+This module supports consuming messages from either RabbitMQ or Amazon SQS,
+from local files for offline replay, or from an in-process fake broker.
+Consumed messages are handed to a bounded processing stage so that a fast
+consumer cannot pull more than the processor can handle. The batch callback
+may report a per-message outcome, so successes are acknowledged, transient
+failures are retried with backoff, and poison messages are moved to the
+dead-letter queue without holding back the rest of the batch. It provides
+batching, retry logic, graceful shutdown handling, and clean logging with
+optional redaction of sensitive values.
+
+On SIGINT/SIGTERM the listener stops fetching and drains: queued messages are
+processed for up to DRAIN_TIMEOUT seconds, whatever is left is handed back to
+the broker for immediate redelivery, and sink buffers are flushed before the
+connection closes.
 """
 
-import json
+import functools
+import hashlib
+import os
 import signal
 import threading
 import time
+import zlib
 from collections.abc import Callable
+from enum import Enum
+from types import FrameType
+from typing import Any
 
-import boto3
 import pika
 from botocore.exceptions import BotoCoreError, NoCredentialsError
 from pika.adapters.blocking_connection import BlockingChannel
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 import app.config_shared as config
+from app import dead_letter as dlq
+from app import fake_broker, file_queue
+from app.dead_letter import ATTEMPT_HEADER, DeadLetter, DeadLetterBatcher
+from app.utils import aws_clients, codec, compression
+from app.utils.adaptive_batch import AdaptiveBatchController
+from app.utils.dedup_cache import DedupCache
+from app.utils.metrics import (
+    coalesced_messages_total,
+    drain_messages_total,
+    message_outcomes_total,
+)
+from app.utils.safe_logger import safe_error
 from app.utils.setup_logger import setup_logger
+from app.utils.stage_queue import StageQueue
+from app.visibility_heartbeat import VisibilityHeartbeat
 
 logger = setup_logger(__name__)
 shutdown_event = threading.Event()
 
+SQS_MAX_RECEIVE_MESSAGES = 10
+SQS_MAX_VISIBILITY_TIMEOUT = 43200
+MAX_RETRY_BACKOFF_SEC = 900
+
+# Symbol and timeframe types messages can be coalesced by.
+_SCALARS = (str, int, float)
+
 REDACT_SENSITIVE_LOGS = (
     config.get_config_value_cached("REDACT_SENSITIVE_LOGS", "true").lower() == "true"
 )
@@ -41,14 +78,493 @@ def safe_log(msg: str) -> str:
     return f"{msg}: [REDACTED]" if REDACT_SENSITIVE_LOGS else msg
 
 
-def consume_messages(callback: Callable[[list[dict]], None]) -> None:
+class MessageOutcome(str, Enum):
+    """Per-message result a batch callback may report back to the listener."""
+
+    SUCCESS = "success"
+    RETRY = "retry"
+    DEAD_LETTER = "dead_letter"
+
+
+# A batch callback returns None when every message succeeded, or one
+# MessageOutcome per message, in the order the messages were passed in.
+BatchCallback = Callable[[list[dict[str, Any]]], "list[MessageOutcome] | None"]
+
+
+class Delivery:
+    """A consumed message together with its broker settlement hooks."""
+
+    __slots__ = ("_ack", "_dead_letter", "_release", "_retry", "attempt", "key", "payload")
+
+    def __init__(
+        self,
+        payload: dict[str, Any],
+        ack: Callable[[], None],
+        retry: Callable[[float], None],
+        dead_letter: Callable[[str], None],
+        release: Callable[[], None],
+        key: str | None = None,
+        attempt: int = 1,
+    ) -> None:
+        """Initialize a Delivery.
+
+        Args:
+            payload (dict): Decoded message body.
+            ack (Callable[[], None]): Confirms the message so it is not redelivered.
+            retry (Callable[[float], None]): Hands the message back for redelivery
+                after at least the given number of seconds.
+            dead_letter (Callable[[str], None]): Moves the message to the dead-letter
+                queue with the given failure reason.
+            release (Callable[[], None]): Hands the unprocessed message back to the
+                broker for immediate redelivery, without counting an attempt.
+            key (Optional[str]): Message ID or content hash used for deduplication.
+            attempt (int): 1-based delivery attempt of this message.
+
+        """
+        self.payload = payload
+        self.key = key
+        self.attempt = attempt
+        self._ack = ack
+        self._retry = retry
+        self._dead_letter = dead_letter
+        self._release = release
+
+    def ack(self) -> None:
+        """Acknowledge the message, logging instead of raising on broker errors."""
+        try:
+            self._ack()
+        except Exception:
+            logger.error("❌ Failed to acknowledge message (details redacted)")
+
+    def retry(self, delay_sec: float) -> None:
+        """Schedule redelivery, logging instead of raising on broker errors.
+
+        Args:
+            delay_sec (float): Minimum seconds before the message is redelivered.
+
+        """
+        try:
+            self._retry(delay_sec)
+        except Exception:
+            logger.error("❌ Failed to schedule message retry (details redacted)")
+
+    def dead_letter(self, reason: str) -> None:
+        """Move the message to the dead-letter queue, logging on broker errors.
+
+        Args:
+            reason (str): Short description of why the message failed.
+
+        """
+        try:
+            self._dead_letter(reason)
+        except Exception:
+            logger.error("❌ Failed to dead-letter message (details redacted)")
+
+    def release(self) -> None:
+        """Hand the message back to the broker, logging instead of raising on errors."""
+        try:
+            self._release()
+        except Exception:
+            logger.error("❌ Failed to release message (details redacted)")
+
+
+class ProcessingStage:
+    """Bounded, symbol-sharded stage between a broker listener and the batch callback.
+
+    Listeners submit deliveries, which are routed to one of `lanes` worker
+    threads by a stable hash of their `symbol`. Each lane drains its own
+    bounded queue in batches sized by the batch controller, invokes the callback
+    and settles each delivery according to its outcome once the callback
+    returns, so messages for a given symbol are processed and acknowledged
+    strictly in arrival order while different symbols proceed in parallel. A
+    full lane blocks `submit()`, which listeners use to stop fetching until the
+    workers catch up. With a dedup
+    cache, deliveries whose key was already processed are acked and skipped;
+    with coalescing, only the newest message per (symbol, timeframe) in each
+    batch reaches the callback.
+    """
+
+    def __init__(
+        self,
+        callback: BatchCallback,
+        controller: AdaptiveBatchController,
+        capacity: int,
+        lanes: int = 1,
+        dedup: DedupCache | None = None,
+        coalesce: bool = False,
+        max_attempts: int = 5,
+        retry_delay_sec: float = 5,
+        dead_letters: DeadLetterBatcher | None = None,
+    ) -> None:
+        """Initialize the processing stage.
+
+        Args:
+            callback (BatchCallback): Processing function for a batch of messages.
+            controller (AdaptiveBatchController): Chooses how many messages are passed to
+                one callback invocation, and learns from how long each batch takes.
+            capacity (int): Maximum number of messages waiting in each lane queue.
+            lanes (int): Number of worker lanes.
+            dedup (Optional[DedupCache]): Cache of already-processed message keys.
+            coalesce (bool): Drop messages superseded by a newer one for the same
+                (symbol, timeframe) within a batch.
+            max_attempts (int): Deliveries after which a retried message is dead-lettered.
+            retry_delay_sec (float): Backoff before the first retry; doubles per attempt.
+            dead_letters (Optional[DeadLetterBatcher]): Flushed after each batch so
+                that a batch's dead letters are published together.
+
+        Raises:
+            ValueError: If lanes is non-positive.
+
+        """
+        if lanes <= 0:
+            raise ValueError("lanes must be greater than 0")
+
+        self.capacity = capacity
+        self.queues = [StageQueue(f"processing-{i}", capacity) for i in range(lanes)]
+        self.controller = controller
+        self.dedup = dedup
+        self._coalesce = coalesce
+        self._max_attempts = max_attempts
+        self._retry_delay_sec = retry_delay_sec
+        self._dead_letters = dead_letters
+        self._callback = callback
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._abandoning = threading.Event()
+        self._workers = [
+            threading.Thread(
+                target=self._run, args=(lane_queue,), name=f"processing-lane-{i}", daemon=True
+            )
+            for i, lane_queue in enumerate(self.queues)
+        ]
+
+    def start(self) -> None:
+        """Start one background worker thread per lane."""
+        for worker in self._workers:
+            worker.start()
+
+    def lane_for(self, payload: dict[str, Any]) -> int:
+        """Return the lane index that owns a message's symbol.
+
+        Uses CRC32 rather than `hash()` so the mapping is stable across processes.
+
+        Args:
+            payload (dict): Decoded message body.
+
+        Returns:
+            int: Lane index in the range [0, lanes).
+
+        """
+        symbol = payload.get("symbol") if isinstance(payload, dict) else None
+        return zlib.crc32(str(symbol).encode("utf-8")) % len(self.queues)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of submitted deliveries that are not yet settled."""
+        return self._in_flight
+
+    def submit(self, delivery: Delivery) -> bool:
+        """Queue a delivery on its symbol's lane, blocking while that lane is full.
+
+        Args:
+            delivery (Delivery): Message to process.
+
+        Returns:
+            bool: True if queued or skipped as a duplicate, False if shutdown
+                was requested while waiting, in which case the delivery has
+                been released back to the broker.
+
+        """
+        if self.dedup is not None and delivery.key and self.dedup.seen(delivery.key):
+            logger.debug("🔁 Skipping already-processed message")
+            delivery.ack()
+            return True
+
+        lane_queue = self.queues[self.lane_for(delivery.payload)]
+        with self._lock:
+            self._in_flight += 1
+        while not shutdown_event.is_set():
+            if lane_queue.put(delivery, timeout=1):
+                return True
+        self._release([delivery])
+        return False
+
+    def wait_for_capacity(self, timeout: float) -> int:
+        """Block until the stage can accept messages.
+
+        Args:
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            int: Total free slots across all lanes (0 if still full).
+
+        """
+        if len(self.queues) == 1:
+            return self.queues[0].wait_for_capacity(timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            free_slots = sum(lane_queue.free_slots() for lane_queue in self.queues)
+            remaining = deadline - time.monotonic()
+            if free_slots or remaining <= 0:
+                return free_slots
+            time.sleep(min(0.05, remaining))
+
+    def stop(
+        self, pump: Callable[[], None] | None = None, timeout: float | None = None
+    ) -> tuple[int, int]:
+        """Drain the remaining queued messages and stop the worker threads.
+
+        Queued messages keep being processed until the timeout expires. After
+        that, lanes stop taking new batches and the messages still queued are
+        released back to the broker; batches already handed to the callback
+        always run to completion.
+
+        Args:
+            pump (Optional[Callable[[], None]]): Called repeatedly while waiting,
+                e.g. to let a broker connection flush acks scheduled by the workers.
+            timeout (Optional[float]): Seconds to keep processing; None drains everything.
+
+        Returns:
+            tuple[int, int]: Messages settled while draining, and messages released.
+
+        """
+        pending = self._in_flight
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._stopping.set()
+        abandoned = 0
+        if not self._join_workers(pump, deadline):
+            self._abandoning.set()
+            for lane_queue in self.queues:
+                abandoned += self._release(lane_queue.get_batch(lane_queue.maxsize, timeout=0))
+            self._join_workers(pump, None)
+        if pump is not None:
+            pump()
+        if self.dedup is not None:
+            self.dedup.close()
+
+        drained = pending - abandoned
+        drain_messages_total.labels(result="drained").inc(drained)
+        drain_messages_total.labels(result="abandoned").inc(abandoned)
+        return drained, abandoned
+
+    def _join_workers(self, pump: Callable[[], None] | None, deadline: float | None) -> bool:
+        """Wait for the worker threads to exit.
+
+        Args:
+            pump (Optional[Callable[[], None]]): Called repeatedly while waiting.
+            deadline (Optional[float]): `time.monotonic()` value to give up at.
+
+        Returns:
+            bool: True if every worker exited.
+
+        """
+        for worker in self._workers:
+            while worker.is_alive():
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                if pump is None:
+                    worker.join(timeout=0.1)
+                else:
+                    pump()
+        return True
+
+    def _release(self, deliveries: list[Delivery]) -> int:
+        """Hand unprocessed deliveries back to the broker.
+
+        Args:
+            deliveries (list[Delivery]): Deliveries to release.
+
+        Returns:
+            int: Number of deliveries released.
+
+        """
+        for delivery in deliveries:
+            delivery.release()
+        with self._lock:
+            self._in_flight -= len(deliveries)
+        return len(deliveries)
+
+    def _run(self, lane_queue: StageQueue) -> None:
+        """Lane worker loop: drain one lane queue batch by batch until stopped.
+
+        Args:
+            lane_queue (StageQueue): Queue owned by this lane.
+
+        """
+        while not self._abandoning.is_set():
+            batch = lane_queue.get_batch(self.controller.batch_size, timeout=0.5)
+            if batch:
+                self._process(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _process(self, batch: list[Delivery]) -> None:
+        """Invoke the callback for one batch and settle each delivery.
+
+        If the callback raises, or returns the wrong number of outcomes, every
+        message in the batch is treated as a transient failure; so is a single
+        message whose outcome is not a valid MessageOutcome.
+
+        Args:
+            batch (list[Delivery]): Deliveries to process.
+
+        """
+        latest, superseded = _coalesce_latest(batch) if self._coalesce else (batch, [])
+        start = time.perf_counter()
+        try:
+            outcomes = self._callback([delivery.payload for delivery in latest])
+        except Exception:
+            logger.error("❌ Batch processing failed (details redacted)")
+            outcomes = [MessageOutcome.RETRY] * len(latest)
+        else:
+            self.controller.observe(len(batch), time.perf_counter() - start)
+            if outcomes is None:
+                outcomes = [MessageOutcome.SUCCESS] * len(latest)
+            elif not isinstance(outcomes, (list, tuple)) or len(outcomes) != len(latest):
+                logger.error("❌ Callback returned invalid outcomes for %d message(s)", len(latest))
+                outcomes = [MessageOutcome.RETRY] * len(latest)
+
+        try:
+            for delivery, outcome in zip(latest, outcomes):
+                self._settle_safely(delivery, _to_outcome(outcome))
+            # The surviving message carries the newer history, so superseded ones
+            # are done whatever its outcome.
+            for delivery in superseded:
+                self._settle_safely(delivery, MessageOutcome.SUCCESS)
+            if self._dead_letters is not None:
+                self._dead_letters.flush()
+            if self.dedup is not None:
+                self.dedup.flush()
+        finally:
+            with self._lock:
+                self._in_flight -= len(batch)
+
+    def _settle_safely(self, delivery: Delivery, outcome: MessageOutcome) -> None:
+        """Settle one delivery, logging rather than raising if settling fails.
+
+        Args:
+            delivery (Delivery): Delivery to settle.
+            outcome (MessageOutcome): Result reported for the delivery.
+
+        """
+        try:
+            self._settle(delivery, outcome)
+        except Exception:
+            logger.exception("❌ Failed to settle message")
+
+    def _settle(self, delivery: Delivery, outcome: MessageOutcome) -> None:
+        """Ack, retry or dead-letter one delivery according to its outcome.
+
+        Args:
+            delivery (Delivery): Delivery to settle.
+            outcome (MessageOutcome): Result reported for the delivery.
+
+        """
+        if outcome is MessageOutcome.SUCCESS:
+            if self.dedup is not None and delivery.key:
+                self.dedup.add(delivery.key)
+            delivery.ack()
+        elif outcome is MessageOutcome.RETRY and delivery.attempt < self._max_attempts:
+            delay = min(self._retry_delay_sec * 2 ** (delivery.attempt - 1), MAX_RETRY_BACKOFF_SEC)
+            logger.debug("🔁 Retrying message (attempt %d) in %.1fs", delivery.attempt, delay)
+            delivery.retry(delay)
+        else:
+            outcome = MessageOutcome.DEAD_LETTER
+            reason = (
+                "max_attempts_exceeded" if delivery.attempt >= self._max_attempts else "rejected"
+            )
+            logger.warning("☠️ Dead-lettering message after %d attempt(s)", delivery.attempt)
+            delivery.dead_letter(reason)
+        message_outcomes_total.labels(outcome=outcome.value).inc()
+
+
+def _to_outcome(outcome: Any) -> MessageOutcome:
+    """Convert a callback's outcome for one message to a MessageOutcome.
+
+    Args:
+        outcome (Any): MessageOutcome or its value, as returned by the callback.
+
+    Returns:
+        MessageOutcome: The outcome, or RETRY if it is not valid.
+
+    """
+    try:
+        return MessageOutcome(outcome)
+    except ValueError:
+        safe_error("Callback returned an invalid outcome", {"outcome": repr(outcome)})
+        return MessageOutcome.RETRY
+
+
+def _coalesce_latest(batch: list[Delivery]) -> tuple[list[Delivery], list[Delivery]]:
+    """Keep only the newest delivery per (symbol, timeframe) in a batch.
+
+    A lane receives each symbol's messages in arrival order, so the last one
+    seen for a key is the newest. Messages without a symbol, or whose symbol or
+    timeframe is not a scalar, are never merged.
+
+    Args:
+        batch (list[Delivery]): Deliveries in arrival order.
+
+    Returns:
+        tuple[list[Delivery], list[Delivery]]: Surviving deliveries in arrival
+            order, each coalesced one at the position of its last occurrence, and
+            the superseded ones.
+
+    """
+    latest: dict[tuple[Any, Any], int] = {}
+    kept: list[int] = []
+    superseded: list[Delivery] = []
+    for i, delivery in enumerate(batch):
+        key = _coalesce_key(delivery.payload)
+        if key is None:
+            kept.append(i)
+            continue
+        previous = latest.get(key)
+        if previous is not None:
+            superseded.append(batch[previous])
+        latest[key] = i
+
+    kept.extend(latest.values())
+    survivors = [batch[i] for i in sorted(kept)]
+    if superseded:
+        coalesced_messages_total.inc(len(superseded))
+        logger.debug("🧹 Coalesced %d superseded message(s)", len(superseded))
+    return survivors, superseded
+
+
+def _coalesce_key(payload: Any) -> tuple[Any, Any] | None:
+    """Return the (symbol, timeframe) key a message is coalesced by.
+
+    Args:
+        payload (Any): Decoded message body.
+
+    Returns:
+        Optional[tuple[Any, Any]]: The key, or None if the message has no symbol or
+            its symbol or timeframe is not a scalar, e.g. a JSON object.
+
+    """
+    if not isinstance(payload, dict):
+        return None
+    symbol = payload.get("symbol")
+    timeframe = payload.get("timeframe")
+    if not isinstance(symbol, _SCALARS) or not isinstance(timeframe, (*_SCALARS, type(None))):
+        return None
+    return symbol, timeframe
+
+
+def consume_messages(callback: BatchCallback, flush: Callable[[], None] | None = None) -> None:
     """Start the message consumer using the configured QUEUE_TYPE.
 
     This method determines whether to use RabbitMQ or SQS and invokes the
     appropriate listener. It also registers signal handlers for graceful shutdown.
 
     Args:
-        callback (Callable[[list[dict]], None]): Processing function for a batch of messages.
+        callback (BatchCallback): Processing function for a batch of messages. It may
+            return None (all succeeded) or one MessageOutcome per message.
+        flush (Optional[Callable[[], None]]): Flushes buffered sink output; called
+            once the stage has drained on shutdown.
 
     Raises:
         ValueError: If QUEUE_TYPE is not supported.
@@ -59,31 +575,308 @@ def consume_messages(callback: Callable[[list[dict]], None]) -> None:
 
     queue_type = config.get_queue_type().lower()
     if queue_type == "rabbitmq":
-        _start_rabbitmq_listener(callback)
+        _start_rabbitmq_listener(callback, flush)
     elif queue_type == "sqs":
-        _start_sqs_listener(callback)
+        _start_sqs_listener(callback, flush)
+    elif queue_type == "file":
+        _start_file_listener(callback, flush)
+    elif queue_type == "fake":
+        _start_fake_listener(callback, flush)
     else:
         raise ValueError("Unsupported QUEUE_TYPE: [REDACTED]")
 
 
-def _graceful_shutdown(signum, frame) -> None:
+def _build_batch_controller() -> AdaptiveBatchController:
+    """Create the batch size controller from configuration.
+
+    Without ADAPTIVE_BATCHING the bounds collapse to BATCH_SIZE, which keeps
+    the batch and prefetch sizes static.
+
+    Returns:
+        AdaptiveBatchController: Controller shared by the listener and its processing stage.
+
+    """
+    batch_size = config.get_batch_size()
+    target_latency_sec = config.get_target_batch_latency_ms() / 1000
+    if not config.get_adaptive_batching_enabled():
+        return AdaptiveBatchController(batch_size, batch_size, batch_size, target_latency_sec)
+    return AdaptiveBatchController(
+        batch_size,
+        config.get_adaptive_batch_min(),
+        config.get_adaptive_batch_max(),
+        target_latency_sec,
+    )
+
+
+def _build_processing_stage(
+    callback: BatchCallback, dead_letters: DeadLetterBatcher | None = None
+) -> ProcessingStage:
+    """Create the processing stage from configuration.
+
+    Args:
+        callback (BatchCallback): Processing function for a batch of messages.
+        dead_letters (Optional[DeadLetterBatcher]): Buffer for failed messages.
+
+    Returns:
+        ProcessingStage: A stage that has not been started yet.
+
+    """
+    return ProcessingStage(
+        callback,
+        _build_batch_controller(),
+        config.get_stage_queue_size(),
+        config.get_processing_lanes(),
+        _build_dedup_cache(),
+        config.get_coalesce_by_symbol(),
+        config.get_max_delivery_attempts(),
+        config.get_retry_delay(),
+        dead_letters,
+    )
+
+
+def _build_dedup_cache() -> DedupCache | None:
+    """Create the redelivery dedup cache from configuration.
+
+    Returns:
+        Optional[DedupCache]: The cache, or None if DEDUP_ENABLED is off.
+
+    """
+    if not config.get_dedup_enabled():
+        return None
+    return DedupCache(
+        config.get_dedup_cache_size(),
+        config.get_dedup_ttl_seconds(),
+        config.get_dedup_cache_path() or None,
+    )
+
+
+def _message_key(message_id: str | None, body: bytes | str) -> str:
+    """Return the dedup key for a message.
+
+    Args:
+        message_id (Optional[str]): Broker- or publisher-assigned message ID.
+        body (bytes | str): Raw message body, hashed when there is no ID.
+
+    Returns:
+        str: The message ID, or a SHA-256 digest of the body.
+
+    """
+    if message_id:
+        return message_id
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+def _graceful_shutdown(signum: int, frame: FrameType | None) -> None:
     """Gracefully signal shutdown of the consumer loop.
 
+    Listeners stop fetching as soon as the event is set and then drain the
+    processing stage.
+
     Args:
-        signum: Signal number.
-        frame: Current stack frame.
+        signum (int): Signal number.
+        frame (Optional[FrameType]): Current stack frame.
 
     """
-    logger.info("🛑 Shutdown signal received, stopping listener...")
+    logger.info("🛑 Shutdown signal received, draining listener...")
     shutdown_event.set()
 
 
+def _flush_sinks(flush: Callable[[], None] | None) -> None:
+    """Flush buffered sink output, logging instead of raising on errors.
+
+    Args:
+        flush (Optional[Callable[[], None]]): Sink flush function, if any.
+
+    """
+    if flush is None:
+        return
+    try:
+        flush()
+    except Exception:
+        logger.error("❌ Failed to flush sink buffers (details redacted)")
+
+
+def _retry_queue(
+    channel: BlockingChannel, queue_name: str, delay_sec: float, declared: set[str]
+) -> str:
+    """Return the queue a retried message should wait in for `delay_sec`.
+
+    Each distinct delay gets its own queue with a queue-level TTL, so a long
+    backoff never holds up a shorter one behind it. Expired messages are
+    dead-lettered through the default exchange back to `queue_name`.
+
+    Args:
+        channel (BlockingChannel): Channel to declare the delay queue on.
+        queue_name (str): Queue the message returns to after the delay.
+        delay_sec (float): Backoff delay in seconds.
+        declared (set[str]): Delay queues already declared; updated in place.
+
+    Returns:
+        str: Routing key to publish the retried message to.
+
+    """
+    delay_ms = int(delay_sec * 1000)
+    if delay_ms <= 0:
+        return queue_name
+    name = f"{queue_name}.retry.{delay_ms}"
+    if name not in declared:
+        channel.queue_declare(
+            queue=name,
+            durable=True,
+            arguments={
+                "x-message-ttl": delay_ms,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            },
+        )
+        declared.add(name)
+    return name
+
+
+def _rabbitmq_delivery(
+    connection: pika.BlockingConnection,
+    channel: BlockingChannel,
+    method: Any,
+    properties: pika.BasicProperties,
+    body: bytes,
+    payload: dict[str, Any],
+    key: str | None,
+    queue_name: str,
+    dead_letters: DeadLetterBatcher,
+    retry_queues: set[str],
+) -> Delivery:
+    """Wrap a RabbitMQ message in a Delivery whose hooks are thread-safe.
+
+    Worker threads must not touch the channel directly; pika only allows
+    cross-thread calls through `add_callback_threadsafe`. Retries republish a
+    copy with an incremented attempt header and then ack the original, so the
+    message is never lost in between. The copy waits out its backoff in a
+    per-delay TTL queue that dead-letters back to `queue_name`, so the
+    original's prefetch slot is freed immediately.
+
+    Args:
+        connection (pika.BlockingConnection): Connection owning the channel.
+        channel (BlockingChannel): Channel the message was received on.
+        method: Delivery method.
+        properties (pika.BasicProperties): Message properties.
+        body (bytes): Raw message body.
+        payload (dict): Decoded message body.
+        key (Optional[str]): Dedup key.
+        queue_name (str): Queue that retried messages are returned to.
+        dead_letters (DeadLetterBatcher): Buffer for dead-lettered messages.
+        retry_queues (set[str]): Delay queues already declared on `channel`.
+
+    Returns:
+        Delivery: Delivery bound to this message.
+
+    """
+    delivery_tag = method.delivery_tag
+    headers = dict(properties.headers or {})
+    attempt = int(headers.get(ATTEMPT_HEADER, 1))
+
+    def requeue(delay_sec: float) -> None:
+        channel.basic_publish(
+            exchange="",
+            routing_key=_retry_queue(channel, queue_name, delay_sec, retry_queues),
+            body=body,
+            properties=pika.BasicProperties(
+                headers={**headers, ATTEMPT_HEADER: attempt + 1},
+                delivery_mode=2,
+                message_id=properties.message_id,
+                content_type=properties.content_type,
+                content_encoding=properties.content_encoding,
+            ),
+        )
+        channel.basic_ack(delivery_tag=delivery_tag)
+
+    def retry(delay_sec: float) -> None:
+        connection.add_callback_threadsafe(functools.partial(requeue, delay_sec))
+
+    def dead_letter(reason: str) -> None:
+        dead_letters.add(DeadLetter(body, reason, "process", attempt, (delivery_tag, properties)))
+
+    return Delivery(
+        payload,
+        ack=lambda: connection.add_callback_threadsafe(
+            functools.partial(channel.basic_ack, delivery_tag=delivery_tag)
+        ),
+        retry=retry,
+        dead_letter=dead_letter,
+        release=lambda: connection.add_callback_threadsafe(
+            functools.partial(channel.basic_nack, delivery_tag=delivery_tag, requeue=True)
+        ),
+        key=key,
+        attempt=attempt,
+    )
+
+
+def _sqs_delivery(
+    sqs: Any,
+    queue_url: str,
+    dead_letters: DeadLetterBatcher,
+    heartbeat: VisibilityHeartbeat,
+    msg: dict[str, Any],
+    payload: dict[str, Any],
+) -> Delivery:
+    """Wrap an SQS message in a Delivery.
+
+    Retries shorten the message's visibility timeout to the backoff delay;
+    dead-lettered messages are deleted once their DLQ copy has been sent.
+    Settling a message in any way stops its visibility heartbeat.
+
+    Args:
+        sqs: boto3 SQS client.
+        queue_url (str): Source queue URL.
+        dead_letters (DeadLetterBatcher): Buffer for dead-lettered messages.
+        heartbeat (VisibilityHeartbeat): Heartbeat tracking the message.
+        msg (dict[str, Any]): Message as returned by `receive_message`.
+        payload (dict): Decoded message body.
+
+    Returns:
+        Delivery: Delivery bound to this message.
+
+    """
+    receipt_handle = msg["ReceiptHandle"]
+    attempt = int(msg.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+
+    def ack() -> None:
+        heartbeat.untrack(receipt_handle)
+        sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt_handle)
+
+    def retry(delay_sec: float) -> None:
+        heartbeat.untrack(receipt_handle)
+        sqs.change_message_visibility(
+            QueueUrl=queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=min(int(delay_sec), SQS_MAX_VISIBILITY_TIMEOUT),
+        )
+
+    def dead_letter(reason: str) -> None:
+        heartbeat.untrack(receipt_handle)
+        dead_letters.add(DeadLetter(msg["Body"], reason, "process", attempt, msg))
+
+    return Delivery(
+        payload,
+        ack=ack,
+        retry=retry,
+        dead_letter=dead_letter,
+        release=functools.partial(retry, 0),
+        key=msg.get("MessageId"),
+        attempt=attempt,
+    )
+
+
 @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=2, max=10))
-def _start_rabbitmq_listener(callback: Callable[[list[dict]], None]) -> None:
+def _start_rabbitmq_listener(
+    callback: BatchCallback, flush: Callable[[], None] | None = None
+) -> None:
     """Connect to RabbitMQ and start consuming messages from the configured queue.
 
     Args:
-        callback (Callable[[list[dict]], None]): Handler function for batches of messages.
+        callback (BatchCallback): Handler function for batches of messages.
+        flush (Optional[Callable[[], None]]): Flushes sink buffers after draining.
 
     """
     connection = pika.BlockingConnection(
@@ -99,86 +892,415 @@ def _start_rabbitmq_listener(callback: Callable[[list[dict]], None]) -> None:
     channel = connection.channel()
     queue_name = config.get_rabbitmq_queue()
     channel.queue_declare(queue=queue_name, durable=True)
+    dlq_name = config.get_dlq_name()
+    channel.queue_declare(queue=dlq_name, durable=True)
+    dead_letters = DeadLetterBatcher(
+        lambda letters: connection.add_callback_threadsafe(
+            functools.partial(dlq.publish_rabbitmq, channel, dlq_name, letters)
+        ),
+        config.get_dlq_batch_size(),
+    )
+    stage = _build_processing_stage(callback, dead_letters)
+    retry_queues: set[str] = set()
+    refused = 0
+
+    def prefetch_count() -> int:
+        """Return the prefetch that keeps every lane fed without overfilling it."""
+        return min(stage.controller.batch_size * len(stage.queues), stage.capacity)
 
-    def on_message(ch: BlockingChannel, method, properties, body: bytes) -> None:
+    def on_message(
+        ch: BlockingChannel,
+        method: pika.spec.Basic.Deliver,
+        properties: pika.spec.BasicProperties,
+        body: bytes,
+    ) -> None:
         """Callback invoked for each incoming RabbitMQ message.
 
         Args:
             ch (BlockingChannel): The channel object.
-            method: Delivery method.
-            properties: Message properties.
+            method (pika.spec.Basic.Deliver): Delivery method.
+            properties (pika.spec.BasicProperties): Message properties.
             body (bytes): Raw message body.
 
         """
+        nonlocal refused
         if shutdown_event.is_set():
-            ch.stop_consuming()
+            # Already-dispatched messages go straight back to the queue.
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            refused += 1
             return
 
         try:
-            message = json.loads(body)
-            callback([message])
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            logger.debug("✅ RabbitMQ message processed and acknowledged.")
+            message = codec.loads(compression.decompress(body, properties.content_encoding))
+        except Exception:
+            logger.error("❌ RabbitMQ message decoding failed (details redacted)")
+            attempt = int((properties.headers or {}).get(ATTEMPT_HEADER, 1))
+            dead_letters.add(
+                DeadLetter(
+                    body, "undecodable", "decode", attempt, (method.delivery_tag, properties)
+                )
+            )
+            return
+
+        key = _message_key(properties.message_id, body) if stage.dedup is not None else None
+        stage.submit(
+            _rabbitmq_delivery(
+                connection,
+                ch,
+                method,
+                properties,
+                body,
+                message,
+                key,
+                queue_name,
+                dead_letters,
+                retry_queues,
+            )
+        )
+
+    def pump() -> None:
+        """Let the connection flush acks scheduled by the processing stage."""
+        try:
+            connection.process_data_events(time_limit=0.1)
         except Exception:
-            logger.error("❌ RabbitMQ message processing failed (details redacted)")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            time.sleep(0.1)
 
     logger.info(safe_log("🚀 Consuming RabbitMQ messages from queue"))
 
     try:
-        channel.basic_qos(prefetch_count=config.get_batch_size())
-        channel.basic_consume(queue=queue_name, on_message_callback=on_message, auto_ack=False)
+        stage.start()
+        # Prefetch never exceeds a lane's capacity, so a saturated stage
+        # exhausts the broker credit instead of blocking the I/O loop.
+        prefetch = prefetch_count()
+        channel.basic_qos(prefetch_count=prefetch)
+        consumer_tag = channel.basic_consume(
+            queue=queue_name, on_message_callback=on_message, auto_ack=False
+        )
 
         while not shutdown_event.is_set():
             connection.process_data_events(time_limit=1)
+            dead_letters.flush()
+            if prefetch_count() != prefetch:
+                prefetch = prefetch_count()
+                channel.basic_qos(prefetch_count=prefetch)
+        # Cancelling nacks (with requeue) prefetched messages not yet dispatched.
+        channel.basic_cancel(consumer_tag)
     finally:
+        drained, abandoned = stage.stop(pump=pump, timeout=config.get_drain_timeout())
+        dead_letters.flush()
+        _flush_sinks(flush)
+        pump()
         connection.close()
-        logger.info("🛑 RabbitMQ listener stopped.")
+        logger.info(
+            "🛑 RabbitMQ listener stopped: %d message(s) drained, %d handed back.",
+            drained,
+            abandoned + refused,
+        )
 
 
 @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=2, max=10))
-def _start_sqs_listener(callback: Callable[[list[dict]], None]) -> None:
+def _start_sqs_listener(callback: BatchCallback, flush: Callable[[], None] | None = None) -> None:
     """Connect to AWS SQS and start polling messages.
 
     Args:
-        callback (Callable[[list[dict]], None]): Handler function for a batch of messages.
+        callback (BatchCallback): Handler function for a batch of messages.
+        flush (Optional[Callable[[], None]]): Flushes sink buffers after draining.
 
     """
-    sqs = boto3.client("sqs", region_name=config.get_sqs_region())
+    sqs = aws_clients.get_client("sqs", config.get_sqs_region())
     queue_url = config.get_sqs_queue_url()
 
+    try:
+        dlq_url = sqs.get_queue_url(QueueName=config.get_dlq_name())["QueueUrl"]
+    except Exception:
+        dlq_url = None
+        logger.warning("⚠️ SQS dead-letter queue not found; poison messages will be redelivered")
+
+    dead_letters = DeadLetterBatcher(
+        functools.partial(dlq.publish_sqs, sqs, dlq_url, queue_url), config.get_dlq_batch_size()
+    )
+    stage = _build_processing_stage(callback, dead_letters)
+    visibility_timeout = config.get_sqs_visibility_timeout()
+    # Received messages can wait in a lane queue before processing starts, so
+    # every message is kept invisible from receipt until it is settled.
+    heartbeat = VisibilityHeartbeat(
+        sqs, queue_url, visibility_timeout, config.get_sqs_heartbeat_interval()
+    )
+
     logger.info(safe_log("🚀 Polling SQS queue"))
 
-    while not shutdown_event.is_set():
-        try:
-            response = sqs.receive_message(
-                QueueUrl=queue_url,
-                MaxNumberOfMessages=config.get_batch_size(),
-                WaitTimeSeconds=10,
-            )
-            messages = response.get("Messages", [])
-            if not messages:
+    stage.start()
+    heartbeat.start()
+    try:
+        while not shutdown_event.is_set():
+            free_slots = stage.wait_for_capacity(timeout=1)
+            if not free_slots:
                 continue
 
-            payloads = []
-            receipt_handles = []
+            try:
+                response = sqs.receive_message(
+                    QueueUrl=queue_url,
+                    MaxNumberOfMessages=min(
+                        stage.controller.batch_size, free_slots, SQS_MAX_RECEIVE_MESSAGES
+                    ),
+                    WaitTimeSeconds=10,
+                    VisibilityTimeout=visibility_timeout,
+                    AttributeNames=["ApproximateReceiveCount"],
+                    MessageAttributeNames=[compression.SQS_ENCODING_ATTRIBUTE],
+                )
+                messages = response.get("Messages", [])
+
+                for msg in messages:
+                    heartbeat.track(msg["ReceiptHandle"])
+                    try:
+                        payload = codec.loads(
+                            compression.decompress_text(msg["Body"], compression.sqs_encoding(msg))
+                        )
+                    except Exception:
+                        logger.warning("⚠️ Failed to parse SQS message body (redacted)")
+                        attempt = int(msg.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+                        heartbeat.untrack(msg["ReceiptHandle"])
+                        dead_letters.add(
+                            DeadLetter(msg["Body"], "undecodable", "decode", attempt, msg)
+                        )
+                        continue
+
+                    stage.submit(
+                        _sqs_delivery(sqs, queue_url, dead_letters, heartbeat, msg, payload)
+                    )
+                dead_letters.flush()
+
+            except (BotoCoreError, NoCredentialsError):
+                logger.error("❌ SQS error encountered (details redacted)")
+                time.sleep(5)
+    finally:
+        # The heartbeat keeps queued messages invisible while the stage drains.
+        drained, abandoned = stage.stop(timeout=config.get_drain_timeout())
+        dead_letters.flush()
+        _flush_sinks(flush)
+        heartbeat.stop()
+
+    logger.info(
+        "🛑 SQS polling stopped: %d message(s) drained, %d handed back.", drained, abandoned
+    )
+
+
+def _file_delivery(
+    retries: file_queue.RetrySchedule,
+    dead_letters: DeadLetterBatcher,
+    message_id: str,
+    body: bytes,
+    payload: dict[str, Any],
+    key: str | None,
+    attempt: int,
+) -> Delivery:
+    """Wrap a message read from a file in a Delivery.
+
+    Acks are no-ops since the input file is never modified. Retries are
+    rescheduled in memory with an incremented attempt, and dead letters are
+    appended to the dead-letter file.
+
+    Args:
+        retries (file_queue.RetrySchedule): Schedule for messages to redeliver.
+        dead_letters (DeadLetterBatcher): Buffer for dead-lettered messages.
+        message_id (str): Stable "<file>:<line>" message ID.
+        body (bytes): Raw message body.
+        payload (dict): Decoded message body.
+        key (Optional[str]): Dedup key.
+        attempt (int): 1-based delivery attempt.
+
+    Returns:
+        Delivery: Delivery bound to this message.
+
+    """
+    return Delivery(
+        payload,
+        ack=lambda: None,
+        retry=lambda delay_sec: retries.schedule(
+            delay_sec, (message_id, body, payload, key, attempt + 1)
+        ),
+        dead_letter=lambda reason: dead_letters.add(
+            DeadLetter(body, reason, "process", attempt, message_id)
+        ),
+        release=lambda: None,
+        key=key,
+        attempt=attempt,
+    )
+
+
+def _start_file_listener(callback: BatchCallback, flush: Callable[[], None] | None = None) -> None:
+    """Replay messages from FILE_QUEUE_PATH through the processing stage.
+
+    Returns once every message has been processed, retried to completion or
+    dead-lettered, or on shutdown. Dead letters go to "<DLQ_NAME>.jsonl" next
+    to the input.
+
+    Args:
+        callback (BatchCallback): Handler function for a batch of messages.
+        flush (Optional[Callable[[], None]]): Flushes sink buffers after draining.
+
+    """
+    path = config.get_file_queue_path()
+    dlq_path = os.path.join(
+        path if os.path.isdir(path) else os.path.dirname(path) or ".",
+        f"{config.get_dlq_name()}.jsonl",
+    )
+    dead_letters = DeadLetterBatcher(
+        functools.partial(dlq.publish_file, dlq_path), config.get_dlq_batch_size()
+    )
+    stage = _build_processing_stage(callback, dead_letters)
+    retries = file_queue.RetrySchedule()
+    clock = (
+        file_queue.ReplayClock(
+            config.get_file_queue_timestamp_field(), config.get_file_queue_speed()
+        )
+        if config.get_file_queue_replay() == "recorded"
+        else None
+    )
+
+    def submit(
+        message_id: str, body: bytes, payload: dict[str, Any], key: str | None, attempt: int
+    ) -> None:
+        stage.submit(_file_delivery(retries, dead_letters, message_id, body, payload, key, attempt))
+
+    def submit_due_retries() -> None:
+        for item in retries.pop_due():
+            submit(*item)
+
+    logger.info(safe_log("🚀 Replaying messages from file queue"))
+
+    read = 0
+    start = time.perf_counter()
+    stage.start()
+    try:
+        for message_id, body in file_queue.read_messages(path, config.get_file_queue_mmap()):
+            if shutdown_event.is_set():
+                break
+            submit_due_retries()
+            try:
+                payload = codec.loads(body)
+            except Exception:
+                logger.warning("⚠️ Failed to parse file message body (redacted)")
+                dead_letters.add(DeadLetter(body, "undecodable", "decode", 1, message_id))
+                continue
+
+            if clock is not None:
+                clock.wait(payload)
+            # Line positions shift when a file is edited, so dedup on content.
+            key = _message_key(None, body) if stage.dedup is not None else None
+            submit(message_id, body, payload, key, 1)
+            read += 1
+
+        # Input exhausted: wait for in-flight messages and pending retries.
+        while not shutdown_event.is_set() and (stage.in_flight or len(retries)):
+            submit_due_retries()
+            time.sleep(0.05)
+    finally:
+        _, abandoned = stage.stop(timeout=config.get_drain_timeout())
+        dead_letters.flush()
+        _flush_sinks(flush)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "🛑 File replay finished: %d message(s) in %.2fs (%.1f msg/s), %d abandoned.",
+        read,
+        elapsed,
+        read / elapsed if elapsed > 0 else 0.0,
+        abandoned + len(retries),
+    )
+
+
+def _fake_delivery(
+    broker: fake_broker.FakeBroker,
+    dead_letters: DeadLetterBatcher,
+    msg: fake_broker.FakeMessage,
+    payload: dict[str, Any],
+    key: str | None,
+) -> Delivery:
+    """Wrap a fake-broker message in a Delivery.
+
+    Args:
+        broker (fake_broker.FakeBroker): Broker the message was received from.
+        dead_letters (DeadLetterBatcher): Buffer for dead-lettered messages.
+        msg (fake_broker.FakeMessage): Delivered message.
+        payload (dict): Decoded message body.
+        key (Optional[str]): Dedup key.
+
+    Returns:
+        Delivery: Delivery bound to this message.
+
+    """
+    return Delivery(
+        payload,
+        ack=functools.partial(broker.ack, msg.receipt),
+        retry=functools.partial(broker.nack, msg.receipt),
+        dead_letter=lambda reason: dead_letters.add(
+            DeadLetter(msg.body, reason, "process", msg.attempt, msg.receipt)
+        ),
+        release=functools.partial(broker.nack, msg.receipt),
+        key=key,
+        attempt=msg.attempt,
+    )
+
+
+def _start_fake_listener(callback: BatchCallback, flush: Callable[[], None] | None = None) -> None:
+    """Consume messages from the in-process fake broker.
+
+    Reads the RABBITMQ_QUEUE queue. Mirrors the SQS listener: fetches are sized
+    by free stage capacity, and injected connection drops are logged and
+    retried after a short pause.
+
+    Args:
+        callback (BatchCallback): Handler function for a batch of messages.
+        flush (Optional[Callable[[], None]]): Flushes sink buffers after draining.
+
+    """
+    broker = fake_broker.get_broker()
+    queue_name = config.get_rabbitmq_queue()
+    dead_letters = DeadLetterBatcher(
+        functools.partial(dlq.publish_fake, broker, config.get_dlq_name()),
+        config.get_dlq_batch_size(),
+    )
+    stage = _build_processing_stage(callback, dead_letters)
+
+    logger.info(safe_log("🚀 Consuming fake broker queue"))
+
+    stage.start()
+    try:
+        while not shutdown_event.is_set():
+            free_slots = stage.wait_for_capacity(timeout=1)
+            if not free_slots:
+                continue
+
+            try:
+                messages = broker.receive(
+                    queue_name, min(stage.controller.batch_size, free_slots), timeout=1
+                )
+            except (fake_broker.FakeConnectionError, fake_broker.FakeThrottlingError):
+                logger.warning("⚠️ Fake broker call failed; retrying")
+                time.sleep(0.1)
+                continue
 
             for msg in messages:
                 try:
-                    payload = json.loads(msg["Body"])
-                    payloads.append(payload)
-                    receipt_handles.append(msg["ReceiptHandle"])
+                    payload = codec.loads(msg.body)
                 except Exception:
-                    logger.warning("⚠️ Failed to parse SQS message body (redacted)")
-
-            if payloads:
-                callback(payloads)
-                for handle in receipt_handles:
-                    sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=handle)
-                logger.debug("✅ SQS: Processed and deleted %d message(s)", len(payloads))
+                    logger.warning("⚠️ Failed to parse fake broker message body (redacted)")
+                    dead_letters.add(
+                        DeadLetter(msg.body, "undecodable", "decode", msg.attempt, msg.receipt)
+                    )
+                    continue
 
-        except (BotoCoreError, NoCredentialsError):
-            logger.error("❌ SQS error encountered (details redacted)")
-            time.sleep(5)
+                key = _message_key(msg.message_id, msg.body) if stage.dedup is not None else None
+                stage.submit(_fake_delivery(broker, dead_letters, msg, payload, key))
+            dead_letters.flush()
+    finally:
+        drained, abandoned = stage.stop(timeout=config.get_drain_timeout())
+        dead_letters.flush()
+        _flush_sinks(flush)
 
-    logger.info("🛑 SQS polling stopped.")
+    logger.info(
+        "🛑 Fake broker listener stopped: %d message(s) drained, %d handed back.",
+        drained,
+        abandoned,
+    )
@@ -1,32 +1,55 @@
-"""Message publisher module for RabbitMQ or AWS SQS.
+"""Message publisher module for RabbitMQ, AWS SQS or the in-process fake broker.
 
 Handles publishing of processed data to the appropriate messaging queue,
 with retry logic, structured logging, redaction, and Prometheus metrics.
+The process-wide `Publisher` resolves the queue type, publish options and
+routes once from configuration. The routing key may be a per-message
+template such as ``ichimoku.{symbol}``, so consumers can bind to just the
+symbols they need.
 """
 
-import json
+import string
+import threading
 import time
-from typing import Any, Optional
+from collections.abc import Hashable, Iterator
+from concurrent.futures import wait
+from contextlib import contextmanager
+from typing import Any, NoReturn, cast
 
-import boto3
 import pika
-from botocore.exceptions import BotoCoreError, NoCredentialsError
+from botocore.exceptions import BotoCoreError, ClientError
 from pika.exceptions import AMQPConnectionError
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from app import config_shared
+from app import config_shared, envelope, fake_broker, rabbitmq_publisher
+from app.dead_letter import SQS_MAX_BATCH_BYTES, SQS_MAX_BATCH_ENTRIES
+from app.outbox import (
+    Destination,
+    Outbox,
+    OutboxFullError,
+    PartialPublishError,
+    failed_indices,
+)
+from app.rabbitmq_publisher import PublishNotConfirmedError
+from app.utils import aws_clients, codec, compression
+from app.utils.last_value_cache import LastValueCache, Update
 from app.utils.metrics import queue_publish_counter, queue_publish_latency
+from app.utils.publish_buffer import PublishBuffer
 from app.utils.safe_logger import safe_error, safe_info
 
 REDACT_SENSITIVE_LOGS: bool = (
     config_shared.get_config_value_cached("REDACT_SENSITIVE_LOGS", "true").lower() == "true"
 )
 
+SQS_SEND_ATTEMPTS = 3
+
+
+class SQSMessageSendError(PartialPublishError):
+    """Raised when SQS does not accept every message of a publish."""
 
-class SQSMessageSendError(Exception):
-    """Raised when SQS returns a non-200 HTTP status."""
 
-    pass
+class ConfirmFailedError(PartialPublishError, PublishNotConfirmedError):
+    """Raised when RabbitMQ does not confirm every message of a publish."""
 
 
 def safe_log_message(data: dict[str, Any]) -> str:
@@ -39,13 +62,427 @@ def safe_log_message(data: dict[str, Any]) -> str:
         str: Redacted placeholder or JSON-formatted string.
 
     """
-    return "[REDACTED]" if REDACT_SENSITIVE_LOGS else json.dumps(data, ensure_ascii=False)
+    return "[REDACTED]" if REDACT_SENSITIVE_LOGS else codec.dumps_str(data)
+
+
+class Route:
+    """Where published messages go: a RabbitMQ exchange and a routing key.
+
+    For SQS the key is the queue URL, and for the fake broker the queue name.
+    A RabbitMQ or fake-broker key may be a template with message fields, e.g.
+    ``ichimoku.{symbol}``; it is rendered for each message, with "unknown" in
+    place of a missing field.
+    """
+
+    __slots__ = ("exchange", "fields", "key")
+
+    def __init__(self, exchange: str | None, key: str, templated: bool = True) -> None:
+        """Initialize a Route.
+
+        Args:
+            exchange (Optional[str]): RabbitMQ exchange.
+            key (str): Routing key, queue URL or queue name.
+            templated (bool): Whether the key may contain message fields.
+
+        Raises:
+            ValueError: If the key is empty.
+
+        """
+        if not key:
+            raise ValueError("Missing required config: publish route has no routing key or queue")
+        self.exchange = exchange
+        self.key = key
+        self.fields: tuple[str, ...] = ()
+        if templated:
+            self.fields = tuple(
+                name for _, name, _, _ in string.Formatter().parse(key) if name is not None
+            )
+
+    def key_for(self, message: dict[str, Any]) -> str:
+        """Render the key for one message.
+
+        Args:
+            message (dict[str, Any]): The message being published.
+
+        Returns:
+            str: The routing key for the message.
+
+        """
+        if not self.fields:
+            return self.key
+        values = message if isinstance(message, dict) else {}
+        return self.key.format_map({name: values.get(name) or "unknown" for name in self.fields})
+
+    def split(
+        self, payload: list[dict[str, Any]], bodies: list[bytes]
+    ) -> Iterator[tuple[Destination, list[int], list[dict[str, Any]], list[bytes]]]:
+        """Group messages by their rendered destination.
+
+        Messages keep their relative order within each destination.
+
+        Args:
+            payload (list[dict[str, Any]]): Messages to publish.
+            bodies (list[bytes]): The messages encoded with `codec.dumps`.
+
+        Yields:
+            tuple[Destination, list[int], list[dict[str, Any]], list[bytes]]: A
+                (queue, exchange) destination, the positions in `payload` of the
+                messages routed to it, and those messages with their encodings.
+
+        """
+        if not self.fields:
+            yield (self.key, self.exchange), list(range(len(payload))), payload, bodies
+            return
+
+        groups: dict[str, list[int]] = {}
+        for i, message in enumerate(payload):
+            groups.setdefault(self.key_for(message), []).append(i)
+        for key, indices in groups.items():
+            yield (
+                (key, self.exchange),
+                indices,
+                [payload[i] for i in indices],
+                [bodies[i] for i in indices],
+            )
+
+
+class Publisher:
+    """Publishes results with settings and routes resolved once from configuration."""
+
+    def __init__(
+        self,
+        queue_type: str,
+        default: Route,
+        paper: Route,
+        confirms: bool = False,
+        batching: bool = False,
+        bundling: bool = False,
+        last_values: LastValueCache | None = None,
+    ) -> None:
+        """Initialize a Publisher.
+
+        Args:
+            queue_type (str): "rabbitmq", "sqs" or "fake".
+            default (Route): Route for processed results.
+            paper (Route): Route for paper trades.
+            confirms (bool): Wait for RabbitMQ publisher confirms.
+            batching (bool): Hand results to the background batching publisher.
+            bundling (bool): Pack results into envelopes.
+            last_values (Optional[LastValueCache]): Suppresses results identical to
+                the last ones published; None publishes every result.
+
+        """
+        self.queue_type = queue_type.lower()
+        self.default = default
+        self.paper = paper
+        self.confirms = confirms and self.queue_type == "rabbitmq"
+        # Batching is bypassed with confirms, because the caller must wait for them.
+        self.batching = batching and not self.confirms
+        self.bundling = bundling
+        self.last_values = last_values
+
+    @classmethod
+    def from_config(cls) -> "Publisher":
+        """Build a Publisher from the current configuration.
+
+        Returns:
+            Publisher: The configured publisher.
+
+        Raises:
+            ValueError: If the routing key or SQS queue URL is not configured.
+
+        """
+        queue_type = config_shared.get_queue_type().lower()
+        if queue_type == "sqs":
+            default = Route(None, config_shared.get_sqs_queue_url(), templated=False)
+        else:
+            default = Route(
+                config_shared.get_rabbitmq_exchange(), config_shared.get_rabbitmq_routing_key()
+            )
+        paper = Route(
+            config_shared.get_paper_trading_exchange() or default.exchange,
+            config_shared.get_paper_trading_queue_name() or default.key,
+            templated=queue_type != "sqs",
+        )
+        last_values = None
+        if config_shared.get_last_value_cache_enabled():
+            last_values = LastValueCache(
+                config_shared.get_last_value_heartbeat_seconds(),
+                config_shared.get_last_value_cache_size(),
+            )
+        return cls(
+            queue_type,
+            default,
+            paper,
+            confirms=config_shared.get_rabbitmq_publisher_confirms(),
+            batching=config_shared.get_publish_batching_enabled(),
+            bundling=config_shared.get_publish_bundle_enabled(),
+            last_values=last_values,
+        )
+
+    def publish(
+        self,
+        payload: list[dict[str, Any]],
+        route: Route | None = None,
+        encoded: list[bytes] | None = None,
+    ) -> None:
+        """Publish a batch of processed messages.
+
+        With PUBLISH_BATCHING_ENABLED, messages are handed to the background
+        batching publisher and published within the linger time; call
+        `flush_publish_buffer()` before shutdown. Publish errors are then not
+        raised to the caller. With OUTBOX_ENABLED, results that fail to publish
+        are spooled to the outbox; otherwise a micro-batch that still fails
+        after PUBLISH_RETRY_ATTEMPTS is dropped, so delivery is at most once.
+
+        Args:
+            payload (list[dict[str, Any]]): List of messages to send.
+            route (Optional[Route]): Where to publish; defaults to the configured route.
+            encoded (Optional[list[bytes]]): The messages already encoded with
+                `codec.dumps`, to avoid encoding them again.
+
+        Raises:
+            PartialPublishError: If only some messages were published; its indices
+                refer to `payload`.
+
+        """
+        if not isinstance(payload, list):
+            safe_error(
+                "Invalid payload type", {"expected": "list", "got": str(type(payload).__name__)}
+            )
+            return
+
+        bodies = encoded if encoded is not None else [codec.dumps(message) for message in payload]
+        published: set[int] = set()
+        for destination, indices, messages, encodings in (route or self.default).split(
+            payload, bodies
+        ):
+            try:
+                if self.batching:
+                    get_publish_buffer().submit(
+                        list(zip(messages, encodings, strict=True)),
+                        destination,
+                        [len(body) for body in encodings],
+                    )
+                else:
+                    self.publish_now(messages, encodings, destination)
+            except Exception as e:
+                self._raise_unsent(e, len(payload), indices, published)
+            published.update(indices)
+
+    def _raise_unsent(
+        self, error: Exception, count: int, indices: list[int], published: set[int]
+    ) -> NoReturn:
+        """Re-raise a failed publish with indices relative to the whole payload.
+
+        Args:
+            error (Exception): The error raised publishing one destination's messages.
+            count (int): Number of messages in the payload.
+            indices (list[int]): Positions in the payload of the failed destination's
+                messages.
+            published (set[int]): Positions of the messages already published.
+
+        Raises:
+            PartialPublishError: If some messages of the payload were published or
+                rejected permanently.
+            Exception: The original error if no message was published.
+
+        """
+        failed, refused = failed_indices(error, len(indices))
+        if self.last_values is not None or self.bundling:
+            # Indices refer to filtered or bundled messages; retry the whole destination.
+            failed, refused = list(range(len(indices))), []
+        group = set(indices)
+        failed_positions = {indices[i] for i in failed}
+        rejected = [indices[i] for i in refused]
+        unsent = [
+            i
+            for i in range(count)
+            if i in failed_positions or (i not in group and i not in published)
+        ]
+        if not rejected and len(unsent) == count:
+            raise error
+        raise PartialPublishError(str(error), unsent, rejected) from error
+
+    def publish_now(
+        self, payload: list[dict[str, Any]], bodies: list[bytes], destination: Destination
+    ) -> None:
+        """Publish messages synchronously to one destination.
+
+        With LAST_VALUE_CACHE_ENABLED, messages identical to the last ones
+        published for their symbol and timeframe are dropped first. With
+        PUBLISH_BUNDLE_ENABLED, the messages are packed into envelopes.
+        With OUTBOX_ENABLED, messages that cannot be published are spooled to the
+        outbox instead of raising, and are published from there later; messages
+        the broker rejected permanently are quarantined instead.
+
+        Args:
+            payload (list[dict[str, Any]]): List of messages to send.
+            bodies (list[bytes]): The messages encoded with `codec.dumps`.
+            destination (Destination): Queue (or routing key) and exchange.
+
+        Raises:
+            OutboxFullError: If earlier results are spooled and the outbox is full.
+
+        """
+        updates: list[Update] = []
+        if self.last_values is not None:
+            payload, bodies, updates = self.last_values.filter(payload, bodies, destination)
+            if not bodies:
+                return
+
+        if self.bundling:
+            payload, bodies = envelope.bundle(
+                payload,
+                bodies,
+                config_shared.get_publish_bundle_max_results(),
+                config_shared.get_publish_bundle_max_bytes(),
+            )
+
+        spool = get_outbox()
+        if spool is not None and len(spool):
+            # Earlier results are still spooled; queue behind them to keep order.
+            if not spool.put(bodies, destination):
+                raise OutboxFullError("outbox is full; results cannot be queued in order")
+            self._record(updates)
+            return
+
+        try:
+            self.send(bodies, destination, payload)
+        except Exception as e:
+            if spool is None:
+                raise
+            unsent, rejected = failed_indices(e, len(bodies))
+            if unsent and not spool.put([bodies[i] for i in unsent], destination):
+                raise
+            if rejected:
+                spool.quarantine([bodies[i] for i in rejected], destination, str(e))
+            safe_error(
+                "Publish failed, unsent results spooled to outbox",
+                {"error": str(e), "spooled": len(unsent), "rejected": len(rejected)},
+            )
+        self._record(updates)
+
+    def _record(self, updates: list[Update]) -> None:
+        """Remember published results in the last-value cache, if enabled.
+
+        Args:
+            updates (list[Update]): Updates returned by `LastValueCache.filter()`.
+
+        """
+        if self.last_values is not None and updates:
+            self.last_values.record(updates)
+
+    def send(
+        self,
+        bodies: list[bytes],
+        destination: Destination,
+        payload: list[dict[str, Any]] | None = None,
+        retry_failures: bool = True,
+    ) -> None:
+        """Send encoded messages with the configured queue type.
+
+        Args:
+            bodies (list[bytes]): Messages encoded with `codec.dumps`.
+            destination (Destination): Queue (or routing key) and exchange.
+            payload (Optional[list[dict[str, Any]]]): The decoded messages, for logging.
+            retry_failures (bool): Retry failed publishes with backoff; the outbox drain
+                makes a single attempt and tries again later.
+
+        Raises:
+            PartialPublishError: If some messages were published and others were not.
+
+        """
+        queue, exchange = destination
+        if self.queue_type == "sqs":
+            _send_batch_to_sqs(bodies, queue, SQS_SEND_ATTEMPTS if retry_failures else 1)
+            return
+
+        # Routes always have a key; an unset exchange is AMQP's default exchange.
+        routing_key, exchange_name = queue or "", exchange or ""
+        if self.confirms:
+            _send_confirmed_to_rabbitmq(bodies, routing_key, exchange_name)
+            return
+
+        if self.queue_type == "rabbitmq":
+            send_to_rabbitmq = _send_to_rabbitmq
+            if not retry_failures:
+                send_to_rabbitmq = _send_to_rabbitmq.retry_with(stop=stop_after_attempt(1))
+            for i, body in enumerate(bodies):
+                with _unsent_from(i, len(bodies)):
+                    send_to_rabbitmq(
+                        payload[i] if payload else None, body, routing_key, exchange_name
+                    )
+        elif self.queue_type == "fake":
+            send_to_fake = _send_to_fake
+            if not retry_failures:
+                send_to_fake = _send_to_fake.retry_with(stop=stop_after_attempt(1))
+            for i, body in enumerate(bodies):
+                with _unsent_from(i, len(bodies)):
+                    send_to_fake(body, routing_key)
+        else:
+            safe_error(
+                "Invalid QUEUE_TYPE",
+                {"queue_type": "[REDACTED]" if REDACT_SENSITIVE_LOGS else self.queue_type},
+            )
+
+
+@contextmanager
+def _unsent_from(index: int, count: int) -> Iterator[None]:
+    """Report which messages are unsent when publishing message `index` of `count` fails.
+
+    Args:
+        index (int): Position of the message being published.
+        count (int): Number of messages in the publish.
+
+    Raises:
+        PartialPublishError: If the publish fails after earlier messages were published.
+
+    """
+    try:
+        yield
+    except Exception as e:
+        if index == 0:
+            raise
+        raise PartialPublishError(str(e), list(range(index, count))) from e
+
+
+_publisher: Publisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> Publisher:
+    """Return the process-wide Publisher, creating it from configuration.
+
+    Returns:
+        Publisher: The shared publisher.
+
+    """
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = Publisher.from_config()
+        return _publisher
+
+
+def reset_publisher(publisher: Publisher | None = None) -> None:
+    """Replace the process-wide Publisher, e.g. after the configuration changes.
+
+    Args:
+        publisher (Optional[Publisher]): New publisher; None recreates it from
+            configuration on next use.
+
+    """
+    global _publisher
+    with _publisher_lock:
+        _publisher = publisher
 
 
 def publish_to_queue(
     payload: list[dict[str, Any]],
     queue: str | None = None,
     exchange: str | None = None,
+    encoded: list[bytes] | None = None,
 ) -> None:
     """Publish a batch of processed messages to the configured queue.
 
@@ -53,38 +490,142 @@ def publish_to_queue(
         payload (list[dict[str, Any]]): List of messages to send.
         queue (Optional[str]): Optional override for queue name or routing key.
         exchange (Optional[str]): Optional override for RabbitMQ exchange.
+        encoded (Optional[list[bytes]]): The messages already encoded with
+            `codec.dumps`, to avoid encoding them again.
 
     """
-    if not isinstance(payload, list):
-        safe_error("Invalid payload type", {"expected": "list", "got": str(type(payload).__name__)})
-        return
+    publisher = get_publisher()
+    route = publisher.default
+    if queue or exchange:
+        route = Route(
+            exchange or route.exchange, queue or route.key, templated=publisher.queue_type != "sqs"
+        )
+    publisher.publish(payload, route, encoded)
 
-    queue_type: str = config_shared.get_queue_type().lower()
 
-    for message in payload:
-        if queue_type == "rabbitmq":
-            _send_to_rabbitmq(message, queue, exchange)
-        elif queue_type == "sqs":
-            _send_to_sqs(message, queue)
-        else:
-            safe_error(
-                "Invalid QUEUE_TYPE",
-                {"queue_type": "[REDACTED]" if REDACT_SENSITIVE_LOGS else queue_type},
+def _send_spooled(bodies: list[bytes], destination: Destination) -> None:
+    """Publish results drained from the outbox, making a single attempt.
+
+    Args:
+        bodies (list[bytes]): Encoded results.
+        destination (Destination): Queue and exchange.
+
+    """
+    get_publisher().send(bodies, destination, retry_failures=False)
+
+
+_outbox: Outbox | None = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox | None:
+    """Return the process-wide outbox, opening it and starting its drain thread on first use.
+
+    Returns:
+        Optional[Outbox]: The outbox, or None if OUTBOX_ENABLED is off.
+
+    """
+    global _outbox
+    if not config_shared.get_outbox_enabled():
+        return None
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(
+                config_shared.get_outbox_path(),
+                _send_spooled,
+                max_bytes=config_shared.get_outbox_max_bytes(),
+                drain_interval_sec=config_shared.get_outbox_drain_interval(),
+                drain_batch=config_shared.get_outbox_drain_batch(),
+                max_attempts=config_shared.get_outbox_max_attempts(),
+            )
+            _outbox.start()
+        return _outbox
+
+
+_publish_buffer: PublishBuffer | None = None
+_publish_buffer_lock = threading.Lock()
+
+
+def get_publish_buffer() -> PublishBuffer:
+    """Return the process-wide batching publisher, creating it from configuration.
+
+    Returns:
+        PublishBuffer: The shared publish buffer.
+
+    """
+    global _publish_buffer
+    with _publish_buffer_lock:
+        if _publish_buffer is None:
+            _publish_buffer = PublishBuffer(
+                _publish_buffered,
+                max_messages=config_shared.get_publish_batch_max_messages(),
+                max_bytes=config_shared.get_publish_batch_max_bytes(),
+                linger_sec=config_shared.get_publish_linger_ms() / 1000,
+                capacity=config_shared.get_publish_buffer_capacity(),
+                attempts=config_shared.get_publish_retry_attempts(),
+                spill=_spill_buffered if config_shared.get_outbox_enabled() else None,
             )
+        return _publish_buffer
+
+
+def _publish_buffered(entries: list[tuple[dict[str, Any], bytes]], destination: Hashable) -> None:
+    """Publish a micro-batch from the publish buffer.
+
+    Args:
+        entries (list[tuple[dict[str, Any], bytes]]): Messages and their encodings.
+        destination (Hashable): Queue (or routing key) and exchange, as submitted.
+
+    """
+    get_publisher().publish_now(
+        [m for m, _ in entries], [b for _, b in entries], cast(Destination, destination)
+    )
+
+
+def _spill_buffered(entries: list[tuple[dict[str, Any], bytes]], destination: Hashable) -> None:
+    """Spool a micro-batch the publish buffer could not publish to the outbox.
+
+    Args:
+        entries (list[tuple[dict[str, Any], bytes]]): Messages and their encodings.
+        destination (Hashable): Queue (or routing key) and exchange, as submitted.
+
+    Raises:
+        RuntimeError: If the outbox is not enabled.
+        OutboxFullError: If the outbox has no room for the messages.
+
+    """
+    spool = get_outbox()
+    if spool is None:
+        raise RuntimeError("outbox is not enabled; buffered results dropped")
+    if not spool.put([b for _, b in entries], cast(Destination, destination)):
+        raise OutboxFullError("outbox is full; buffered results dropped")
+
+
+def flush_publish_buffer(timeout: float | None = None) -> bool:
+    """Publish every message still held by the batching publisher.
+
+    Args:
+        timeout (Optional[float]): Maximum seconds to wait.
+
+    Returns:
+        bool: True if nothing is left buffered.
+
+    """
+    with _publish_buffer_lock:
+        buffer = _publish_buffer
+    return buffer.flush(timeout) if buffer is not None else True
 
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10))
 def _send_to_rabbitmq(
-    data: dict[str, Any],
-    routing_key: str | None = None,
-    exchange: str | None = None,
+    data: dict[str, Any] | None, encoded: bytes, routing_key: str, exchange: str
 ) -> None:
-    """Send a single message to RabbitMQ.
+    """Send a single message to RabbitMQ over the shared publisher connection.
 
     Args:
-        data (dict[str, Any]): The message payload.
-        routing_key (Optional[str]): Optional routing key override.
-        exchange (Optional[str]): Optional exchange override.
+        data (Optional[dict[str, Any]]): The message payload, for logging.
+        encoded (bytes): The payload encoded with `codec.dumps`.
+        routing_key (str): Routing key, as resolved by the publish route.
+        exchange (str): Exchange, as resolved by the publish route.
 
     Raises:
         AMQPConnectionError: On RabbitMQ connection failure.
@@ -93,36 +634,24 @@ def _send_to_rabbitmq(
     """
     start: float = time.perf_counter()
     try:
-        credentials = pika.PlainCredentials(
-            config_shared.get_rabbitmq_user(),
-            config_shared.get_rabbitmq_password(),
-        )
-        parameters = pika.ConnectionParameters(
-            host=config_shared.get_rabbitmq_host(),
-            port=config_shared.get_rabbitmq_port(),
-            virtual_host=config_shared.get_rabbitmq_vhost(),
-            credentials=credentials,
-            blocked_connection_timeout=30,
+        body, encoding = compression.compress(encoded)
+        rabbitmq_publisher.get_publisher().publish(
+            exchange=exchange,
+            routing_key=routing_key,
+            body=body,
+            properties=pika.BasicProperties(
+                content_type="application/json", content_encoding=encoding
+            ),
         )
 
-        with pika.BlockingConnection(parameters) as connection:
-            channel = connection.channel()
-            resolved_exchange: str = exchange or config_shared.get_rabbitmq_exchange()
-            resolved_routing_key: str = routing_key or config_shared.get_rabbitmq_routing_key()
-            channel.basic_publish(
-                exchange=resolved_exchange,
-                routing_key=resolved_routing_key,
-                body=json.dumps(data, ensure_ascii=False),
-            )
-
         duration: float = time.perf_counter() - start
         queue_publish_counter.labels(queue_type="rabbitmq", status="success").inc()
         queue_publish_latency.labels(queue_type="rabbitmq", status="success").observe(duration)
         safe_info(
             "Published message to RabbitMQ",
             {
-                "exchange": resolved_exchange,
-                "routing_key": resolved_routing_key,
+                "exchange": exchange,
+                "routing_key": routing_key,
                 "duration": duration,
                 "message": data,
             },
@@ -144,71 +673,234 @@ def _send_to_rabbitmq(
         raise
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10))
-def _send_to_sqs(
-    data: dict[str, Any],
+def _send_confirmed_to_rabbitmq(bodies: list[bytes], routing_key: str, exchange: str) -> None:
+    """Send messages to RabbitMQ and wait until the broker confirms all of them.
+
+    Publishes are pipelined through the shared ConfirmingPublisher, so the wait
+    costs one round trip per batch rather than per message.
+
+    Args:
+        bodies (list[bytes]): Messages encoded with `codec.dumps`.
+        routing_key (str): Routing key, as resolved by the publish route.
+        exchange (str): Exchange, as resolved by the publish route.
+
+    Raises:
+        AMQPConnectionError: On RabbitMQ connection failure before any message is sent.
+        ConfirmFailedError: If any message is nacked, lost or not confirmed in time.
+
+    """
+    publisher = rabbitmq_publisher.get_confirming_publisher()
+
+    start: float = time.perf_counter()
+    futures = []
+    error: Exception | None = None
+    try:
+        for encoded in bodies:
+            body, encoding = compression.compress(encoded)
+            futures.append(
+                publisher.publish(
+                    exchange,
+                    routing_key,
+                    body,
+                    pika.BasicProperties(
+                        content_type="application/json",
+                        content_encoding=encoding,
+                        delivery_mode=pika.DeliveryMode.Persistent,
+                    ),
+                )
+            )
+    except Exception as e:
+        error = e
+    _, not_done = wait(futures, timeout=config_shared.get_rabbitmq_confirm_timeout())
+
+    duration: float = time.perf_counter() - start
+    unsent = [i for i, f in enumerate(futures) if f in not_done or f.exception() is not None]
+    failed = len(unsent)
+    confirmed = len(futures) - failed
+    if error is not None and not confirmed:
+        raise error
+    unsent.extend(range(len(futures), len(bodies)))
+    if confirmed:
+        queue_publish_counter.labels(queue_type="rabbitmq", status="success").inc(confirmed)
+        queue_publish_latency.labels(queue_type="rabbitmq", status="success").observe(duration)
+        safe_info(
+            "Published confirmed messages to RabbitMQ",
+            {
+                "exchange": exchange,
+                "routing_key": routing_key,
+                "count": confirmed,
+                "duration": duration,
+            },
+        )
+    if failed:
+        queue_publish_counter.labels(queue_type="rabbitmq", status="failure").inc(failed)
+        queue_publish_latency.labels(queue_type="rabbitmq", status="failure").observe(duration)
+        safe_error("RabbitMQ did not confirm messages", {"failed": failed, "duration": duration})
+    if unsent:
+        raise ConfirmFailedError(
+            f"{len(unsent)} of {len(bodies)} message(s) not confirmed by RabbitMQ", unsent
+        ) from error
+
+
+def _send_batch_to_sqs(
+    bodies: list[bytes],
     queue_name: str | None = None,
+    attempts: int = SQS_SEND_ATTEMPTS,
 ) -> None:
-    """Send a single message to AWS SQS.
+    """Send messages to AWS SQS with `send_message_batch`.
+
+    Messages are packed into requests of up to 10 entries and 256 KB. Entries
+    SQS fails because of a server-side error are retried with exponential
+    backoff; entries it rejects as invalid are not.
 
     Args:
-        data (dict[str, Any]): The message payload.
+        bodies (list[bytes]): Messages encoded with `codec.dumps`.
         queue_name (Optional[str]): Optional override for SQS queue URL.
+        attempts (int): Maximum attempts for entries that fail server-side.
 
     Raises:
-        BotoCoreError: On SQS client error.
-        NoCredentialsError: If AWS credentials are not available.
-        SQSMessageSendError: If HTTP response code is not 200.
-        Exception: On publish failure.
+        SQSMessageSendError: If entries still fail after every attempt, or are rejected.
 
     """
     sqs_url: str = queue_name or config_shared.get_sqs_queue_url()
-    region: str = config_shared.get_sqs_region()
+    sqs_client = aws_clients.get_client("sqs", config_shared.get_sqs_region())
 
-    start: float = time.perf_counter()
-    try:
-        sqs_client = boto3.client("sqs", region_name=region)
-        response = sqs_client.send_message(
-            QueueUrl=sqs_url,
-            MessageBody=json.dumps(data, ensure_ascii=False),
+    pending: list[dict[str, Any]] = []
+    for i, encoded in enumerate(bodies):
+        body, encoding = compression.compress_text(encoded)
+        pending.append(
+            {
+                "Id": str(i),
+                "MessageBody": body,
+                "MessageAttributes": compression.sqs_encoding_attributes(encoding),
+            }
         )
 
-        status_code: int = response["ResponseMetadata"]["HTTPStatusCode"]
-        duration: float = time.perf_counter() - start
+    rejected: list[int] = []
+    for attempt in range(1, attempts + 1):
+        failed: list[dict[str, Any]] = []
+        for chunk in _sqs_batches(pending):
+            failures, permanent = _send_sqs_chunk(sqs_client, sqs_url, chunk)
+            failed.extend(failures)
+            rejected.extend(permanent)
+        pending = failed
+        if not pending:
+            break
+        if attempt < attempts:
+            time.sleep(min(2**attempt, 10))
+    else:
+        safe_error(
+            "Failed to publish messages to SQS",
+            {"failed": len(pending), "queue_url": sqs_url},
+        )
 
-        if status_code != 200:
-            queue_publish_counter.labels(queue_type="sqs", status="failure").inc()
-            queue_publish_latency.labels(queue_type="sqs", status="failure").observe(duration)
-            safe_error(
-                "Failed to publish message to SQS",
-                {
-                    "http_status": status_code,
-                    "duration": duration,
-                    "queue_url": sqs_url,
-                },
-            )
-            raise SQSMessageSendError(f"SQS returned HTTP status {status_code}")
+    if pending or rejected:
+        raise SQSMessageSendError(
+            f"{len(pending)} message(s) could not be published to SQS,"
+            f" {len(rejected)} rejected",
+            sorted(int(entry["Id"]) for entry in pending),
+            sorted(rejected),
+        )
+
+
+def _send_sqs_chunk(
+    sqs_client: Any, sqs_url: str, chunk: list[dict[str, Any]]
+) -> tuple[list[dict[str, Any]], list[int]]:
+    """Send one `send_message_batch` request.
+
+    Args:
+        sqs_client: boto3 SQS client.
+        sqs_url (str): Queue URL.
+        chunk (list[dict[str, Any]]): Entries, with their index in the publish as ID.
+
+    Returns:
+        tuple[list[dict[str, Any]], list[int]]: Entries worth retrying, and the
+            indices of the entries rejected permanently.
 
-        queue_publish_counter.labels(queue_type="sqs", status="success").inc()
+    """
+    start: float = time.perf_counter()
+    try:
+        response = sqs_client.send_message_batch(QueueUrl=sqs_url, Entries=chunk)
+    except (BotoCoreError, ClientError) as e:
+        duration: float = time.perf_counter() - start
+        queue_publish_counter.labels(queue_type="sqs", status="failure").inc(len(chunk))
+        queue_publish_latency.labels(queue_type="sqs", status="failure").observe(duration)
+        safe_error("SQS client error", {"error": str(e), "duration": duration})
+        return chunk, []
+
+    duration = time.perf_counter() - start
+    sent = len(response.get("Successful", []))
+    entries = {entry["Id"]: entry for entry in chunk}
+    retryable: list[dict[str, Any]] = []
+    permanent: list[int] = []
+    for failure in response.get("Failed", []):
+        if failure.get("SenderFault"):
+            permanent.append(int(failure["Id"]))
+            safe_error("SQS rejected message", {"code": failure.get("Code"), "queue_url": sqs_url})
+        else:
+            retryable.append(entries[failure["Id"]])
+
+    if sent:
+        queue_publish_counter.labels(queue_type="sqs", status="success").inc(sent)
         queue_publish_latency.labels(queue_type="sqs", status="success").observe(duration)
         safe_info(
-            "Published message to SQS",
-            {
-                "queue_url": sqs_url,
-                "duration": duration,
-                "message": data,
-            },
+            "Published messages to SQS",
+            {"queue_url": sqs_url, "count": sent, "duration": duration},
         )
+    if retryable or permanent:
+        queue_publish_counter.labels(queue_type="sqs", status="failure").inc(
+            len(retryable) + len(permanent)
+        )
+    return retryable, permanent
 
-    except (BotoCoreError, NoCredentialsError) as e:
-        duration = time.perf_counter() - start
-        queue_publish_counter.labels(queue_type="sqs", status="failure").inc()
-        queue_publish_latency.labels(queue_type="sqs", status="failure").observe(duration)
-        safe_error("SQS client error", {"error": str(e), "duration": duration})
-        raise
+
+def _sqs_batches(entries: list[dict[str, Any]]) -> Iterator[list[dict[str, Any]]]:
+    """Split SQS entries into chunks that fit in one batch request.
+
+    Args:
+        entries (list[dict[str, Any]]): Entries to split.
+
+    Yields:
+        list[dict[str, Any]]: Up to 10 entries totalling at most 256 KB of body.
+
+    """
+    chunk: list[dict[str, Any]] = []
+    size = 0
+    for entry in entries:
+        body_size = len(entry["MessageBody"].encode("utf-8"))
+        if chunk and (
+            len(chunk) == SQS_MAX_BATCH_ENTRIES or size + body_size > SQS_MAX_BATCH_BYTES
+        ):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(entry)
+        size += body_size
+    if chunk:
+        yield chunk
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10))
+def _send_to_fake(encoded: bytes, queue_name: str) -> None:
+    """Send a single message to the in-process fake broker.
+
+    Args:
+        encoded (bytes): The message encoded with `codec.dumps`.
+        queue_name (str): Queue, as resolved by the publish route.
+
+    Raises:
+        Exception: On an injected connection drop or throttling error.
+
+    """
+    start: float = time.perf_counter()
+    try:
+        fake_broker.get_broker().publish(queue_name, encoded)
     except Exception as e:
-        duration = time.perf_counter() - start
-        queue_publish_counter.labels(queue_type="sqs", status="exception").inc()
-        queue_publish_latency.labels(queue_type="sqs", status="exception").observe(duration)
-        safe_error("Unhandled error during SQS publish", {"error": str(e), "duration": duration})
+        duration: float = time.perf_counter() - start
+        queue_publish_counter.labels(queue_type="fake", status="failure").inc()
+        queue_publish_latency.labels(queue_type="fake", status="failure").observe(duration)
+        safe_error("Fake broker publish error", {"error": str(e), "duration": duration})
         raise
+
+    duration = time.perf_counter() - start
+    queue_publish_counter.labels(queue_type="fake", status="success").inc()
+    queue_publish_latency.labels(queue_type="fake", status="success").observe(duration)
@@ -0,0 +1,469 @@
+"""Long-lived RabbitMQ publisher connections.
+
+Opening a connection costs a TCP and AMQP handshake, which used to happen for
+every published message. `RabbitMQPublisher` instead keeps one connection and
+channel per thread (pika's BlockingConnection is not thread-safe) and reuses
+them across publishes. Pending heartbeats are serviced before each publish,
+and a publish that fails because the connection or channel was lost is
+retried once on a fresh connection. Connections are also reopened after a
+fork, so supervised consumer processes never share a socket.
+
+With RABBITMQ_PUBLISHER_CONFIRMS, `ConfirmingPublisher` is used instead. It
+runs an asynchronous connection on a background I/O thread and returns a
+future per publish that resolves when the broker confirms it. Publishes are
+pipelined up to a window of unconfirmed messages, so confirmation costs
+no round trip per message.
+"""
+
+import functools
+import os
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any
+
+import pika
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPChannelError, AMQPConnectionError
+
+from app import config_shared
+from app.utils.metrics import (
+    rabbitmq_publish_confirms_total,
+    rabbitmq_publisher_connections_total,
+    rabbitmq_unconfirmed_publishes,
+)
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CONNECTION_ERRORS = (AMQPConnectionError, AMQPChannelError)
+
+
+def connection_parameters() -> pika.ConnectionParameters:
+    """Build publisher connection parameters from configuration.
+
+    Returns:
+        pika.ConnectionParameters: Parameters for the configured broker.
+
+    """
+    return pika.ConnectionParameters(
+        host=config_shared.get_rabbitmq_host(),
+        port=config_shared.get_rabbitmq_port(),
+        virtual_host=config_shared.get_rabbitmq_vhost(),
+        credentials=pika.PlainCredentials(
+            config_shared.get_rabbitmq_user(),
+            config_shared.get_rabbitmq_password(),
+        ),
+        heartbeat=config_shared.get_rabbitmq_heartbeat(),
+        blocked_connection_timeout=config_shared.get_rabbitmq_blocked_connection_timeout(),
+    )
+
+
+class _Session:
+    """A connection and channel owned by one thread of one process."""
+
+    __slots__ = ("channel", "connection", "pid")
+
+    def __init__(self, connection: pika.BlockingConnection, channel: BlockingChannel) -> None:
+        """Initialize a _Session.
+
+        Args:
+            connection (pika.BlockingConnection): Open connection.
+            channel (BlockingChannel): Open channel on the connection.
+
+        """
+        self.connection = connection
+        self.channel = channel
+        self.pid = os.getpid()
+
+
+class RabbitMQPublisher:
+    """Publishes messages over per-thread, reconnecting connections."""
+
+    def __init__(self, parameters: pika.ConnectionParameters) -> None:
+        """Initialize a RabbitMQPublisher.
+
+        Args:
+            parameters (pika.ConnectionParameters): Broker connection parameters.
+
+        """
+        self._parameters = parameters
+        self._local = threading.local()
+        self._sessions: list[_Session] = []
+        self._lock = threading.Lock()
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: pika.BasicProperties | None = None,
+    ) -> None:
+        """Publish one message, reconnecting once if the connection was lost.
+
+        Args:
+            exchange (str): Exchange to publish to.
+            routing_key (str): Routing key.
+            body (bytes): Message body.
+            properties (Optional[pika.BasicProperties]): Message properties.
+
+        Raises:
+            AMQPConnectionError: If the broker cannot be reached.
+            AMQPChannelError: If the publish fails on a fresh channel.
+
+        """
+        try:
+            self._channel().basic_publish(exchange, routing_key, body, properties)
+        except CONNECTION_ERRORS:
+            logger.warning("🔁 RabbitMQ publisher connection lost, reconnecting")
+            self._discard()
+            self._channel().basic_publish(exchange, routing_key, body, properties)
+
+    def close(self) -> None:
+        """Close every connection opened by this publisher in this process."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            if session.pid == os.getpid():
+                _close_quietly(session.connection)
+
+    def _channel(self) -> BlockingChannel:
+        """Return this thread's open channel, connecting if needed.
+
+        Returns:
+            BlockingChannel: Channel ready for publishing.
+
+        """
+        session: _Session | None = getattr(self._local, "session", None)
+        if session is not None and session.pid == os.getpid():
+            try:
+                if session.connection.is_open and session.channel.is_open:
+                    # Answer broker heartbeats that arrived while the connection was idle.
+                    session.connection.process_data_events(time_limit=0)
+                    return session.channel
+            except CONNECTION_ERRORS:
+                logger.warning("🔁 RabbitMQ publisher connection went stale, reconnecting")
+            self._discard()
+
+        connection = pika.BlockingConnection(self._parameters)
+        session = _Session(connection, connection.channel())
+        rabbitmq_publisher_connections_total.inc()
+        self._local.session = session
+        with self._lock:
+            self._sessions.append(session)
+        return session.channel
+
+    def _discard(self) -> None:
+        """Drop this thread's session so the next publish reconnects."""
+        session: _Session | None = getattr(self._local, "session", None)
+        self._local.session = None
+        if session is None:
+            return
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        if session.pid == os.getpid():
+            _close_quietly(session.connection)
+
+
+def _close_quietly(connection: Any) -> None:
+    """Close a connection, ignoring errors from one that is already broken.
+
+    Args:
+        connection: pika connection.
+
+    """
+    try:
+        if connection.is_open:
+            connection.close()
+    except Exception:
+        logger.debug("Ignoring error while closing RabbitMQ publisher connection")
+
+
+class PublishNotConfirmedError(Exception):
+    """Raised when the broker does not confirm a publish."""
+
+
+class ConfirmingPublisher:
+    """Publishes with pipelined publisher confirms over a background I/O thread."""
+
+    def __init__(
+        self, parameters: pika.ConnectionParameters, window: int, timeout_sec: float
+    ) -> None:
+        """Initialize a ConfirmingPublisher.
+
+        Args:
+            parameters (pika.ConnectionParameters): Broker connection parameters.
+            window (int): Maximum number of unconfirmed publishes.
+            timeout_sec (float): Seconds to wait for a connection or a free window slot.
+
+        Raises:
+            ValueError: If window is non-positive.
+
+        """
+        if window <= 0:
+            raise ValueError("window must be greater than 0")
+
+        self._parameters = parameters
+        self._timeout_sec = timeout_sec
+        self._window_size = window
+        self._window = threading.BoundedSemaphore(window)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+        self._connection: Any = None
+        self._channel: Any = None
+        self._pending: dict[int, Future[None]] = {}
+        # Futures of publishes scheduled on the current connection and not yet
+        # settled; failed together when the connection goes away, including
+        # publishes whose callback never ran on the I/O thread.
+        self._submitted: set[Future[None]] = set()
+        self._next_tag = 1
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: pika.BasicProperties | None = None,
+    ) -> Future[None]:
+        """Publish one message without waiting for its confirm.
+
+        Blocks while the window of unconfirmed publishes is full.
+
+        Args:
+            exchange (str): Exchange to publish to.
+            routing_key (str): Routing key.
+            body (bytes): Message body.
+            properties (Optional[pika.BasicProperties]): Message properties.
+
+        Returns:
+            Future[None]: Resolves to None once the broker confirms the message; fails with
+                PublishNotConfirmedError if it is nacked or the connection is lost first.
+
+        Raises:
+            AMQPConnectionError: If the broker cannot be reached.
+            PublishNotConfirmedError: If no window slot frees up in time.
+
+        """
+        connection = self._ensure_connected()
+        if not self._window.acquire(timeout=self._timeout_sec):
+            raise PublishNotConfirmedError("timed out waiting for unconfirmed publishes")
+
+        future: Future[None] = Future()
+        future.add_done_callback(self._release)
+        rabbitmq_unconfirmed_publishes.inc()
+        with self._lock:
+            live = connection is self._connection and self._channel is not None
+            if live:
+                self._submitted.add(future)
+        if not live:
+            _fail(future, "confirm connection closed")
+            return future
+        try:
+            connection.ioloop.add_callback_threadsafe(
+                functools.partial(self._publish, exchange, routing_key, body, properties, future)
+            )
+        except Exception as e:
+            _fail(future, f"publish not scheduled: {e}")
+        return future
+
+    def close(self) -> None:
+        """Close the connection once outstanding confirms have been handled."""
+        with self._lock:
+            connection, thread = self._connection, self._thread
+        if connection is None or thread is None or self._pid != os.getpid():
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(connection.close)
+        except Exception:
+            logger.debug("Ignoring error while closing RabbitMQ confirm connection")
+        thread.join(self._timeout_sec)
+
+    def _release(self, future: Future[None]) -> None:
+        """Free the window slot of a settled publish."""
+        with self._lock:
+            self._submitted.discard(future)
+        rabbitmq_unconfirmed_publishes.dec()
+        self._window.release()
+
+    def _ensure_connected(self) -> Any:
+        """Start the I/O thread if needed and wait until the channel is in confirm mode.
+
+        Returns:
+            pika.SelectConnection: The open connection.
+
+        Raises:
+            AMQPConnectionError: If the connection cannot be opened in time.
+
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited from the parent process: start over in this child.
+                self._pid, self._thread, self._connection = os.getpid(), None, None
+                self._pending, self._submitted = {}, set()
+                self._ready = threading.Event()
+                self._window = threading.BoundedSemaphore(self._window_size)
+            if self._thread is None or not self._thread.is_alive():
+                self._ready.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="rabbitmq-confirms", daemon=True
+                )
+                self._thread.start()
+            ready = self._ready
+        if not ready.wait(self._timeout_sec) or self._channel is None:
+            raise AMQPConnectionError("RabbitMQ confirm channel is not available")
+        return self._connection
+
+    def _run(self) -> None:
+        """I/O thread: open the connection and run its event loop until it closes."""
+        connection = pika.SelectConnection(
+            self._parameters,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+        )
+        self._connection = connection
+        rabbitmq_publisher_connections_total.inc()
+        try:
+            connection.ioloop.start()
+        finally:
+            with self._lock:
+                self._channel = None
+            self._fail_pending("connection closed")
+            self._ready.set()
+
+    def _on_connection_open(self, connection: Any) -> None:
+        """Open the publishing channel."""
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection: Any, error: Exception) -> None:
+        """Stop the event loop when the connection cannot be opened."""
+        logger.error("❌ RabbitMQ confirm connection failed: %s", error)
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection: Any, reason: Exception) -> None:
+        """Stop the event loop once the connection is closed."""
+        logger.warning("🔁 RabbitMQ confirm connection closed: %s", reason)
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel: Any) -> None:
+        """Put the new channel in confirm mode."""
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            ack_nack_callback=self._on_confirm,
+            callback=lambda frame: self._on_confirm_mode(channel),
+        )
+
+    def _on_confirm_mode(self, channel: Any) -> None:
+        """Start accepting publishes once the broker has enabled confirms."""
+        self._next_tag = 1
+        self._channel = channel
+        self._ready.set()
+
+    def _on_channel_closed(self, channel: Any, reason: Exception) -> None:
+        """Fail unconfirmed publishes and close the connection with the channel."""
+        with self._lock:
+            self._channel = None
+        self._fail_pending(f"channel closed: {reason}")
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: pika.BasicProperties | None,
+        future: Future[None],
+    ) -> None:
+        """Publish on the I/O thread and remember the delivery tag to confirm."""
+        if future.done():
+            return
+        if self._channel is None:
+            _fail(future, "confirm channel is closed")
+            return
+        self._pending[self._next_tag] = future
+        self._next_tag += 1
+        self._channel.basic_publish(exchange, routing_key, body, properties)
+
+    def _on_confirm(self, frame: Any) -> None:
+        """Resolve the futures covered by a broker ack or nack."""
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        result = "ack" if acked else "nack"
+        for tag in tags:
+            future = self._pending.pop(tag, None)
+            if future is None:
+                continue
+            rabbitmq_publish_confirms_total.labels(result=result).inc()
+            if acked:
+                future.set_result(None)
+            else:
+                future.set_exception(PublishNotConfirmedError("publish nacked by broker"))
+
+    def _fail_pending(self, reason: str) -> None:
+        """Fail every unsettled publish, e.g. after the connection is lost."""
+        with self._lock:
+            submitted, self._submitted = self._submitted, set()
+        pending, self._pending = self._pending, {}
+        for future in submitted.union(pending.values()):
+            if not future.done():
+                rabbitmq_publish_confirms_total.labels(result="lost").inc()
+                _fail(future, reason)
+
+
+def _fail(future: Future[None], reason: str) -> None:
+    """Fail a publish future unless it is already settled.
+
+    Args:
+        future (Future[None]): Future of the publish.
+        reason (str): Why the publish is not confirmed.
+
+    """
+    try:
+        future.set_exception(PublishNotConfirmedError(reason))
+    except InvalidStateError:
+        pass
+
+
+_publisher: RabbitMQPublisher | None = None
+_confirming_publisher: ConfirmingPublisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> RabbitMQPublisher:
+    """Return the process-wide RabbitMQPublisher, creating it from configuration.
+
+    Returns:
+        RabbitMQPublisher: The shared publisher.
+
+    """
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = RabbitMQPublisher(connection_parameters())
+        return _publisher
+
+
+def get_confirming_publisher() -> ConfirmingPublisher:
+    """Return the process-wide ConfirmingPublisher, creating it from configuration.
+
+    Returns:
+        ConfirmingPublisher: The shared confirming publisher.
+
+    """
+    global _confirming_publisher
+    with _publisher_lock:
+        if _confirming_publisher is None:
+            _confirming_publisher = ConfirmingPublisher(
+                connection_parameters(),
+                window=config_shared.get_rabbitmq_confirm_window(),
+                timeout_sec=config_shared.get_rabbitmq_confirm_timeout(),
+            )
+        return _confirming_publisher
@@ -0,0 +1,146 @@
+"""Typed decoding of Ichimoku analysis request messages.
+
+A request carries a `symbol`, a `timestamp`, an optional `timeframe`, and OHLC
+history in `data`, either as a list of bar dicts or as a dict of columns.
+`decode_request()` validates the message while copying the High/Low/Close
+prices into NumPy arrays, so validation is a byproduct of decoding and the
+message is walked only once.
+"""
+
+from typing import Any
+
+import numpy as np
+
+PRICE_FIELDS = ("High", "Low", "Close")
+
+
+class SchemaError(ValueError):
+    """Raised when a message does not match the Ichimoku request schema."""
+
+
+class IchimokuRequest:
+    """Decoded Ichimoku request with NumPy-ready price arrays."""
+
+    __slots__ = ("bars", "close", "high", "low", "symbol", "timeframe", "timestamp")
+
+    def __init__(
+        self,
+        symbol: str,
+        timestamp: Any,
+        timeframe: str | None,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        bars: list[dict[str, Any]] | None = None,
+    ) -> None:
+        """Initialize an IchimokuRequest.
+
+        Args:
+            symbol (str): Ticker symbol.
+            timestamp (Any): Request timestamp, passed through unchanged.
+            timeframe (Optional[str]): Bar timeframe, if provided.
+            high (np.ndarray): High prices as float64.
+            low (np.ndarray): Low prices as float64.
+            close (np.ndarray): Close prices as float64.
+            bars (Optional[list[dict[str, Any]]]): Original bar dicts, kept so that
+                extra columns can be echoed in the output.
+
+        """
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.timeframe = timeframe
+        self.high = high
+        self.low = low
+        self.close = close
+        self.bars = bars
+
+    def __len__(self) -> int:
+        """Return the number of bars."""
+        return len(self.close)
+
+
+def decode_request(message: Any) -> IchimokuRequest:
+    """Validate and decode a request message in a single pass.
+
+    Args:
+        message (Any): Decoded JSON message.
+
+    Returns:
+        IchimokuRequest: The decoded request.
+
+    Raises:
+        SchemaError: If a required field is missing or has the wrong type.
+
+    """
+    if not isinstance(message, dict):
+        raise SchemaError("message must be an object")
+
+    symbol = message.get("symbol")
+    if not isinstance(symbol, str) or not symbol:
+        raise SchemaError("'symbol' must be a non-empty string")
+    if "timestamp" not in message:
+        raise SchemaError("'timestamp' is required")
+    timeframe = message.get("timeframe")
+    if timeframe is not None and not isinstance(timeframe, str):
+        raise SchemaError("'timeframe' must be a string")
+
+    data = message.get("data")
+    if isinstance(data, list):
+        high, low, close = _decode_bars(data)
+        bars = data
+    elif isinstance(data, dict):
+        high, low, close = _decode_columns(data)
+        bars = None
+    else:
+        raise SchemaError("'data' must be a list of bars or a dict of columns")
+
+    return IchimokuRequest(symbol, message["timestamp"], timeframe, high, low, close, bars)
+
+
+def _decode_bars(bars: list[Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Copy High/Low/Close from row-oriented bars into arrays.
+
+    Args:
+        bars (list[Any]): List of bar dicts.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: High, low and close prices.
+
+    Raises:
+        SchemaError: If a bar is not a dict or lacks a numeric price field.
+
+    """
+    n = len(bars)
+    high = np.empty(n, dtype=np.float64)
+    low = np.empty(n, dtype=np.float64)
+    close = np.empty(n, dtype=np.float64)
+    try:
+        for i, bar in enumerate(bars):
+            high[i] = bar["High"]
+            low[i] = bar["Low"]
+            close[i] = bar["Close"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise SchemaError(f"bar {i} must contain numeric {', '.join(PRICE_FIELDS)}") from e
+    return high, low, close
+
+
+def _decode_columns(columns: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert column-oriented High/Low/Close lists into arrays.
+
+    Args:
+        columns (dict[str, Any]): Mapping of column name to list of values.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: High, low and close prices.
+
+    Raises:
+        SchemaError: If a price column is missing, non-numeric, or of unequal length.
+
+    """
+    try:
+        high, low, close = (np.asarray(columns[f], dtype=np.float64) for f in PRICE_FIELDS)
+    except (KeyError, TypeError, ValueError) as e:
+        raise SchemaError(f"'data' must contain numeric {', '.join(PRICE_FIELDS)} columns") from e
+    if not high.ndim == low.ndim == close.ndim == 1 or not len(high) == len(low) == len(close):
+        raise SchemaError("price columns must be flat lists of equal length")
+    return high, low, close
@@ -0,0 +1,233 @@
+"""Multi-process consumer supervisor.
+
+A single Python process uses roughly one core, so with CONSUMER_PROCESSES > 1
+`main.main()` forks that many consumer processes instead of consuming
+in-process. Each child opens its own broker connection. The supervisor
+restarts children that crash (with exponential backoff), forwards SIGTERM
+so children drain on shutdown, and reports aggregate health.
+
+Prometheus metrics from all children are aggregated when the service is
+started with PROMETHEUS_MULTIPROC_DIR pointing at an empty writable
+directory (it must be set before the process starts, as prometheus_client
+reads it at import time); the supervisor then serves the combined registry
+on METRICS_PORT.
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from multiprocessing.process import BaseProcess
+from types import FrameType
+
+from prometheus_client import CollectorRegistry, multiprocess
+
+from app import config_shared
+from app.utils import healthcheck
+from app.utils.metrics import consumer_processes_alive, consumer_restarts_total
+from app.utils.metrics_server import start_metrics_server
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MAX_RESTART_BACKOFF_SEC = 30
+STABLE_RUN_SEC = 60
+SHUTDOWN_GRACE_SEC = 10
+
+
+class Supervisor:
+    """Forks consumer processes and keeps them running."""
+
+    def __init__(
+        self, target: Callable[[], None], processes: int, max_consecutive_failures: int = 5
+    ) -> None:
+        """Initialize a Supervisor.
+
+        Args:
+            target (Callable[[], None]): Consumer entry point run in each child.
+            processes (int): Number of consumer processes.
+            max_consecutive_failures (int): Quick crashes of one child after which the
+                service is reported unhealthy, until the child runs stably again.
+
+        Raises:
+            ValueError: If processes is non-positive.
+
+        """
+        if processes <= 0:
+            raise ValueError("processes must be greater than 0")
+
+        self._target = target
+        self._max_consecutive_failures = max_consecutive_failures
+        self._context = multiprocessing.get_context("fork")
+        self._children: list[BaseProcess | None] = [None] * processes
+        self._started_at = [0.0] * processes
+        self._restart_at = [0.0] * processes
+        self._failures = [0] * processes
+        self._finished = [False] * processes
+        self._stopping = threading.Event()
+
+    def run(self) -> int:
+        """Start the children and supervise them until shutdown.
+
+        Returns:
+            int: Process exit code; non-zero if a child was still crash-looping at
+                shutdown.
+
+        """
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        self._start_metrics_server()
+
+        for slot in range(len(self._children)):
+            self._start(slot)
+        healthcheck.set_ready()
+        logger.info("🚀 Supervising %d consumer process(es)", len(self._children))
+
+        while not self._stopping.is_set() and not all(self._finished):
+            self._check_children()
+            self._stopping.wait(1)
+
+        self._stop_children(config_shared.get_drain_timeout() + SHUTDOWN_GRACE_SEC)
+        return 1 if any(map(self._crash_looping, range(len(self._children)))) else 0
+
+    def _request_stop(self, signum: int, frame: FrameType | None) -> None:
+        """Signal handler: stop supervising and shut the children down."""
+        logger.info("🛑 Shutdown signal received, stopping consumer processes...")
+        self._stopping.set()
+
+    def _start(self, slot: int) -> None:
+        """Fork the consumer process for one slot.
+
+        Args:
+            slot (int): Child index.
+
+        """
+        child = self._context.Process(target=self._target, name=f"consumer-{slot}")
+        child.start()
+        self._children[slot] = child
+        self._started_at[slot] = time.monotonic()
+        logger.info("👶 Started consumer process %d (pid %s)", slot, child.pid)
+        self._update_alive()
+
+    def _crash_looping(self, slot: int) -> bool:
+        """Check whether a child has crashed too many times in a row.
+
+        Args:
+            slot (int): Child index.
+
+        Returns:
+            bool: True if the child reached max_consecutive_failures quick crashes.
+
+        """
+        return self._failures[slot] >= self._max_consecutive_failures
+
+    def _check_children(self) -> None:
+        """Restart crashed children once their backoff has elapsed.
+
+        A child that has run for STABLE_RUN_SEC since its last restart has its
+        failure count cleared, and health is restored once no child is
+        crash-looping.
+        """
+        now = time.monotonic()
+        for slot, child in enumerate(self._children):
+            if self._finished[slot]:
+                continue
+            if child is not None and child.is_alive():
+                if self._failures[slot] and now - self._started_at[slot] >= STABLE_RUN_SEC:
+                    self._recovered(slot)
+                continue
+
+            if child is not None:
+                self._reap(child)
+                self._children[slot] = None
+                if child.exitcode == 0:
+                    logger.info("✅ Consumer process %d finished", slot)
+                    self._finished[slot] = True
+                    self._failures[slot] = 0
+                    continue
+
+                if now - self._started_at[slot] >= STABLE_RUN_SEC:
+                    self._failures[slot] = 0
+                self._failures[slot] += 1
+                backoff = min(2 ** (self._failures[slot] - 1), MAX_RESTART_BACKOFF_SEC)
+                self._restart_at[slot] = now + backoff
+                logger.error(
+                    "❌ Consumer process %d exited with code %s; restarting in %ds",
+                    slot,
+                    child.exitcode,
+                    backoff,
+                )
+                if self._failures[slot] >= self._max_consecutive_failures:
+                    healthcheck.set_unhealthy()
+
+            if now >= self._restart_at[slot]:
+                consumer_restarts_total.inc()
+                self._start(slot)
+        self._update_alive()
+
+    def _recovered(self, slot: int) -> None:
+        """Clear a stably running child's failures and restore health if possible.
+
+        Args:
+            slot (int): Child index.
+
+        """
+        was_crash_looping = self._crash_looping(slot)
+        self._failures[slot] = 0
+        logger.info("✅ Consumer process %d is running stably again", slot)
+        if was_crash_looping and not any(map(self._crash_looping, range(len(self._children)))):
+            healthcheck.set_healthy()
+
+    def _stop_children(self, timeout: float) -> None:
+        """Ask every child to drain and exit, killing those that outlive the timeout.
+
+        Args:
+            timeout (float): Seconds to wait for the children to exit.
+
+        """
+        live = [child for child in self._children if child is not None and child.is_alive()]
+        for child in live:
+            child.terminate()
+
+        deadline = time.monotonic() + timeout
+        for child in live:
+            child.join(max(0.0, deadline - time.monotonic()))
+            if child.is_alive():
+                logger.warning("⚠️ Consumer process %s did not drain in time; killing", child.pid)
+                child.kill()
+                child.join()
+            self._reap(child)
+        self._update_alive()
+        logger.info("🛑 All consumer processes stopped.")
+
+    def _reap(self, child: BaseProcess) -> None:
+        """Release per-process metric files of an exited child.
+
+        Args:
+            child (BaseProcess): Exited child process.
+
+        """
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR") and child.pid is not None:
+            # prometheus_client leaves its multiprocess helpers unannotated.
+            multiprocess.mark_process_dead(child.pid)  # type: ignore[no-untyped-call]
+
+    def _update_alive(self) -> None:
+        """Export the number of running children."""
+        consumer_processes_alive.set(
+            sum(child is not None and child.is_alive() for child in self._children)
+        )
+
+    def _start_metrics_server(self) -> None:
+        """Serve metrics aggregated across children when multiprocess mode is set up."""
+        if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            logger.warning(
+                "⚠️ PROMETHEUS_MULTIPROC_DIR is not set; consumer metrics are not aggregated"
+            )
+            start_metrics_server()
+            return
+        registry = CollectorRegistry()
+        # prometheus_client leaves its multiprocess helpers unannotated.
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        start_metrics_server(registry)
@@ -0,0 +1,96 @@
+"""Adaptive batch sizing using additive-increase / multiplicative-decrease (AIMD).
+
+The controller grows the batch size while full batches finish within the
+target latency and halves it as soon as a batch overruns, so the pipeline
+stays full at quiet times and under heavy load without breaching the target.
+"""
+
+import threading
+
+from app.utils.metrics import adaptive_batch_size
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AdaptiveBatchController:
+    """Thread-safe AIMD controller for batch and prefetch sizes."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_size: int,
+        max_size: int,
+        target_latency_sec: float,
+        increase_step: int = 1,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        """Initialize a new AdaptiveBatchController.
+
+        Args:
+            initial (int): Starting batch size (clamped to the bounds).
+            min_size (int): Lower bound for the batch size.
+            max_size (int): Upper bound for the batch size.
+            target_latency_sec (float): Maximum acceptable time to process one batch.
+            increase_step (int): Amount added after a full batch meets the target.
+            decrease_factor (float): Multiplier applied after a batch overruns the target.
+
+        Raises:
+            ValueError: If the bounds, target, step or factor are invalid.
+
+        """
+        if min_size <= 0 or max_size < min_size:
+            raise ValueError("batch size bounds must satisfy 0 < min_size <= max_size")
+        if target_latency_sec <= 0:
+            raise ValueError("target_latency_sec must be greater than 0")
+        if increase_step <= 0:
+            raise ValueError("increase_step must be greater than 0")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency_sec = target_latency_sec
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._size = min(max(initial, min_size), max_size)
+        self._lock = threading.Lock()
+        adaptive_batch_size.set(self._size)
+
+    @property
+    def batch_size(self) -> int:
+        """Return the current batch size."""
+        return self._size
+
+    def observe(self, processed: int, duration_sec: float) -> int:
+        """Feed back the outcome of one batch and adjust the batch size.
+
+        The batch size only grows after a full batch, since a partial batch says
+        nothing about spare capacity, and never beyond the size the measured
+        per-message time predicts would still meet the target.
+
+        Args:
+            processed (int): Number of messages in the batch.
+            duration_sec (float): Time to process and publish the batch.
+
+        Returns:
+            int: The updated batch size.
+
+        """
+        if processed <= 0:
+            return self._size
+
+        with self._lock:
+            previous = self._size
+            if duration_sec > self.target_latency_sec:
+                self._size = max(self.min_size, int(self._size * self._decrease_factor))
+            elif processed >= self._size:
+                per_message = duration_sec / processed
+                candidate = min(self.max_size, self._size + self._increase_step)
+                if per_message * candidate <= self.target_latency_sec:
+                    self._size = candidate
+
+            if self._size != previous:
+                adaptive_batch_size.set(self._size)
+                logger.debug("Adaptive batch size %d -> %d", previous, self._size)
+            return self._size
@@ -0,0 +1,78 @@
+"""Process-wide cache of boto3 clients.
+
+Creating a boto3 client loads botocore's service model and sets up a new
+HTTP connection pool, which takes tens of milliseconds. Clients are
+thread-safe once built, so `get_client()` builds each one once per
+(service, region, endpoint) and shares it. Clients are built from a
+dedicated session under a lock, because boto3's default session is not safe
+to use from several threads at once. The cache is reset after a fork so
+child processes never share sockets with their parent.
+"""
+
+import os
+import threading
+from typing import Any
+
+import boto3
+from botocore.config import Config
+
+from app import config_shared
+
+_clients: dict[tuple[str, str | None, str | None], Any] = {}
+_session: boto3.session.Session | None = None
+_lock = threading.Lock()
+
+
+def get_client(
+    service: str, region_name: str | None = None, endpoint_url: str | None = None
+) -> Any:
+    """Return the shared boto3 client for a service, creating it on first use.
+
+    Args:
+        service (str): AWS service name, e.g. "sqs" or "s3".
+        region_name (Optional[str]): AWS region; None uses the environment default.
+        endpoint_url (Optional[str]): Endpoint override; defaults to AWS_ENDPOINT_URL.
+
+    Returns:
+        botocore.client.BaseClient: The cached client.
+
+    """
+    endpoint_url = endpoint_url or config_shared.get_aws_endpoint_url()
+    key = (service, region_name or None, endpoint_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    global _session
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if _session is None:
+                _session = boto3.session.Session()
+            client = _session.client(
+                service,
+                region_name=region_name or None,
+                endpoint_url=endpoint_url,
+                config=Config(max_pool_connections=config_shared.get_aws_max_pool_connections()),
+            )
+            _clients[key] = client
+        return client
+
+
+def clear_clients() -> None:
+    """Drop every cached client, e.g. after credentials are rotated."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
+
+
+def _reset_after_fork() -> None:
+    """Forget the parent's clients and lock in a forked child process."""
+    global _lock, _session
+    _lock = threading.Lock()
+    _clients.clear()
+    _session = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,239 @@
+"""JSON encoding and decoding with optional fast backends.
+
+Uses orjson or msgspec when installed and falls back to the standard library
+otherwise. The backend can be pinned with JSON_CODEC ("auto", "orjson",
+"msgspec" or "json"). Every backend encodes analysis results the same way:
+NaN and infinities become null, NumPy arrays and scalars become plain JSON
+values, and datetimes become ISO-8601 strings.
+"""
+
+import importlib.util
+import json
+import math
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from app import config_shared
+from app.utils.setup_logger import setup_logger
+
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+HAS_MSGSPEC = importlib.util.find_spec("msgspec") is not None
+
+if HAS_ORJSON:
+    import orjson
+if HAS_MSGSPEC:
+    import msgspec
+
+logger = setup_logger(__name__)
+
+
+def _default(obj: Any) -> Any:
+    """Convert values the JSON backends do not handle natively.
+
+    Args:
+        obj (Any): Value that could not be serialized.
+
+    Returns:
+        Any: A JSON-compatible replacement.
+
+    Raises:
+        TypeError: If the value has no JSON representation.
+
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _sanitize(obj: Any) -> Any:
+    """Recursively replace non-finite floats with None for the stdlib encoder.
+
+    Args:
+        obj (Any): Value to sanitize.
+
+    Returns:
+        Any: The value with NaN/Inf replaced and NumPy containers converted.
+
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return _sanitize(obj.tolist())
+    return obj
+
+
+def _json_dumps(obj: Any, indent: bool) -> bytes:
+    """Encode with the standard library."""
+    return json.dumps(
+        _sanitize(obj),
+        ensure_ascii=False,
+        allow_nan=False,
+        default=_default,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+def _json_loads(data: bytes | str) -> Any:
+    """Decode with the standard library."""
+    return json.loads(data)
+
+
+def _orjson_dumps(obj: Any, indent: bool) -> bytes:
+    """Encode with orjson."""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def _orjson_loads(data: bytes | str) -> Any:
+    """Decode with orjson, accepting the NaN tokens the stdlib encoder emits."""
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _msgspec_dumps(obj: Any, indent: bool) -> bytes:
+    """Encode with msgspec."""
+    encoded = _msgspec_encoder.encode(obj)
+    return msgspec.json.format(encoded, indent=2) if indent else encoded
+
+
+def _msgspec_loads(data: bytes | str) -> Any:
+    """Decode with msgspec, accepting the NaN tokens the stdlib encoder emits."""
+    try:
+        return _msgspec_decoder.decode(data)
+    except msgspec.DecodeError:
+        return json.loads(data)
+
+
+_BACKENDS: dict[str, tuple[Callable[[Any, bool], bytes], Callable[[bytes | str], Any]]] = {
+    "json": (_json_dumps, _json_loads),
+}
+if HAS_ORJSON:
+    _BACKENDS["orjson"] = (_orjson_dumps, _orjson_loads)
+if HAS_MSGSPEC:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+    _msgspec_decoder = msgspec.json.Decoder()
+    _BACKENDS["msgspec"] = (_msgspec_dumps, _msgspec_loads)
+
+
+def _select_backend(name: str) -> str:
+    """Resolve the configured codec name to an installed backend.
+
+    Args:
+        name (str): Requested backend ("auto", "orjson", "msgspec" or "json").
+
+    Returns:
+        str: Name of the backend that will be used.
+
+    """
+    if name == "auto":
+        return next(b for b in ("orjson", "msgspec", "json") if b in _BACKENDS)
+    if name not in _BACKENDS:
+        logger.warning("⚠️ JSON codec '%s' is not available, using stdlib json", name)
+        return "json"
+    return name
+
+
+BACKEND: str = _select_backend(config_shared.get_json_codec().lower())
+_dumps, _loads = _BACKENDS[BACKEND]
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode a value as UTF-8 JSON bytes.
+
+    Args:
+        obj (Any): Value to encode.
+        indent (bool): Pretty-print with two-space indentation.
+
+    Returns:
+        bytes: Encoded JSON.
+
+    """
+    return _dumps(obj, indent)
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    """Encode a value as a JSON string.
+
+    Args:
+        obj (Any): Value to encode.
+        indent (bool): Pretty-print with two-space indentation.
+
+    Returns:
+        str: Encoded JSON.
+
+    """
+    return _dumps(obj, indent).decode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON bytes or text.
+
+    Args:
+        data (bytes | str): Encoded JSON.
+
+    Returns:
+        Any: Decoded value.
+
+    """
+    return _loads(data)
+
+
+class EncodedBatch:
+    """A batch of messages whose encodings are computed once and shared by every sink.
+
+    Each representation is built on first use and cached, so enabling several
+    output modes does not encode the same results several times. The batch
+    array is assembled from the per-message bytes rather than encoded again.
+    """
+
+    __slots__ = ("_array", "_bodies", "_pretty", "messages")
+
+    def __init__(self, messages: list[Any]) -> None:
+        """Initialize an EncodedBatch.
+
+        Args:
+            messages (list[Any]): Messages to encode. They must not be modified
+                while the batch is in use.
+
+        """
+        self.messages = messages
+        self._bodies: list[bytes] | None = None
+        self._array: bytes | None = None
+        self._pretty: list[str] | None = None
+
+    def __len__(self) -> int:
+        """Return the number of messages."""
+        return len(self.messages)
+
+    def bodies(self) -> list[bytes]:
+        """Return each message encoded as compact JSON bytes."""
+        if self._bodies is None:
+            self._bodies = [_dumps(message, False) for message in self.messages]
+        return self._bodies
+
+    def array(self) -> bytes:
+        """Return the whole batch encoded as one compact JSON array."""
+        if self._array is None:
+            self._array = b"[" + b",".join(self.bodies()) + b"]"
+        return self._array
+
+    def pretty(self) -> list[str]:
+        """Return each message as indented JSON text, for logs and terminals."""
+        if self._pretty is None:
+            self._pretty = [_dumps(message, True).decode("utf-8") for message in self.messages]
+        return self._pretty
@@ -0,0 +1,191 @@
+"""Message body compression negotiated by content encoding.
+
+Publishers compress bodies of at least COMPRESSION_MIN_BYTES with the codec
+selected by MESSAGE_COMPRESSION ("none", "gzip" or "zstd") and label them
+with the encoding: the `content_encoding` property on RabbitMQ, or a
+`content_encoding` message attribute on SQS, where the compressed bytes are
+also base64-encoded because SQS bodies must be text. Consumers always
+decompress according to the label, so mixed compressed and uncompressed
+traffic is handled whatever the local setting. zstd requires the optional
+`zstandard` package; without it, publishers fall back to gzip.
+
+Other clients put character-set labels such as "utf-8" (kombu/Celery) or
+labels of their own in `content_encoding`. Anything that is not a known
+compression scheme is read as uncompressed, with a warning per label.
+"""
+
+import base64
+import gzip
+import importlib.util
+from typing import Any
+
+from app import config_shared
+from app.utils.setup_logger import setup_logger
+
+HAS_ZSTANDARD = importlib.util.find_spec("zstandard") is not None
+
+if HAS_ZSTANDARD:
+    import zstandard
+
+logger = setup_logger(__name__)
+
+IDENTITY = "identity"
+SQS_ENCODING_ATTRIBUTE = "content_encoding"
+SCHEMES = frozenset({"gzip", "zstd"})
+
+_ignored_labels: set[str] = set()
+
+
+def _select_encoding(name: str) -> str | None:
+    """Resolve the configured compression to an available encoding.
+
+    Args:
+        name (str): Requested compression ("none", "gzip" or "zstd").
+
+    Returns:
+        Optional[str]: Encoding used for publishing, or None to disable compression.
+
+    """
+    if name in ("", "none", IDENTITY):
+        return None
+    if name == "zstd" and not HAS_ZSTANDARD:
+        logger.warning("⚠️ zstandard is not installed, compressing messages with gzip")
+        return "gzip"
+    if name not in ("gzip", "zstd"):
+        logger.warning("⚠️ Unknown MESSAGE_COMPRESSION '%s', compression disabled", name)
+        return None
+    return name
+
+
+ENCODING: str | None = _select_encoding(config_shared.get_message_compression().lower())
+MIN_BYTES: int = config_shared.get_compression_min_bytes()
+
+
+def _scheme(encoding: str | None) -> str | None:
+    """Map a content encoding label to the compression scheme it names.
+
+    Args:
+        encoding (Optional[str]): Content encoding label.
+
+    Returns:
+        Optional[str]: "gzip" or "zstd", or None if the body is uncompressed.
+
+    """
+    if not encoding:
+        return None
+    label = encoding.strip().lower()
+    if label in SCHEMES:
+        return label
+    if label != IDENTITY and label not in _ignored_labels:
+        _ignored_labels.add(label)
+        logger.warning("⚠️ Treating content encoding '%s' as uncompressed", encoding)
+    return None
+
+
+def compress(body: bytes) -> tuple[bytes, str | None]:
+    """Compress a message body if compression is enabled and worthwhile.
+
+    Args:
+        body (bytes): Encoded message body.
+
+    Returns:
+        tuple[bytes, Optional[str]]: The (possibly compressed) body and its
+            content encoding, or None if the body was left as-is.
+
+    """
+    if ENCODING is None or len(body) < MIN_BYTES:
+        return body, None
+    if ENCODING == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+    return gzip.compress(body, compresslevel=6), "gzip"
+
+
+def decompress(body: bytes, encoding: str | None) -> bytes:
+    """Reverse `compress()` according to the message's content encoding.
+
+    Args:
+        body (bytes): Received message body.
+        encoding (Optional[str]): Content encoding label; None or a label that
+            is not a compression scheme means uncompressed.
+
+    Returns:
+        bytes: The original body.
+
+    Raises:
+        ValueError: If the body is zstd-compressed and zstandard is not installed.
+
+    """
+    scheme = _scheme(encoding)
+    if scheme is None:
+        return body
+    if scheme == "gzip":
+        return gzip.decompress(body)
+    if not HAS_ZSTANDARD:
+        raise ValueError("zstd content encoding requires the zstandard package")
+    return zstandard.ZstdDecompressor().decompress(body)
+
+
+def compress_text(body: bytes) -> tuple[str, str | None]:
+    """Compress a message body for a text-only transport such as SQS.
+
+    Args:
+        body (bytes): Encoded message body.
+
+    Returns:
+        tuple[str, Optional[str]]: The body as text (base64 if compressed) and its
+            content encoding.
+
+    """
+    compressed, encoding = compress(body)
+    if encoding is None:
+        return body.decode("utf-8"), None
+    return base64.b64encode(compressed).decode("ascii"), encoding
+
+
+def decompress_text(body: str, encoding: str | None) -> bytes:
+    """Reverse `compress_text()`.
+
+    Args:
+        body (str): Received message body.
+        encoding (Optional[str]): Content encoding label; None means uncompressed.
+
+    Returns:
+        bytes: The original body.
+
+    Raises:
+        ValueError: If zstandard is needed but missing, or the body is not
+            valid base64.
+
+    """
+    if _scheme(encoding) is None:
+        return body.encode("utf-8")
+    return decompress(base64.b64decode(body, validate=True), encoding)
+
+
+def sqs_encoding(message: dict[str, Any]) -> str | None:
+    """Return the content encoding of a received SQS message.
+
+    Args:
+        message (dict[str, Any]): Message as returned by `receive_message`.
+
+    Returns:
+        Optional[str]: The content encoding, or None if the body is uncompressed.
+
+    """
+    attribute = message.get("MessageAttributes", {}).get(SQS_ENCODING_ATTRIBUTE)
+    return attribute.get("StringValue") if attribute else None
+
+
+def sqs_encoding_attributes(encoding: str | None) -> dict[str, dict[str, str]]:
+    """Build the SQS message attributes announcing a content encoding.
+
+    Args:
+        encoding (Optional[str]): Content encoding, or None if uncompressed.
+
+    Returns:
+        dict[str, dict[str, str]]: Message attributes (empty if uncompressed).
+
+    """
+    if not encoding:
+        return {}
+    return {SQS_ENCODING_ATTRIBUTE: {"DataType": "String", "StringValue": encoding}}
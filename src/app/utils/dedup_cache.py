@@ -0,0 +1,179 @@
+"""Bounded cache of already-processed message keys for idempotent consumption.
+
+Keys are held in an in-memory LRU with a TTL. When a file path is given, keys
+are also written to a local SQLite database so that redeliveries are still
+recognised after a restart. Writes are committed together by `flush()`, which
+the processing stage calls once per batch, rather than once per key.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.metrics import dedup_cache_size, dedup_hits_total
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_PRUNE_EVERY = 1000
+
+
+class DedupCache:
+    """Thread-safe LRU + TTL set of processed message keys."""
+
+    def __init__(self, max_entries: int, ttl_sec: float, path: str | None = None) -> None:
+        """Initialize a new DedupCache.
+
+        Args:
+            max_entries (int): Maximum number of keys kept in memory.
+            ttl_sec (float): Seconds after which a key is forgotten.
+            path (Optional[str]): SQLite file for persistence; None keeps keys in memory only.
+
+        Raises:
+            ValueError: If max_entries or ttl_sec is non-positive.
+
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than 0")
+        if ttl_sec <= 0:
+            raise ValueError("ttl_sec must be greater than 0")
+
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._writes = 0
+        self._pending = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS processed (key TEXT PRIMARY KEY, expires_at REAL)"
+            )
+            self._load()
+
+    def __len__(self) -> int:
+        """Return the number of keys held in memory."""
+        return len(self._entries)
+
+    def seen(self, key: str) -> bool:
+        """Check whether a key was processed within the TTL.
+
+        Args:
+            key (str): Message ID or content hash.
+
+        Returns:
+            bool: True if the message was already processed.
+
+        """
+        now = time.time()
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+        dedup_hits_total.inc()
+        return True
+
+    def add(self, key: str) -> None:
+        """Record a key as processed.
+
+        Args:
+            key (str): Message ID or content hash.
+
+        """
+        expires_at = time.time() + self._ttl_sec
+        with self._lock:
+            self._entries[key] = expires_at
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+
+            if self._db is not None:
+                self._persist(key, expires_at)
+
+        dedup_cache_size.set(size)
+
+    def flush(self) -> None:
+        """Commit keys added since the last flush, pruning expired rows periodically."""
+        with self._lock:
+            if self._db is not None:
+                self._commit()
+
+    def close(self) -> None:
+        """Commit pending keys and close the backing database, if any."""
+        with self._lock:
+            if self._db is not None:
+                self._commit()
+                self._db.close()
+                self._db = None
+
+    def _require_db(self) -> sqlite3.Connection:
+        """Return the backing database.
+
+        Returns:
+            sqlite3.Connection: The open database.
+
+        Raises:
+            RuntimeError: If the cache has no database or it has been closed.
+
+        """
+        if self._db is None:
+            raise RuntimeError("dedup cache database is not open")
+        return self._db
+
+    def _load(self) -> None:
+        """Populate the in-memory LRU with unexpired keys from the database."""
+        db = self._require_db()
+        now = time.time()
+        db.execute("DELETE FROM processed WHERE expires_at <= ?", (now,))
+        db.commit()
+        rows = db.execute(
+            "SELECT key, expires_at FROM processed ORDER BY expires_at DESC LIMIT ?",
+            (self._max_entries,),
+        ).fetchall()
+        for key, expires_at in reversed(rows):
+            self._entries[key] = expires_at
+        dedup_cache_size.set(len(self._entries))
+        logger.info("🔁 Loaded %d processed message key(s) from dedup cache", len(rows))
+
+    def _persist(self, key: str, expires_at: float) -> None:
+        """Write one key to the database, to be committed by the next flush (lock held).
+
+        Args:
+            key (str): Message key.
+            expires_at (float): Expiry time as a UNIX timestamp.
+
+        """
+        db = self._require_db()
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO processed (key, expires_at) VALUES (?, ?)",
+                (key, expires_at),
+            )
+            self._pending += 1
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Failed to persist dedup key: %s", e)
+
+    def _commit(self) -> None:
+        """Commit pending keys, pruning expired rows every _PRUNE_EVERY writes (lock held)."""
+        if not self._pending:
+            return
+        db = self._require_db()
+        self._writes += self._pending
+        self._pending = 0
+        try:
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                db.execute("DELETE FROM processed WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Failed to commit dedup keys: %s", e)
@@ -44,6 +44,13 @@ def set_ready() -> None:
     logger.info("✅ Service marked as ready")
 
 
+def set_healthy() -> None:
+    """Mark the service as healthy again after it has recovered."""
+    global _health_flag
+    _health_flag = True
+    logger.info("✅ Service marked as healthy")
+
+
 def set_unhealthy() -> None:
     """Mark the service as unhealthy (e.g., during shutdown or failure)."""
     global _health_flag
@@ -0,0 +1,155 @@
+"""Last-value cache that suppresses republishing unchanged results.
+
+For slowly-moving symbols, successive runs often produce the same latest-bar
+values. `LastValueCache` remembers a hash of the latest-bar values last
+published for each (destination, symbol, timeframe) and drops a result whose
+latest-bar values are identical, unless the heartbeat interval has passed since it was last
+published, so consumers still see every symbol regularly. Results without a
+symbol, or whose symbol or timeframe is not a scalar, are always published. A result is only remembered once its publish
+has succeeded, so a failed publish never suppresses the retry.
+
+Only the newest bar is hashed, and fields that change on every run (see
+`VOLATILE_FIELDS`) are left out, so a rerun over one more identical bar or with
+a fresh timestamp still counts as unchanged.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from app.utils import codec
+from app.utils.metrics import last_value_cache_size, last_value_suppressed_total
+
+Key = tuple[Hashable, Any, Any]
+Update = tuple[Key, bytes]
+
+VOLATILE_FIELDS = frozenset({"timestamp", "metadata"})
+
+# Symbol and timeframe types a result can be cached by.
+_SCALARS = (str, int, float)
+
+
+def _latest_values(result: dict[str, Any]) -> dict[str, Any]:
+    """Return the indicator values of a result's newest bar.
+
+    Per-bar `analysis` records contribute their last record and `components`
+    series their last value; any other result is taken as a whole. Fields in
+    `VOLATILE_FIELDS` are dropped at both levels.
+
+    Args:
+        result (dict[str, Any]): Result to summarize.
+
+    Returns:
+        dict[str, Any]: The values that decide whether the result changed.
+
+    """
+    values = {k: v for k, v in result.items() if k not in VOLATILE_FIELDS}
+    analysis = values.get("analysis")
+    if isinstance(analysis, list):
+        last = analysis[-1] if analysis else {}
+        if isinstance(last, dict):
+            last = {k: v for k, v in last.items() if k not in VOLATILE_FIELDS}
+        values["analysis"] = last
+    components = values.get("components")
+    if isinstance(components, dict):
+        values["components"] = {
+            name: series[-1] if isinstance(series, list) and series else series
+            for name, series in components.items()
+        }
+    return values
+
+
+class LastValueCache:
+    """Thread-safe LRU of the last published result hash per symbol and timeframe."""
+
+    def __init__(self, heartbeat_sec: float, max_entries: int) -> None:
+        """Initialize a new LastValueCache.
+
+        Args:
+            heartbeat_sec (float): Seconds after which an unchanged result is
+                published again.
+            max_entries (int): Maximum number of keys remembered.
+
+        Raises:
+            ValueError: If heartbeat_sec or max_entries is non-positive.
+
+        """
+        if heartbeat_sec <= 0:
+            raise ValueError("heartbeat_sec must be greater than 0")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than 0")
+
+        self._heartbeat_sec = heartbeat_sec
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Key, tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of remembered keys."""
+        return len(self._entries)
+
+    def filter(
+        self, payload: list[dict[str, Any]], bodies: list[bytes], destination: Hashable
+    ) -> tuple[list[dict[str, Any]], list[bytes], list[Update]]:
+        """Drop results identical to the last ones published.
+
+        Args:
+            payload (list[dict[str, Any]]): Results to publish.
+            bodies (list[bytes]): The results encoded with `codec.dumps`.
+            destination (Hashable): Where the results are published.
+
+        Returns:
+            tuple[list[dict[str, Any]], list[bytes], list[Update]]: The results
+                still to publish, their encodings, and the updates to pass to
+                `record()` once they are published.
+
+        """
+        kept: list[dict[str, Any]] = []
+        encoded: list[bytes] = []
+        updates: list[Update] = []
+        now = time.monotonic()
+        with self._lock:
+            for message, body in zip(payload, bodies, strict=True):
+                symbol = message.get("symbol") if isinstance(message, dict) else None
+                timeframe = message.get("timeframe") if isinstance(message, dict) else None
+                if not isinstance(symbol, _SCALARS) or not isinstance(
+                    timeframe, (*_SCALARS, type(None))
+                ):
+                    kept.append(message)
+                    encoded.append(body)
+                    continue
+                key = (destination, symbol, timeframe)
+                digest = hashlib.blake2b(
+                    codec.dumps(_latest_values(message)), digest_size=16
+                ).digest()
+                last = self._entries.get(key)
+                if last is not None and last[0] == digest and now - last[1] < self._heartbeat_sec:
+                    continue
+                kept.append(message)
+                encoded.append(body)
+                updates.append((key, digest))
+
+        suppressed = len(payload) - len(kept)
+        if suppressed:
+            last_value_suppressed_total.inc(suppressed)
+        return kept, encoded, updates
+
+    def record(self, updates: list[Update]) -> None:
+        """Remember published results.
+
+        Args:
+            updates (list[Update]): Updates returned by `filter()`.
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, digest in updates:
+                self._entries[key] = (digest, now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        last_value_cache_size.set(size)
@@ -8,6 +8,7 @@ Exports counters and histograms for:
 - Paper trading
 - Rate limiting
 - Optional sinks: REST, S3, database
+- Pipeline stage queues
 """
 
 import re
@@ -338,3 +339,179 @@ def record_queue_metrics(queue_type: str, status: str, duration_sec: float) -> N
     status = _sanitize_label(status)
     queue_publish_counter.labels(queue_type=queue_type, status=status).inc()
     queue_publish_latency.labels(queue_type=queue_type, status=status).observe(duration_sec)
+
+
+# -----------------------------
+# Pipeline Stage Metrics
+# -----------------------------
+stage_queue_depth = Gauge(
+    "stage_queue_depth",
+    "Current number of items waiting in a pipeline stage queue.",
+    ["stage"],
+)
+
+stage_queue_capacity = Gauge(
+    "stage_queue_capacity",
+    "Maximum number of items a pipeline stage queue can hold.",
+    ["stage"],
+)
+
+stage_queue_put_wait = Histogram(
+    "stage_queue_put_wait_seconds",
+    "Time producers spent waiting for room in a pipeline stage queue.",
+    ["stage"],
+    buckets=[0.001, 0.01, 0.1, 0.5, 1, 5, 10],
+)
+
+stage_queue_dwell = Histogram(
+    "stage_queue_dwell_seconds",
+    "Time items spent queued in a pipeline stage before being processed.",
+    ["stage"],
+    buckets=[0.001, 0.01, 0.1, 0.5, 1, 5, 10],
+)
+
+adaptive_batch_size = Gauge(
+    "adaptive_batch_size",
+    "Current batch and prefetch size chosen by the adaptive batch controller.",
+)
+
+dedup_hits_total = Counter(
+    "dedup_hits_total",
+    "Number of redelivered messages skipped because they were already processed.",
+)
+
+dedup_cache_size = Gauge(
+    "dedup_cache_size",
+    "Number of processed message keys held in the dedup cache.",
+)
+
+coalesced_messages_total = Counter(
+    "coalesced_messages_total",
+    "Number of messages skipped because a newer one for the same symbol was in the batch.",
+)
+
+message_outcomes_total = Counter(
+    "message_outcomes_total",
+    "Number of consumed messages settled, by outcome (success, retry, dead_letter).",
+    ["outcome"],
+)
+
+dead_letters_total = Counter(
+    "dead_letters_total",
+    "Number of messages routed to the dead-letter queue, by failing stage and reason.",
+    ["stage", "reason"],
+)
+
+dead_letters_replayed_total = Counter(
+    "dead_letters_replayed_total",
+    "Number of dead-lettered messages replayed to the source queue.",
+)
+
+dead_letter_delete_failures_total = Counter(
+    "dead_letter_delete_failures_total",
+    "Number of dead-lettered SQS originals that could not be deleted and will be redelivered.",
+)
+
+sqs_in_flight_messages = Gauge(
+    "sqs_in_flight_messages",
+    "Number of received SQS messages whose visibility is being extended.",
+)
+
+sqs_visibility_extensions_total = Counter(
+    "sqs_visibility_extensions_total",
+    "Number of SQS visibility-timeout extensions for in-flight messages.",
+)
+
+drain_messages_total = Counter(
+    "drain_messages_total",
+    "Messages settled (drained) or handed back (abandoned) during shutdown.",
+    ["result"],
+)
+
+consumer_processes_alive = Gauge(
+    "consumer_processes_alive",
+    "Number of running consumer processes under the supervisor.",
+)
+
+consumer_restarts_total = Counter(
+    "consumer_restarts_total",
+    "Number of crashed consumer processes restarted by the supervisor.",
+)
+
+rabbitmq_publisher_connections_total = Counter(
+    "rabbitmq_publisher_connections_total",
+    "Number of RabbitMQ publisher connections opened, including reconnects.",
+)
+
+rabbitmq_unconfirmed_publishes = Gauge(
+    "rabbitmq_unconfirmed_publishes",
+    "Number of RabbitMQ publishes awaiting a publisher confirm.",
+)
+
+rabbitmq_publish_confirms_total = Counter(
+    "rabbitmq_publish_confirms_total",
+    "Number of RabbitMQ publishes settled by the broker, by result.",
+    ["result"],  # ack, nack, lost
+)
+
+publish_buffer_depth = Gauge(
+    "publish_buffer_depth",
+    "Number of messages buffered by the batching publisher.",
+)
+
+publish_flush_duration = Histogram(
+    "publish_flush_duration_seconds",
+    "Time taken to publish one micro-batch from the batching publisher.",
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5],
+)
+
+publish_flushes_total = Counter(
+    "publish_flushes_total",
+    "Number of micro-batches flushed by the batching publisher, by trigger.",
+    ["reason"],  # count, bytes, linger, flush
+)
+
+publish_dropped_messages_total = Counter(
+    "publish_dropped_messages_total",
+    "Number of buffered messages that could not be published.",
+)
+
+outbox_spooled_messages_total = Counter(
+    "outbox_spooled_messages_total",
+    "Number of results spooled to the local outbox after a failed publish.",
+)
+
+outbox_drained_messages_total = Counter(
+    "outbox_drained_messages_total",
+    "Number of spooled results published from the local outbox.",
+)
+
+outbox_dropped_messages_total = Counter(
+    "outbox_dropped_messages_total",
+    "Number of results rejected because the local outbox was full.",
+)
+
+outbox_pending_messages = Gauge(
+    "outbox_pending_messages",
+    "Number of results waiting in the local outbox.",
+)
+
+outbox_pending_bytes = Gauge(
+    "outbox_pending_bytes",
+    "Total size of the results waiting in the local outbox.",
+)
+
+last_value_suppressed_total = Counter(
+    "last_value_suppressed_total",
+    "Number of results not published because they matched the last published value.",
+)
+
+last_value_cache_size = Gauge(
+    "last_value_cache_size",
+    "Number of symbol and timeframe keys held in the last-value cache.",
+)
+
+outbox_quarantined_messages_total = Counter(
+    "outbox_quarantined_messages_total",
+    "Number of results set aside in the outbox quarantine as unpublishable.",
+)
@@ -11,10 +11,10 @@ The port and enablement flag are controlled via environment variables:
 
 import os
 
-from prometheus_client import start_http_server
+from prometheus_client import REGISTRY, CollectorRegistry, start_http_server
 
 
-def start_metrics_server() -> None:
+def start_metrics_server(registry: CollectorRegistry = REGISTRY) -> None:
     """Conditionally start the Prometheus metrics HTTP server.
 
     This starts a simple HTTP server to expose metrics from the global
@@ -22,6 +22,10 @@ def start_metrics_server() -> None:
     variable METRICS_ENABLED is not set to a truthy value, the server
     is not started.
 
+    Args:
+        registry (CollectorRegistry): Registry to expose; the supervisor passes a
+            registry that aggregates metrics across consumer processes.
+
     Environment Variables:
         METRICS_ENABLED (str): If "true" (default), start the server.
         METRICS_PORT (str/int): Port to bind the metrics server (default: 8000).
@@ -44,4 +48,4 @@ def start_metrics_server() -> None:
     except ValueError:
         raise ValueError(f"Invalid METRICS_PORT value: {port_str}")
 
-    start_http_server(port)
+    start_http_server(port, registry=registry)
@@ -0,0 +1,285 @@
+"""Bounded micro-batching buffer in front of a publish function.
+
+Publishing each result as soon as it is produced turns a stream of small
+batches into a stream of small publishes. `PublishBuffer` collects messages
+and hands them to the publish function from a background thread in
+micro-batches, flushing when a message count or byte size is reached or when
+the oldest buffered message has waited for the linger time. Messages for
+different destinations are published separately, in buffer order. When the
+buffer is full, `submit()` blocks, pushing back on the producer.
+
+`submit()` returns before the messages are published, so the producer cannot
+see publish failures. When a spill function is given (the outbox), a failed
+micro-batch is handed to it straight away, so the flush thread never sleeps
+on a broken broker. Otherwise it is retried with exponential backoff, then
+dropped: delivery through the buffer is at most once unless the publish
+function itself spools what it cannot publish.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app.utils.metrics import (
+    publish_buffer_depth,
+    publish_dropped_messages_total,
+    publish_flush_duration,
+    publish_flushes_total,
+)
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PublishFn = Callable[[list[Any], Hashable], None]
+
+MAX_RETRY_BACKOFF_SEC = 30
+
+
+class _Entry:
+    """A buffered message."""
+
+    __slots__ = ("destination", "enqueued_at", "message", "size")
+
+    def __init__(self, destination: Hashable, message: Any, size: int) -> None:
+        """Initialize an _Entry.
+
+        Args:
+            destination (Hashable): Where the message is published.
+            message (Any): Message to publish.
+            size (int): Encoded size of the message in bytes.
+
+        """
+        self.destination = destination
+        self.message = message
+        self.size = size
+        self.enqueued_at = time.monotonic()
+
+
+class PublishBuffer:
+    """Buffers messages and publishes them in micro-batches from a background thread."""
+
+    def __init__(
+        self,
+        publish: PublishFn,
+        max_messages: int,
+        max_bytes: int,
+        linger_sec: float,
+        capacity: int,
+        attempts: int = 1,
+        retry_backoff_sec: float = 1.0,
+        spill: PublishFn | None = None,
+    ) -> None:
+        """Initialize a PublishBuffer and start its flush thread.
+
+        Args:
+            publish (PublishFn): Publishes a list of messages to one destination.
+            max_messages (int): Buffered messages that trigger a flush, and the
+                maximum per micro-batch.
+            max_bytes (int): Buffered bytes that trigger a flush, and the maximum
+                per micro-batch (a single larger message is still published).
+            linger_sec (float): Maximum time a message waits in the buffer.
+            capacity (int): Buffered messages beyond which `submit()` blocks.
+            attempts (int): Publish attempts per micro-batch before it is dropped.
+            retry_backoff_sec (float): Delay before the first retry, doubled for
+                each further retry.
+            spill (Optional[PublishFn]): Stores a micro-batch that could not be
+                published; when set, failed micro-batches go here instead of
+                being retried.
+
+        Raises:
+            ValueError: If a limit is non-positive or a delay is negative.
+
+        """
+        if max_messages <= 0 or max_bytes <= 0 or capacity <= 0 or attempts <= 0:
+            raise ValueError(
+                "max_messages, max_bytes, capacity and attempts must be greater than 0"
+            )
+        if linger_sec < 0 or retry_backoff_sec < 0:
+            raise ValueError("linger_sec and retry_backoff_sec must not be negative")
+
+        self._publish = publish
+        self._max_messages = max_messages
+        self._max_bytes = max_bytes
+        self._linger_sec = linger_sec
+        self._capacity = capacity
+        self._attempts = attempts
+        self._retry_backoff_sec = retry_backoff_sec
+        self._spill = spill
+        self._buffer: deque[_Entry] = deque()
+        self._bytes = 0
+        self._sending = False
+        self._flush_requested = False
+        self._closed = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="publish-buffer", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        """Return the number of buffered messages."""
+        return len(self._buffer)
+
+    def submit(self, messages: list[Any], destination: Hashable, sizes: list[int]) -> None:
+        """Buffer messages for publishing, blocking while the buffer is full.
+
+        Args:
+            messages (list[Any]): Messages to publish.
+            destination (Hashable): Destination passed back to the publish function.
+            sizes (list[int]): Encoded size of each message in bytes.
+
+        Raises:
+            RuntimeError: If the buffer has been closed.
+
+        """
+        with self._changed:
+            for message, size in zip(messages, sizes, strict=True):
+                while len(self._buffer) >= self._capacity and not self._closed:
+                    self._changed.wait()
+                if self._closed:
+                    raise RuntimeError("publish buffer is closed")
+                self._buffer.append(_Entry(destination, message, size))
+                self._bytes += size
+                self._changed.notify_all()
+            publish_buffer_depth.set(len(self._buffer))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Publish everything buffered now and wait until it has been sent.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the buffer was emptied within the timeout.
+
+        """
+        with self._changed:
+            self._flush_requested = True
+            self._changed.notify_all()
+            return self._changed.wait_for(
+                lambda: not self._buffer and not self._sending, timeout=timeout
+            )
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush the buffer and stop the flush thread.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait for the final flush.
+
+        """
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        """Flush loop: wait for a trigger, then publish one micro-batch."""
+        while True:
+            with self._changed:
+                reason = self._due()
+                while reason is None:
+                    if self._closed and not self._buffer:
+                        return
+                    self._changed.wait(self._wait_time())
+                    reason = self._due()
+                batch = self._take()
+                self._sending = True
+
+            try:
+                self._send(batch, reason)
+            finally:
+                with self._changed:
+                    self._sending = False
+                    self._changed.notify_all()
+
+    def _due(self) -> str | None:
+        """Return why the buffer should be flushed now, or None (lock held)."""
+        if not self._buffer:
+            self._flush_requested = False
+            return None
+        if len(self._buffer) >= self._max_messages:
+            return "count"
+        if self._bytes >= self._max_bytes:
+            return "bytes"
+        if self._flush_requested or self._closed:
+            return "flush"
+        if time.monotonic() - self._buffer[0].enqueued_at >= self._linger_sec:
+            return "linger"
+        return None
+
+    def _wait_time(self) -> float | None:
+        """Return how long to wait before the oldest message lingers too long (lock held)."""
+        if not self._buffer:
+            return None
+        return max(0.0, self._buffer[0].enqueued_at + self._linger_sec - time.monotonic())
+
+    def _take(self) -> list[_Entry]:
+        """Remove one micro-batch from the front of the buffer (lock held)."""
+        batch: list[_Entry] = []
+        size = 0
+        while self._buffer and len(batch) < self._max_messages:
+            entry = self._buffer[0]
+            if batch and size + entry.size > self._max_bytes:
+                break
+            batch.append(self._buffer.popleft())
+            size += entry.size
+        self._bytes -= size
+        publish_buffer_depth.set(len(self._buffer))
+        self._changed.notify_all()
+        return batch
+
+    def _send(self, batch: list[_Entry], reason: str) -> None:
+        """Publish a micro-batch, one call per run of entries with the same destination."""
+        publish_flushes_total.labels(reason=reason).inc()
+        start = time.perf_counter()
+        for destination, run in itertools.groupby(batch, key=lambda e: e.destination):
+            self._publish_with_retries([entry.message for entry in run], destination)
+        publish_flush_duration.observe(time.perf_counter() - start)
+
+    def _publish_with_retries(self, messages: list[Any], destination: Hashable) -> None:
+        """Publish messages to one destination, retrying with backoff before dropping them."""
+        if self._spill is not None:
+            self._publish_or_spill(messages, destination)
+            return
+        for attempt in range(1, self._attempts + 1):
+            try:
+                self._publish(messages, destination)
+                return
+            except Exception as e:
+                if attempt == self._attempts:
+                    publish_dropped_messages_total.inc(len(messages))
+                    logger.error(
+                        "❌ Dropped %d buffered message(s) after %d attempt(s): %s",
+                        len(messages),
+                        attempt,
+                        e,
+                    )
+                    return
+                delay = min(self._retry_backoff_sec * 2 ** (attempt - 1), MAX_RETRY_BACKOFF_SEC)
+                logger.warning(
+                    "⚠️ Failed to publish %d buffered message(s), retrying in %.1fs: %s",
+                    len(messages),
+                    delay,
+                    e,
+                )
+                time.sleep(delay)
+
+    def _publish_or_spill(self, messages: list[Any], destination: Hashable) -> None:
+        """Publish messages to one destination, spilling them if that fails."""
+        if self._spill is None:
+            raise RuntimeError("publish buffer has no spill configured")
+        try:
+            self._publish(messages, destination)
+            return
+        except Exception as e:
+            logger.warning(
+                "⚠️ Failed to publish %d buffered message(s), spilling: %s", len(messages), e
+            )
+        try:
+            self._spill(messages, destination)
+        except Exception as e:
+            publish_dropped_messages_total.inc(len(messages))
+            logger.error(
+                "❌ Dropped %d buffered message(s) that could not be spilled: %s", len(messages), e
+            )
@@ -38,3 +38,21 @@ def redact_dict(obj: Any) -> Any:
         return [redact_dict(item) for item in obj]
     else:
         return obj
+
+
+def has_sensitive_keys(obj: Any) -> bool:
+    """Check whether `redact_dict` would change a value.
+
+    Args:
+        obj (Any): The input data (typically a dict or list of dicts).
+
+    Returns:
+        bool: True if any nested dictionary has a sensitive key.
+
+    """
+    if isinstance(obj, dict):
+        return any(k.lower() in SENSITIVE_KEYS or has_sensitive_keys(v) for k, v in obj.items())
+    elif isinstance(obj, list):
+        return any(has_sensitive_keys(item) for item in obj)
+    else:
+        return False
@@ -0,0 +1,124 @@
+"""Bounded hand-off queue between pipeline stages.
+
+Used to decouple broker consumption from batch processing while applying
+backpressure: producers block (or throttle their fetches) when the queue is
+full. Depth, capacity, producer wait and item dwell time are exported as
+Prometheus metrics per stage.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from app.utils.metrics import (
+    stage_queue_capacity,
+    stage_queue_depth,
+    stage_queue_dwell,
+    stage_queue_put_wait,
+)
+
+
+class StageQueue:
+    """Thread-safe bounded FIFO queue with Prometheus instrumentation."""
+
+    def __init__(self, stage: str, maxsize: int) -> None:
+        """Initialize a new StageQueue.
+
+        Args:
+            stage (str): Stage name used as the metrics label.
+            maxsize (int): Maximum number of queued items.
+
+        Raises:
+            ValueError: If maxsize is non-positive.
+
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+
+        self.stage = stage
+        self.maxsize = maxsize
+        self._items: deque[tuple[float, Any]] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        stage_queue_capacity.labels(stage=stage).set(maxsize)
+        stage_queue_depth.labels(stage=stage).set(0)
+
+    def qsize(self) -> int:
+        """Return the number of queued items."""
+        with self._lock:
+            return len(self._items)
+
+    def free_slots(self) -> int:
+        """Return the number of items that can be queued without blocking."""
+        with self._lock:
+            return self.maxsize - len(self._items)
+
+    def wait_for_capacity(self, timeout: float | None = None) -> int:
+        """Block until at least one slot is free or the timeout expires.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait; None waits forever.
+
+        Returns:
+            int: Number of free slots (0 if the timeout expired while full).
+
+        """
+        start = time.perf_counter()
+        with self._not_full:
+            self._not_full.wait_for(lambda: len(self._items) < self.maxsize, timeout)
+            free = self.maxsize - len(self._items)
+        stage_queue_put_wait.labels(stage=self.stage).observe(time.perf_counter() - start)
+        return free
+
+    def put(self, item: Any, timeout: float | None = None) -> bool:
+        """Append an item, blocking while the queue is full.
+
+        Args:
+            item (Any): Item to enqueue.
+            timeout (Optional[float]): Maximum seconds to wait; None waits forever.
+
+        Returns:
+            bool: True if the item was queued, False if the timeout expired.
+
+        """
+        start = time.perf_counter()
+        with self._not_full:
+            if not self._not_full.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                stage_queue_put_wait.labels(stage=self.stage).observe(time.perf_counter() - start)
+                return False
+            now = time.perf_counter()
+            self._items.append((now, item))
+            depth = len(self._items)
+            self._not_empty.notify()
+
+        stage_queue_put_wait.labels(stage=self.stage).observe(now - start)
+        stage_queue_depth.labels(stage=self.stage).set(depth)
+        return True
+
+    def get_batch(self, max_items: int, timeout: float | None = None) -> list[Any]:
+        """Remove up to `max_items` items, waiting for the first one to arrive.
+
+        Args:
+            max_items (int): Maximum number of items to return.
+            timeout (Optional[float]): Maximum seconds to wait for the first item.
+
+        Returns:
+            list[Any]: Dequeued items in FIFO order (empty if the timeout expired).
+
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: len(self._items) > 0, timeout):
+                return []
+            now = time.perf_counter()
+            entries = [self._items.popleft() for _ in range(min(max_items, len(self._items)))]
+            depth = len(self._items)
+            self._not_full.notify_all()
+
+        dwell = stage_queue_dwell.labels(stage=self.stage)
+        for enqueued_at, _ in entries:
+            dwell.observe(now - enqueued_at)
+        stage_queue_depth.labels(stage=self.stage).set(depth)
+        return [item for _, item in entries]
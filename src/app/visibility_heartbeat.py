@@ -0,0 +1,152 @@
+"""Background visibility-timeout extension for in-flight SQS messages.
+
+SQS makes a received message visible to other consumers again once its
+visibility timeout expires, even if the first consumer is still working on
+it. The heartbeat periodically pushes the timeout out for every receipt
+handle that has not yet been deleted, retried or dead-lettered, using
+`change_message_visibility_batch` so one request covers up to ten messages.
+Untracking a message waits for an extension request in flight, so a message
+retried with a short backoff is never extended again afterwards.
+"""
+
+import threading
+from typing import Any
+
+from app.utils.metrics import sqs_in_flight_messages, sqs_visibility_extensions_total
+from app.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SQS_MAX_BATCH_ENTRIES = 10
+
+
+class VisibilityHeartbeat:
+    """Thread that keeps tracked SQS messages invisible until they are settled."""
+
+    def __init__(
+        self, sqs: Any, queue_url: str, visibility_timeout: int, interval_sec: float
+    ) -> None:
+        """Initialize a VisibilityHeartbeat.
+
+        Args:
+            sqs: boto3 SQS client.
+            queue_url (str): Queue the messages were received from.
+            visibility_timeout (int): Seconds of visibility granted on each extension.
+            interval_sec (float): Seconds between extensions; must be well below
+                visibility_timeout.
+
+        Raises:
+            ValueError: If interval_sec is not shorter than visibility_timeout.
+
+        """
+        if not 0 < interval_sec < visibility_timeout:
+            raise ValueError("interval_sec must be between 0 and visibility_timeout")
+
+        self._sqs = sqs
+        self._queue_url = queue_url
+        self._visibility_timeout = visibility_timeout
+        self._interval_sec = interval_sec
+        self._handles: set[str] = set()
+        self._lock = threading.Lock()
+        # Held while an extension request is in flight; untrack() waits for it.
+        self._beat_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sqs-heartbeat", daemon=True)
+
+    def __len__(self) -> int:
+        """Return the number of tracked receipt handles."""
+        return len(self._handles)
+
+    def track(self, receipt_handle: str) -> None:
+        """Start extending a message's visibility.
+
+        Args:
+            receipt_handle (str): Receipt handle from `receive_message`.
+
+        """
+        with self._lock:
+            self._handles.add(receipt_handle)
+            sqs_in_flight_messages.set(len(self._handles))
+
+    def untrack(self, receipt_handle: str) -> None:
+        """Stop extending a message's visibility once it has been settled.
+
+        Waits for an extension request in flight, so the message's visibility is
+        not extended after this returns.
+
+        Args:
+            receipt_handle (str): Receipt handle from `receive_message`.
+
+        """
+        with self._beat_lock:
+            self._discard([receipt_handle])
+
+    def start(self) -> None:
+        """Start the heartbeat thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat thread and wait for it to exit."""
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def beat(self) -> int:
+        """Extend the visibility of every tracked message once.
+
+        Handles SQS rejects (typically because the message was deleted in the
+        meantime) are no longer tracked.
+
+        Returns:
+            int: Number of messages whose visibility was extended.
+
+        """
+        with self._lock:
+            handles = list(self._handles)
+
+        extended = 0
+        for start in range(0, len(handles), SQS_MAX_BATCH_ENTRIES):
+            with self._beat_lock:
+                with self._lock:
+                    # Skip handles settled since the snapshot was taken.
+                    chunk = [
+                        handle
+                        for handle in handles[start : start + SQS_MAX_BATCH_ENTRIES]
+                        if handle in self._handles
+                    ]
+                if not chunk:
+                    continue
+                try:
+                    response = self._sqs.change_message_visibility_batch(
+                        QueueUrl=self._queue_url,
+                        Entries=[
+                            {
+                                "Id": str(i),
+                                "ReceiptHandle": handle,
+                                "VisibilityTimeout": self._visibility_timeout,
+                            }
+                            for i, handle in enumerate(chunk)
+                        ],
+                    )
+                except Exception:
+                    logger.warning("⚠️ Failed to extend SQS visibility (details redacted)")
+                    continue
+
+                extended += len(response.get("Successful", []))
+                self._discard([chunk[int(failure["Id"])] for failure in response.get("Failed", [])])
+
+        if extended:
+            sqs_visibility_extensions_total.inc(extended)
+            logger.debug("💓 Extended visibility for %d in-flight message(s)", extended)
+        return extended
+
+    def _discard(self, receipt_handles: list[str]) -> None:
+        """Stop tracking receipt handles (beat lock held)."""
+        with self._lock:
+            self._handles.difference_update(receipt_handles)
+            sqs_in_flight_messages.set(len(self._handles))
+
+    def _run(self) -> None:
+        """Heartbeat loop: extend visibility every interval until stopped."""
+        while not self._stopping.wait(self._interval_sec):
+            self.beat()
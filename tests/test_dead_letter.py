@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, patch
+
+from app import dead_letter
+from app.dead_letter import (
+    DeadLetter,
+    DeadLetterBatcher,
+    _sqs_chunks,
+    publish_rabbitmq,
+    publish_sqs,
+    replay_sqs,
+)
+
+
+def _letter(body="{}", handle="h"):
+    return DeadLetter(body, "rejected", "process", 3, {"ReceiptHandle": handle})
+
+
+def test_batcher_flushes_when_full():
+    publish = MagicMock()
+    batcher = DeadLetterBatcher(publish, max_batch=2)
+    batcher.add(_letter())
+    publish.assert_not_called()
+    batcher.add(_letter())
+    publish.assert_called_once()
+    assert len(publish.call_args[0][0]) == 2
+    assert len(batcher) == 0
+
+
+def test_batcher_flush_swallows_publish_errors():
+    batcher = DeadLetterBatcher(MagicMock(side_effect=RuntimeError), max_batch=10)
+    batcher.add(_letter())
+    assert batcher.flush() == 1
+    assert batcher.flush() == 0
+
+
+def test_sqs_chunks_respect_entry_and_byte_limits():
+    assert [len(c) for c in _sqs_chunks([_letter() for _ in range(23)])] == [10, 10, 3]
+    big = "x" * (200 * 1024)
+    assert [len(c) for c in _sqs_chunks([_letter(big), _letter(big)])] == [1, 1]
+
+
+def test_publish_sqs_deletes_only_accepted_originals():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {"Successful": [{"Id": "1"}], "Failed": [{"Id": "0"}]}
+    publish_sqs(sqs, "dlq-url", "queue-url", [_letter(handle="a"), _letter(handle="b")])
+
+    entry = sqs.send_message_batch.call_args.kwargs["Entries"][0]
+    assert entry["MessageAttributes"]["failure_stage"]["StringValue"] == "process"
+    assert entry["MessageAttributes"]["delivery_attempt"]["StringValue"] == "3"
+    sqs.delete_message_batch.assert_called_once_with(
+        QueueUrl="queue-url", Entries=[{"Id": "1", "ReceiptHandle": "b"}]
+    )
+
+
+def test_publish_sqs_counts_originals_that_fail_to_delete():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {"Successful": [{"Id": "0"}, {"Id": "1"}]}
+    sqs.delete_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}],
+    }
+    with patch("app.dead_letter.dead_letter_delete_failures_total") as failures:
+        publish_sqs(sqs, "dlq-url", "queue-url", [_letter(handle="a"), _letter(handle="b")])
+
+    failures.inc.assert_called_once_with(1)
+
+
+def test_publish_rabbitmq_requeues_unpublished_originals_on_failure():
+    channel = MagicMock()
+    channel.basic_publish.side_effect = [None, ConnectionError("closed")]
+    letters = [
+        DeadLetter(b"{}", "rejected", "process", 3, (tag, MagicMock(headers={})))
+        for tag in (1, 2, 3)
+    ]
+
+    publish_rabbitmq(channel, "dlq", letters)
+
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+    assert [c.kwargs for c in channel.basic_nack.call_args_list] == [
+        {"delivery_tag": 2, "requeue": True},
+        {"delivery_tag": 3, "requeue": True},
+    ]
+
+
+def _replay_client(depth):
+    sqs = MagicMock()
+    sqs.get_queue_url.return_value = {"QueueUrl": "dlq-url"}
+    sqs.get_queue_attributes.return_value = {
+        "Attributes": {"ApproximateNumberOfMessages": str(depth)}
+    }
+    sqs.receive_message.side_effect = lambda MaxNumberOfMessages, **kwargs: {
+        "Messages": [{"Body": "{}", "ReceiptHandle": f"h{i}"} for i in range(MaxNumberOfMessages)]
+    }
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries]
+    }
+    return sqs
+
+
+def test_replay_sqs_moves_messages_until_limit():
+    sqs = _replay_client(depth=50)
+
+    assert replay_sqs(rate=0, limit=12, sqs=sqs) == 12
+    assert [c.kwargs["MaxNumberOfMessages"] for c in sqs.receive_message.call_args_list] == [10, 2]
+
+
+def test_replay_sqs_without_limit_stops_at_starting_depth():
+    # The DLQ never drains: every replayed message is dead-lettered again.
+    sqs = _replay_client(depth=13)
+
+    assert replay_sqs(rate=0, sqs=sqs) == 13
+    assert [c.kwargs["MaxNumberOfMessages"] for c in sqs.receive_message.call_args_list] == [10, 3]
+
+
+def test_replay_cli_accepts_mixed_case_queue_type():
+    with (
+        patch.object(dead_letter.config, "get_queue_type", return_value="SQS"),
+        patch.object(dead_letter, "replay_sqs", return_value=3) as replay,
+    ):
+        assert dead_letter.main(["--limit", "3"]) == 0
+
+    replay.assert_called_once()
@@ -0,0 +1,35 @@
+from app import envelope
+from app.utils import codec
+
+
+def _encoded(results):
+    return results, [codec.dumps(r) for r in results]
+
+
+def test_bundle_round_trips_with_index():
+    results = [{"symbol": "AAPL", "timeframe": "1d", "v": 1}, {"symbol": "MSFT", "v": 2}]
+    summaries, bodies = envelope.bundle(*_encoded(results), max_results=10, max_bytes=10_000)
+
+    assert len(bodies) == 1
+    message = codec.loads(bodies[0])
+    assert envelope.is_bundle(message)
+    assert envelope.unbundle(message) == results
+    assert [e["symbol"] for e in message["index"]] == ["AAPL", "MSFT"]
+    assert message["index"] == summaries[0]["index"]
+    assert [envelope.read_result(bodies[0], e) for e in message["index"]] == results
+
+
+def test_bundle_splits_on_count_and_bytes():
+    results = [{"symbol": f"S{i}", "pad": "x" * 50} for i in range(5)]
+    payload, bodies = _encoded(results)
+    size = len(bodies[0])
+
+    _, by_count = envelope.bundle(payload, bodies, max_results=2, max_bytes=10_000)
+    _, by_bytes = envelope.bundle(payload, bodies, max_results=10, max_bytes=size * 3)
+
+    assert [codec.loads(b)["count"] for b in by_count] == [2, 2, 1]
+    assert [codec.loads(b)["count"] for b in by_bytes] == [3, 2]
+
+
+def test_unbundle_passes_plain_messages_through():
+    assert envelope.unbundle({"symbol": "AAPL"}) == [{"symbol": "AAPL"}]
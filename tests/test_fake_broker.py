@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from app import fake_broker
+from app.fake_broker import FakeBroker, FakeConnectionError, FakeThrottlingError
+
+
+def test_fake_broker_delivers_and_acks():
+    broker = FakeBroker()
+    broker.publish("q", b"1")
+    broker.publish("q", b"2")
+
+    messages = broker.receive("q", max_messages=10)
+    assert [m.body for m in messages] == [b"1", b"2"]
+    assert broker.in_flight == 2
+    for m in messages:
+        broker.ack(m.receipt)
+    assert broker.stats["acked"] == 2
+    assert broker.receive("q", max_messages=10) == []
+
+
+def test_fake_broker_redelivers_delayed_nacks_with_higher_attempt():
+    broker = FakeBroker()
+    broker.publish("q", b"x")
+    first = broker.receive("q", 1)[0]
+    broker.nack(first.receipt, delay_sec=0.05)
+    assert broker.receive("q", 1) == []
+
+    second = broker.receive("q", 1, timeout=1)[0]
+    assert (second.message_id, second.attempt) == (first.message_id, 2)
+
+
+def test_fake_broker_connection_drop_requeues_unacked_messages():
+    broker = FakeBroker()
+    broker.publish("q", b"x")
+    message = broker.receive("q", 1)[0]
+
+    broker.drop_rate = 1.0
+    with pytest.raises(FakeConnectionError):
+        broker.ack(message.receipt)
+    broker.drop_rate = 0.0
+    assert broker.depth("q") == 1
+    with pytest.raises(KeyError):
+        broker.ack(message.receipt)
+
+
+def test_fake_broker_throttles_calls_over_rate():
+    broker = FakeBroker(throttle_rate=2)
+    broker.publish("q", b"1")
+    broker.publish("q", b"2")
+    with pytest.raises(FakeThrottlingError):
+        broker.publish("q", b"3")
+    assert broker.stats["throttled"] == 1
+
+
+def test_fake_broker_lost_acks_are_reproducible():
+    def redeliveries(seed):
+        broker = FakeBroker(redelivery_rate=0.5, seed=seed)
+        for i in range(20):
+            broker.publish("q", str(i).encode())
+        while broker.depth("q"):
+            for m in broker.receive("q", 5):
+                broker.ack(m.receipt)
+        return broker.stats["redelivered"]
+
+    assert redeliveries(7) == redeliveries(7) > 0
+
+
+def test_fake_listener_processes_published_messages(monkeypatch):
+    import app.config_shared as config
+    from app import queue_handler, queue_sender
+
+    broker = FakeBroker(redelivery_rate=0.2, seed=1)
+    fake_broker.reset_broker(broker)
+    monkeypatch.setattr(config, "get_queue_type", lambda: "fake")
+    monkeypatch.setattr(config, "get_rabbitmq_routing_key", lambda: "in")
+    monkeypatch.setattr(config, "get_rabbitmq_queue", lambda: "in")
+    queue_sender.reset_publisher()
+
+    seen = []
+    queue_sender.publish_to_queue([{"symbol": "AAPL", "seq": i} for i in range(10)])
+    listener = threading.Thread(
+        target=queue_handler._start_fake_listener, args=(lambda b: seen.extend(b),)
+    )
+    listener.start()
+    try:
+        deadline = time.monotonic() + 5
+        while broker.stats["acked"] < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue_handler.shutdown_event.set()
+        listener.join()
+        queue_handler.shutdown_event.clear()
+        fake_broker.reset_broker()
+        queue_sender.reset_publisher()
+
+    assert broker.stats["acked"] == 10
+    assert {m["seq"] for m in seen} == set(range(10))
+    assert len(seen) == 10 + broker.stats["redelivered"]
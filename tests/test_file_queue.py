@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import app.config_shared as config
+from app import file_queue
+
+
+def _write_jsonl(path, messages):
+    path.write_text("\n".join(json.dumps(m) for m in messages) + "\n\n")
+    return path
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_read_messages_from_jsonl(tmp_path, use_mmap):
+    path = _write_jsonl(tmp_path / "day.jsonl", [{"seq": 1}, {"seq": 2}])
+    messages = list(file_queue.read_messages(str(path), use_mmap))
+    assert [m[0] for m in messages] == ["day.jsonl:1", "day.jsonl:2"]
+    assert [json.loads(m[1])["seq"] for m in messages] == [1, 2]
+
+
+def test_read_messages_from_directory_in_name_order(tmp_path):
+    (tmp_path / "b.json").write_text(json.dumps({"seq": 3}))
+    _write_jsonl(tmp_path / "a.ndjson", [{"seq": 1}, {"seq": 2}])
+    (tmp_path / "notes.txt").write_text("ignored")
+    (tmp_path / "empty.jsonl").write_text("")
+
+    messages = list(file_queue.read_messages(str(tmp_path), use_mmap=True))
+    assert [json.loads(body)["seq"] for _, body in messages] == [1, 2, 3]
+
+
+def test_recorded_time_parses_epoch_and_iso():
+    assert file_queue._recorded_time(1700000000) == 1700000000
+    assert file_queue._recorded_time(1700000000000) == 1700000000
+    assert file_queue._recorded_time("2023-11-14T22:13:20Z") == 1700000000
+    assert file_queue._recorded_time("yesterday") is None
+
+
+def test_retry_schedule_returns_only_due_items():
+    retries = file_queue.RetrySchedule()
+    retries.schedule(0, "now")
+    retries.schedule(60, "later")
+    assert retries.pop_due() == ["now"]
+    assert len(retries) == 1
+
+
+def test_file_listener_replays_through_processing_stage(tmp_path, monkeypatch):
+    from app.queue_handler import MessageOutcome, _start_file_listener
+
+    path = _write_jsonl(tmp_path / "day.jsonl", [{"symbol": "AAPL", "seq": i} for i in range(5)])
+    with open(path, "a") as f:
+        f.write("not json\n")
+    monkeypatch.setattr(config, "get_file_queue_path", lambda: str(path))
+    monkeypatch.setattr(config, "get_retry_delay", lambda: 0)
+    monkeypatch.setattr(config, "get_max_delivery_attempts", lambda: 2)
+
+    seen = []
+
+    def callback(batch):
+        seen.extend(m["seq"] for m in batch)
+        return [MessageOutcome.RETRY if m["seq"] == 4 else MessageOutcome.SUCCESS for m in batch]
+
+    _start_file_listener(callback)
+
+    assert sorted(seen) == [0, 1, 2, 3, 4, 4]
+    dead = [json.loads(line) for line in (tmp_path / "default_dlq.jsonl").read_text().splitlines()]
+    assert sorted((d["reason"], d["stage"]) for d in dead) == [
+        ("max_attempts_exceeded", "process"),
+        ("undecodable", "decode"),
+    ]
+
+
+def test_file_listener_dedups_by_content_not_line(tmp_path, monkeypatch):
+    from app.queue_handler import MessageOutcome, _start_file_listener
+
+    monkeypatch.setattr(config, "get_dedup_enabled", lambda: True)
+    monkeypatch.setattr(config, "get_dedup_cache_path", lambda: str(tmp_path / "dedup.db"))
+    seen = []
+
+    def callback(batch):
+        seen.extend(m["seq"] for m in batch)
+        return [MessageOutcome.SUCCESS for _ in batch]
+
+    path = _write_jsonl(tmp_path / "day.jsonl", [{"symbol": "AAPL", "seq": 1}])
+    monkeypatch.setattr(config, "get_file_queue_path", lambda: str(path))
+    _start_file_listener(callback)
+
+    # A line inserted above shifts the already-processed message to line 2.
+    _write_jsonl(path, [{"symbol": "MSFT", "seq": 0}, {"symbol": "AAPL", "seq": 1}])
+    _start_file_listener(callback)
+
+    assert seen == [1, 0]
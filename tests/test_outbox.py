@@ -0,0 +1,113 @@
+import threading
+
+from app.outbox import Outbox, PartialPublishError
+
+
+def _outbox(tmp_path, publish, max_bytes=1_000, max_attempts=10):
+    return Outbox(
+        str(tmp_path / "outbox.sqlite3"),
+        publish,
+        max_bytes=max_bytes,
+        drain_batch=2,
+        max_attempts=max_attempts,
+    )
+
+
+def test_outbox_drains_in_order_by_destination(tmp_path):
+    published = []
+    outbox = _outbox(tmp_path, lambda bodies, dest: published.append((dest, bodies)))
+    outbox.put([b"1", b"2"], ("q", None))
+    outbox.put([b"3"], ("paper", "ex"))
+
+    assert len(outbox) == 3
+    assert outbox.drain() == 3
+    assert published == [(("q", None), [b"1", b"2"]), (("paper", "ex"), [b"3"])]
+    assert len(outbox) == 0
+
+
+def test_outbox_keeps_messages_when_publish_fails(tmp_path):
+    published = []
+    failing = True
+
+    def publish(bodies, dest):
+        if failing and bodies == [b"3"]:
+            raise ConnectionError("broker down")
+        published.extend(bodies)
+
+    outbox = _outbox(tmp_path, publish)
+    outbox.put([b"1", b"2", b"3"], ("q", None))
+
+    assert outbox.drain() == 2
+    assert len(outbox) == 1
+    failing = False
+    assert outbox.drain() == 1
+    assert published == [b"1", b"2", b"3"]
+
+
+def test_outbox_rejects_messages_beyond_size_cap(tmp_path):
+    outbox = _outbox(tmp_path, lambda bodies, dest: None, max_bytes=10)
+
+    assert outbox.put([b"12345"], ("q", None))
+    assert not outbox.put([b"123456"], ("q", None))
+    assert len(outbox) == 1
+
+
+def test_outbox_survives_restart(tmp_path):
+    _outbox(tmp_path, lambda bodies, dest: None).put([b"1"], ("q", None))
+
+    published = []
+    reopened = _outbox(tmp_path, lambda bodies, dest: published.extend(bodies))
+
+    assert len(reopened) == 1
+    reopened.drain()
+    assert published == [b"1"]
+
+
+def test_outbox_keeps_only_unsent_messages_of_a_partial_failure(tmp_path):
+    def publish(bodies, dest):
+        raise PartialPublishError("partly failed", unsent=[1], rejected=[0])
+
+    outbox = _outbox(tmp_path, publish)
+    outbox.put([b"rejected", b"unsent"], ("q", None))
+
+    assert outbox.drain() == 0
+    assert len(outbox) == 1
+    assert outbox._db.execute("SELECT body FROM quarantine").fetchall() == [(b"rejected",)]
+
+
+def test_outbox_quarantines_message_that_keeps_failing(tmp_path):
+    published = []
+
+    def publish(bodies, dest):
+        if b"poison" in bodies:
+            raise ValueError("cannot publish")
+        published.extend(bodies)
+
+    outbox = _outbox(tmp_path, publish, max_attempts=2)
+    outbox.put([b"poison"], ("q", None))
+    outbox.put([b"1"], ("q", None))
+
+    outbox.drain()
+    assert published == [] and len(outbox) == 2
+    outbox.drain()
+    assert published == [b"1"] and len(outbox) == 0
+    assert outbox._db.execute("SELECT body, attempts FROM quarantine").fetchall() == [
+        (b"poison", 2)
+    ]
+
+
+def test_outbox_accepts_puts_while_draining(tmp_path):
+    spooled = []
+
+    def publish(bodies, dest):
+        if not spooled:
+            putter = threading.Thread(target=lambda: spooled.append(outbox.put([b"new"], dest)))
+            putter.start()
+            putter.join(timeout=5)
+
+    outbox = _outbox(tmp_path, publish)
+    outbox.put([b"1"], ("q", None))
+
+    assert outbox.drain() == 2
+    assert spooled == [True]
+    assert len(outbox) == 0
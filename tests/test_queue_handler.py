@@ -1,2 +1,254 @@
+import threading
+from unittest.mock import MagicMock
+
+
+def _fixed_batch(size):
+    from app.utils.adaptive_batch import AdaptiveBatchController
+
+    return AdaptiveBatchController(size, size, size, target_latency_sec=1.0)
+
+
+def _delivery(payload, **kwargs):
+    from app.queue_handler import Delivery
+
+    hooks = {
+        "ack": MagicMock(),
+        "retry": MagicMock(),
+        "dead_letter": MagicMock(),
+        "release": MagicMock(),
+    }
+    hooks.update(kwargs)
+    return Delivery(payload, **hooks)
+
+
 def test_queue_handler_imports():
     import app.queue_handler
+
+
+def test_processing_stage_acks_after_callback():
+    from app.queue_handler import ProcessingStage
+
+    callback = MagicMock(return_value=None)
+    stage = ProcessingStage(callback, _fixed_batch(10), capacity=10)
+    delivery = _delivery({"symbol": "AAPL"})
+    stage.start()
+    stage.submit(delivery)
+    stage.stop()
+
+    callback.assert_called_once_with([{"symbol": "AAPL"}])
+    delivery._ack.assert_called_once()
+    delivery._retry.assert_not_called()
+
+
+def test_processing_stage_retries_with_backoff_on_failure():
+    from app.queue_handler import ProcessingStage
+
+    stage = ProcessingStage(
+        MagicMock(side_effect=RuntimeError), _fixed_batch(10), capacity=10, retry_delay_sec=2
+    )
+    delivery = _delivery({"symbol": "AAPL"}, attempt=3)
+    stage.start()
+    stage.submit(delivery)
+    stage.stop()
+
+    delivery._ack.assert_not_called()
+    delivery._retry.assert_called_once_with(8)
+
+
+def test_processing_stage_settles_each_message_by_outcome():
+    from app.queue_handler import MessageOutcome, ProcessingStage
+
+    outcomes = [MessageOutcome.SUCCESS, MessageOutcome.RETRY, MessageOutcome.DEAD_LETTER]
+    stage = ProcessingStage(
+        MagicMock(return_value=outcomes), _fixed_batch(4), capacity=10, max_attempts=3
+    )
+    ok, transient, poison, exhausted = (
+        _delivery({"seq": 1}),
+        _delivery({"seq": 2}),
+        _delivery({"seq": 3}),
+        _delivery({"seq": 4}, attempt=3),
+    )
+    stage._process([ok, transient, poison])
+    stage._callback.return_value = [MessageOutcome.RETRY]
+    stage._process([exhausted])
+
+    ok._ack.assert_called_once()
+    transient._retry.assert_called_once()
+    transient._ack.assert_not_called()
+    poison._dead_letter.assert_called_once_with("rejected")
+    exhausted._dead_letter.assert_called_once_with("max_attempts_exceeded")
+
+
+def test_processing_stage_retries_invalid_outcome_and_keeps_lane_running():
+    from app.queue_handler import MessageOutcome, ProcessingStage
+
+    def callback(batch):
+        return ["bogus" if m["seq"] == 1 else MessageOutcome.SUCCESS for m in batch]
+
+    stage = ProcessingStage(callback, _fixed_batch(2), capacity=10)
+    invalid, ok, later = _delivery({"seq": 1}), _delivery({"seq": 2}), _delivery({"seq": 3})
+    stage.start()
+    for delivery in (invalid, ok, later):
+        stage.submit(delivery)
+    stage.stop(timeout=5)
+
+    invalid._retry.assert_called_once()
+    invalid._ack.assert_not_called()
+    ok._ack.assert_called_once()
+    later._ack.assert_called_once()
+    assert stage.in_flight == 0
+
+
+def test_processing_stage_preserves_per_symbol_order():
+    from app.queue_handler import ProcessingStage
+
+    seen = []
+    stage = ProcessingStage(lambda batch: seen.extend(batch), _fixed_batch(2), capacity=10, lanes=4)
+    assert stage.lane_for({"symbol": "AAPL"}) == stage.lane_for({"symbol": "AAPL"})
+
+    stage.start()
+    for i in range(20):
+        symbol = "AAPL" if i % 2 else "MSFT"
+        stage.submit(_delivery({"symbol": symbol, "seq": i}))
+    stage.stop()
+
+    for symbol in ("AAPL", "MSFT"):
+        sequence = [m["seq"] for m in seen if m["symbol"] == symbol]
+        assert sequence == sorted(sequence)
+        assert len(sequence) == 10
+
+
+def test_processing_stage_skips_already_processed_messages():
+    from app.queue_handler import ProcessingStage
+    from app.utils.dedup_cache import DedupCache
+
+    callback = MagicMock(return_value=None)
+    dedup = DedupCache(max_entries=10, ttl_sec=60)
+    stage = ProcessingStage(callback, _fixed_batch(10), capacity=10, dedup=dedup)
+    stage.start()
+    stage.submit(_delivery({"symbol": "AAPL"}, key="m1"))
+    stage.stop()
+
+    duplicate_ack = MagicMock()
+    stage.submit(_delivery({"symbol": "AAPL"}, ack=duplicate_ack, key="m1"))
+
+    callback.assert_called_once()
+    duplicate_ack.assert_called_once()
+
+
+def test_coalesce_latest_keeps_newest_per_symbol_and_timeframe():
+    from app.queue_handler import _coalesce_latest
+
+    batch = [
+        _delivery({"seq": 0}),
+        _delivery({"symbol": "AAPL", "seq": 1}),
+        _delivery({"symbol": "MSFT", "seq": 2}),
+        _delivery({"symbol": "AAPL", "seq": 3}),
+        _delivery({"symbol": "AAPL", "timeframe": "1h", "seq": 4}),
+        _delivery({"seq": 5}),
+    ]
+    survivors, superseded = _coalesce_latest(batch)
+    assert [d.payload["seq"] for d in survivors] == [0, 2, 3, 4, 5]
+    assert [d.payload["seq"] for d in superseded] == [1]
+
+
+def test_coalescing_passes_through_messages_with_non_scalar_keys():
+    from app.queue_handler import ProcessingStage
+
+    callback = MagicMock(return_value=None)
+    stage = ProcessingStage(callback, _fixed_batch(10), capacity=10, coalesce=True)
+    deliveries = [
+        _delivery({"symbol": "AAPL", "timeframe": {}}),
+        _delivery({"symbol": ["AAPL"], "timeframe": "1d"}),
+    ]
+    stage.start()
+    for delivery in deliveries:
+        stage.submit(delivery)
+    stage.stop()
+
+    assert sum(len(c.args[0]) for c in callback.call_args_list) == 2
+    for delivery in deliveries:
+        delivery._ack.assert_called_once()
+
+
+def test_processing_stage_flushes_dead_letters_after_each_batch():
+    from app.dead_letter import DeadLetter
+    from app.queue_handler import MessageOutcome, ProcessingStage
+
+    dead_letters = MagicMock()
+    stage = ProcessingStage(
+        MagicMock(return_value=[MessageOutcome.DEAD_LETTER]),
+        _fixed_batch(1),
+        capacity=10,
+        dead_letters=dead_letters,
+    )
+    delivery = _delivery(
+        {"seq": 1},
+        dead_letter=lambda reason: dead_letters.add(DeadLetter("{}", reason, "process", 1)),
+    )
+    stage._process([delivery])
+
+    assert dead_letters.add.call_args[0][0].reason == "rejected"
+    dead_letters.flush.assert_called_once()
+
+
+def test_processing_stage_hands_back_queued_messages_after_drain_timeout():
+    from app.queue_handler import ProcessingStage
+
+    release = threading.Event()
+
+    def slow_callback(batch):
+        release.wait(5)
+
+    stage = ProcessingStage(slow_callback, _fixed_batch(1), capacity=10)
+    deliveries = [_delivery({"seq": i}) for i in range(3)]
+    stage.start()
+    for delivery in deliveries:
+        stage.submit(delivery)
+
+    threading.Timer(0.3, release.set).start()
+    drained, abandoned = stage.stop(timeout=0.1)
+
+    assert (drained, abandoned) == (1, 2)
+    assert stage.in_flight == 0
+    deliveries[0]._ack.assert_called_once()
+    for delivery in deliveries[1:]:
+        delivery._release.assert_called_once()
+        delivery._ack.assert_not_called()
+
+
+def test_rabbitmq_retry_acks_at_once_and_parks_copy_in_delay_queue():
+    import pika
+
+    from app.queue_handler import _rabbitmq_delivery
+
+    connection = MagicMock()
+    connection.add_callback_threadsafe.side_effect = lambda fn: fn()
+    channel = MagicMock()
+    method = MagicMock(delivery_tag=7)
+    properties = pika.BasicProperties(headers={"x-delivery-attempt": 1}, message_id="m-1")
+    retry_queues = set()
+
+    for _ in range(2):
+        delivery = _rabbitmq_delivery(
+            connection,
+            channel,
+            method,
+            properties,
+            b"{}",
+            {},
+            None,
+            "signals",
+            MagicMock(),
+            retry_queues,
+        )
+        delivery.retry(2.5)
+
+    connection.call_later.assert_not_called()
+    channel.queue_declare.assert_called_once()
+    declared = channel.queue_declare.call_args.kwargs
+    assert declared["queue"] == "signals.retry.2500"
+    assert declared["arguments"]["x-message-ttl"] == 2500
+    assert declared["arguments"]["x-dead-letter-routing-key"] == "signals"
+    assert channel.basic_publish.call_args.kwargs["routing_key"] == "signals.retry.2500"
+    assert channel.basic_ack.call_count == 2
@@ -0,0 +1,261 @@
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import queue_sender
+
+
+def _ok(Entries):
+    return {"Successful": [{"Id": e["Id"]} for e in Entries]}
+
+
+def test_sqs_publish_packs_messages_into_batches():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: _ok(Entries)
+    with patch.object(queue_sender.aws_clients, "get_client", return_value=sqs):
+        queue_sender._send_batch_to_sqs([b'{"seq":%d}' % i for i in range(23)], "queue-url")
+
+    sizes = [len(c.kwargs["Entries"]) for c in sqs.send_message_batch.call_args_list]
+    assert sizes == [10, 10, 3]
+
+
+def test_sqs_publish_retries_only_failed_entries():
+    calls = []
+
+    def send(QueueUrl, Entries):
+        calls.append([e["MessageBody"] for e in Entries])
+        if len(calls) == 1:
+            return {
+                "Successful": [{"Id": "0"}, {"Id": "2"}],
+                "Failed": [{"Id": "1", "Code": "InternalError", "SenderFault": False}],
+            }
+        return _ok(Entries)
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = send
+    with (
+        patch.object(queue_sender.aws_clients, "get_client", return_value=sqs),
+        patch.object(queue_sender.time, "sleep"),
+    ):
+        queue_sender._send_batch_to_sqs([b'{"seq":%d}' % i for i in range(3)], "queue-url")
+
+    assert calls[1] == ['{"seq":1}']
+
+
+def test_sqs_publish_raises_on_rejected_entries():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "InvalidMessageContents", "SenderFault": True}],
+    }
+    with patch.object(queue_sender.aws_clients, "get_client", return_value=sqs):
+        with pytest.raises(queue_sender.SQSMessageSendError) as raised:
+            queue_sender._send_batch_to_sqs([b"0", b"1"], "queue-url")
+
+    sqs.send_message_batch.assert_called_once()
+    assert raised.value.unsent == [] and raised.value.rejected == [1]
+
+
+def test_sqs_batches_respect_size_limit():
+    entries = [{"MessageBody": "x" * 100_000} for _ in range(5)]
+
+    assert [len(c) for c in queue_sender._sqs_batches(entries)] == [2, 2, 1]
+
+
+def test_confirmed_rabbitmq_publish_raises_if_any_message_is_not_confirmed():
+    futures = [Future(), Future()]
+    futures[0].set_result(None)
+    futures[1].set_exception(queue_sender.PublishNotConfirmedError("nacked"))
+    publisher = MagicMock()
+    publisher.publish.side_effect = futures
+    with patch.object(
+        queue_sender.rabbitmq_publisher, "get_confirming_publisher", return_value=publisher
+    ):
+        with pytest.raises(queue_sender.PublishNotConfirmedError):
+            queue_sender._send_confirmed_to_rabbitmq([b"0", b"1"], "key", "ex")
+
+    assert publisher.publish.call_count == 2
+
+
+def _publisher(key="stock_data"):
+    return queue_sender.Publisher(
+        "rabbitmq", queue_sender.Route("ex", key), queue_sender.Route("paper_ex", "trades.paper")
+    )
+
+
+def test_failed_publish_is_spooled_to_outbox():
+    outbox = MagicMock()
+    outbox.__len__.return_value = 0
+    outbox.put.return_value = True
+    publisher = _publisher()
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=outbox),
+        patch.object(publisher, "send", side_effect=ConnectionError("broker down")),
+    ):
+        publisher.publish_now([{"seq": 0}], [b'{"seq":0}'], ("q", None))
+
+    outbox.put.assert_called_once_with([b'{"seq":0}'], ("q", None))
+
+
+def test_publish_queues_behind_spooled_results():
+    outbox = MagicMock()
+    outbox.__len__.return_value = 3
+    outbox.put.return_value = True
+    publisher = _publisher()
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=outbox),
+        patch.object(publisher, "send") as send,
+    ):
+        publisher.publish_now([{"seq": 0}], [b'{"seq":0}'], ("q", None))
+
+    send.assert_not_called()
+    outbox.put.assert_called_once()
+
+
+def test_routing_key_template_routes_each_symbol_separately():
+    publisher = _publisher("ichimoku.{symbol}")
+    payload = [
+        {"symbol": "AAPL", "seq": 0},
+        {"symbol": "MSFT", "seq": 1},
+        {"seq": 2},
+        {"symbol": "AAPL", "seq": 3},
+    ]
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=None),
+        patch.object(queue_sender, "_send_to_rabbitmq") as send,
+    ):
+        publisher.publish(payload)
+
+    routed = [(c.args[0]["seq"], c.args[2], c.args[3]) for c in send.call_args_list]
+    assert routed == [
+        (0, "ichimoku.AAPL", "ex"),
+        (3, "ichimoku.AAPL", "ex"),
+        (1, "ichimoku.MSFT", "ex"),
+        (2, "ichimoku.unknown", "ex"),
+    ]
+
+
+def test_failed_destination_reports_unsent_positions_in_the_payload():
+    publisher = _publisher("ichimoku.{symbol}")
+    payload = [{"symbol": "AAPL"}, {"symbol": "MSFT"}, {"symbol": "AAPL"}, {"symbol": "TSLA"}]
+
+    def publish_now(messages, bodies, destination):
+        if destination[0] == "ichimoku.MSFT":
+            raise ConnectionError("broker down")
+
+    with patch.object(publisher, "publish_now", side_effect=publish_now):
+        with pytest.raises(queue_sender.PartialPublishError) as raised:
+            publisher.publish(payload)
+
+    assert raised.value.unsent == [1, 3] and raised.value.rejected == []
+
+
+def test_publisher_resolves_configuration_once(monkeypatch):
+    monkeypatch.setattr(queue_sender.config_shared, "get_queue_type", lambda: "RabbitMQ")
+    monkeypatch.setattr(queue_sender.config_shared, "get_rabbitmq_routing_key", lambda: "k")
+    queue_sender.reset_publisher()
+    try:
+        publisher = queue_sender.get_publisher()
+        monkeypatch.setattr(
+            queue_sender.config_shared, "get_queue_type", MagicMock(side_effect=AssertionError)
+        )
+        with (
+            patch.object(queue_sender, "get_outbox", return_value=None),
+            patch.object(queue_sender, "_send_to_rabbitmq") as send,
+        ):
+            queue_sender.publish_to_queue([{"seq": 0}, {"seq": 1}])
+    finally:
+        queue_sender.reset_publisher()
+
+    assert publisher.queue_type == "rabbitmq"
+    assert [c.args[2] for c in send.call_args_list] == ["k", "k"]
+
+
+def test_paper_route_falls_back_to_default_route_once(monkeypatch):
+    monkeypatch.setattr(queue_sender.config_shared, "get_queue_type", lambda: "rabbitmq")
+    monkeypatch.setattr(queue_sender.config_shared, "get_rabbitmq_exchange", lambda: "ex")
+    monkeypatch.setattr(queue_sender.config_shared, "get_paper_trading_exchange", lambda: "")
+    publisher = queue_sender.Publisher.from_config()
+    monkeypatch.setattr(
+        queue_sender.config_shared, "get_rabbitmq_exchange", MagicMock(side_effect=AssertionError)
+    )
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=None),
+        patch.object(queue_sender, "_send_to_rabbitmq") as send,
+    ):
+        publisher.publish([{"seq": 0}], publisher.paper)
+
+    assert publisher.paper.exchange == "ex"
+    assert send.call_args.args[3] == "ex"
+
+
+def test_publisher_rejects_missing_sqs_queue_url(monkeypatch):
+    monkeypatch.setattr(queue_sender.config_shared, "get_queue_type", lambda: "sqs")
+    monkeypatch.setattr(queue_sender.config_shared, "get_sqs_queue_url", lambda: "")
+
+    with pytest.raises(ValueError):
+        queue_sender.Publisher.from_config()
+
+
+def test_publisher_skips_results_matching_last_published_value():
+    publisher = queue_sender.Publisher(
+        "rabbitmq",
+        queue_sender.Route("ex", "k"),
+        queue_sender.Route("paper_ex", "trades.paper"),
+        last_values=queue_sender.LastValueCache(heartbeat_sec=60, max_entries=10),
+    )
+    result = {"symbol": "AAPL", "timeframe": "1d", "kijun": 1.0}
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=None),
+        patch.object(publisher, "send") as send,
+    ):
+        publisher.publish([result])
+        publisher.publish([result])
+        publisher.publish([{**result, "kijun": 2.0}])
+
+    assert [c.args[2][0]["kijun"] for c in send.call_args_list] == [1.0, 2.0]
+
+
+def test_partly_failed_publish_spools_only_unsent_results():
+    outbox = MagicMock()
+    outbox.__len__.return_value = 0
+    outbox.put.return_value = True
+    publisher = _publisher()
+    error = queue_sender.PartialPublishError("partly failed", unsent=[1], rejected=[2])
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=outbox),
+        patch.object(publisher, "send", side_effect=error),
+    ):
+        publisher.publish_now([{}, {}, {}], [b"0", b"1", b"2"], ("q", None))
+
+    outbox.put.assert_called_once_with([b"1"], ("q", None))
+    outbox.quarantine.assert_called_once_with([b"2"], ("q", None), "partly failed")
+
+
+def test_publish_raises_when_outbox_is_full_behind_spooled_results():
+    outbox = MagicMock()
+    outbox.__len__.return_value = 3
+    outbox.put.return_value = False
+    publisher = _publisher()
+    with (
+        patch.object(queue_sender, "get_outbox", return_value=outbox),
+        patch.object(publisher, "send") as send,
+    ):
+        with pytest.raises(queue_sender.OutboxFullError):
+            publisher.publish_now([{"seq": 0}], [b'{"seq":0}'], ("q", None))
+
+    send.assert_not_called()
+
+
+def test_rabbitmq_publish_reports_messages_after_the_failure_as_unsent():
+    publisher = _publisher()
+    with (
+        patch.object(
+            queue_sender, "_send_to_rabbitmq", side_effect=[None, ConnectionError("gone")]
+        ),
+        pytest.raises(queue_sender.PartialPublishError) as raised,
+    ):
+        publisher.send([b"0", b"1", b"2"], ("k", "ex"))
+
+    assert raised.value.unsent == [1, 2]
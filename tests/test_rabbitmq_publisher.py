@@ -0,0 +1,137 @@
+import threading
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pika
+import pytest
+from pika.exceptions import StreamLostError
+
+from app.rabbitmq_publisher import (
+    ConfirmingPublisher,
+    PublishNotConfirmedError,
+    RabbitMQPublisher,
+)
+
+
+def _publisher():
+    connections = []
+
+    def connect(parameters):
+        connection = MagicMock(is_open=True)
+        connection.channel.return_value.is_open = True
+        connections.append(connection)
+        return connection
+
+    return RabbitMQPublisher(MagicMock()), connections, connect
+
+
+def test_publisher_reuses_connection_across_publishes():
+    publisher, connections, connect = _publisher()
+    with patch("app.rabbitmq_publisher.pika.BlockingConnection", side_effect=connect):
+        for i in range(3):
+            publisher.publish("ex", "key", b"%d" % i)
+
+    assert len(connections) == 1
+    channel = connections[0].channel.return_value
+    assert channel.basic_publish.call_count == 3
+    connections[0].process_data_events.assert_called_with(time_limit=0)
+
+
+def test_publisher_reconnects_after_lost_connection():
+    publisher, connections, connect = _publisher()
+    with patch("app.rabbitmq_publisher.pika.BlockingConnection", side_effect=connect):
+        publisher.publish("ex", "key", b"1")
+        connections[0].channel.return_value.basic_publish.side_effect = StreamLostError("gone")
+        publisher.publish("ex", "key", b"2")
+
+    assert len(connections) == 2
+    connections[0].close.assert_called_once()
+    connections[1].channel.return_value.basic_publish.assert_called_once_with(
+        "ex", "key", b"2", None
+    )
+
+
+def test_publisher_opens_one_connection_per_thread():
+    publisher, connections, connect = _publisher()
+    with patch("app.rabbitmq_publisher.pika.BlockingConnection", side_effect=connect):
+        threads = [
+            threading.Thread(target=publisher.publish, args=("ex", "key", b"x")) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        publisher.close()
+
+    assert len(connections) == 2
+    assert all(c.close.called for c in connections)
+
+
+def _confirming_publisher():
+    publisher = ConfirmingPublisher(MagicMock(), window=2, timeout_sec=0.1)
+    publisher._channel = MagicMock()
+    return publisher
+
+
+def _confirm(method, tag, multiple=False):
+    return MagicMock(method=method(delivery_tag=tag, multiple=multiple))
+
+
+def test_confirming_publisher_resolves_futures_from_acks_and_nacks():
+    publisher = _confirming_publisher()
+    futures = [Future() for _ in range(3)]
+    for future in futures:
+        publisher._publish("ex", "key", b"x", None, future)
+
+    publisher._on_confirm(_confirm(pika.spec.Basic.Ack, 2, multiple=True))
+    publisher._on_confirm(_confirm(pika.spec.Basic.Nack, 3))
+
+    assert futures[0].result() is None and futures[1].result() is None
+    with pytest.raises(PublishNotConfirmedError):
+        futures[2].result()
+    assert publisher._channel.basic_publish.call_count == 3
+
+
+def test_confirming_publisher_fails_pending_on_channel_close():
+    publisher = _confirming_publisher()
+    future = Future()
+    publisher._publish("ex", "key", b"x", None, future)
+
+    publisher._on_channel_closed(MagicMock(), Exception("closed"))
+
+    with pytest.raises(PublishNotConfirmedError):
+        future.result()
+    late = Future()
+    publisher._publish("ex", "key", b"y", None, late)
+    assert isinstance(late.exception(), PublishNotConfirmedError)
+
+
+def test_confirming_publisher_blocks_when_window_is_full():
+    publisher = _confirming_publisher()
+    connection = publisher._connection = MagicMock()
+    with patch.object(publisher, "_ensure_connected", return_value=connection):
+        first = publisher.publish("ex", "key", b"1")
+        publisher.publish("ex", "key", b"2")
+        with pytest.raises(PublishNotConfirmedError):
+            publisher.publish("ex", "key", b"3")
+        first.set_result(None)
+        publisher.publish("ex", "key", b"3")
+
+    assert connection.ioloop.add_callback_threadsafe.call_count == 3
+
+
+def test_confirming_publisher_fails_scheduled_publishes_when_connection_drops():
+    publisher = _confirming_publisher()
+    connection = publisher._connection = MagicMock()
+    with patch.object(publisher, "_ensure_connected", return_value=connection):
+        # The I/O loop never runs the scheduled publishes before it stops.
+        queued = [publisher.publish("ex", "key", b"%d" % i) for i in range(2)]
+        with patch("app.rabbitmq_publisher.pika.SelectConnection"):
+            publisher._run()
+
+        for future in queued:
+            assert isinstance(future.exception(timeout=0), PublishNotConfirmedError)
+        publisher._connection, publisher._channel = connection, MagicMock()
+        publisher.publish("ex", "key", b"2")
+
+    assert connection.ioloop.add_callback_threadsafe.call_count == 3
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.processor import analyze, compute_ichimoku_arrays
+from app.schema import SchemaError, decode_request
+
+
+def _bars(n):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return [{"High": c + 1, "Low": c - 1, "Close": c, "Volume": 10} for c in close]
+
+
+def test_decode_request_from_bars():
+    request = decode_request({"symbol": "AAPL", "timestamp": "t", "data": _bars(3)})
+    assert request.symbol == "AAPL"
+    assert request.high.dtype == np.float64
+    assert len(request) == 3
+
+
+def test_decode_request_from_columns():
+    message = {
+        "symbol": "AAPL",
+        "timestamp": "t",
+        "data": {"High": [2], "Low": [1], "Close": [1.5]},
+    }
+    request = decode_request(message)
+    assert request.close.tolist() == [1.5]
+    assert request.bars is None
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        [],
+        {"timestamp": "t", "data": []},
+        {"symbol": "AAPL", "data": []},
+        {"symbol": "AAPL", "timestamp": "t", "data": [{"High": 1, "Low": 1}]},
+        {"symbol": "AAPL", "timestamp": "t", "data": [{"High": "x", "Low": 1, "Close": 1}]},
+        {"symbol": "AAPL", "timestamp": "t", "data": {"High": [1], "Low": [1, 2], "Close": [1]}},
+    ],
+)
+def test_decode_request_rejects_invalid_messages(message):
+    with pytest.raises(SchemaError):
+        decode_request(message)
+
+
+def test_array_indicators_match_pandas_reference():
+    df = pd.DataFrame(_bars(120))
+    high, low, close = df["High"], df["Low"], df["Close"]
+    tenkan = (high.rolling(9).max() + low.rolling(9).min()) / 2
+    kijun = (high.rolling(26).max() + low.rolling(26).min()) / 2
+    expected = {
+        "tenkan_sen": tenkan,
+        "kijun_sen": kijun,
+        "senkou_span_a": ((tenkan + kijun) / 2).shift(26),
+        "senkou_span_b": ((high.rolling(52).max() + low.rolling(52).min()) / 2).shift(26),
+        "chikou_span": close.shift(-26),
+    }
+
+    result = compute_ichimoku_arrays(high.to_numpy(), low.to_numpy(), close.to_numpy())
+    for name, series in expected.items():
+        np.testing.assert_allclose(result[name], series.to_numpy(), equal_nan=True)
+
+
+def test_analyze_keeps_bar_fields_and_reports_invalid_input():
+    result = analyze({"symbol": "AAPL", "timestamp": "t", "data": _bars(30)})
+    assert result["analysis"][0]["Volume"] == 10
+    assert "tenkan_sen" in result["analysis"][-1]
+
+    assert "error" in analyze({"symbol": "AAPL", "timestamp": "t", "data": [{"Close": 1}]})
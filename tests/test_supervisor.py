@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import supervisor
+from app.supervisor import Supervisor
+
+
+def _run(sup):
+    with (
+        patch.object(supervisor.signal, "signal"),
+        patch.object(supervisor, "start_metrics_server"),
+        patch.object(supervisor, "healthcheck") as health,
+    ):
+        return sup.run(), health
+
+
+def test_supervisor_exits_when_all_children_finish():
+    exit_code, health = _run(Supervisor(lambda: None, processes=2))
+
+    assert exit_code == 0
+    health.set_ready.assert_called_once()
+    health.set_unhealthy.assert_not_called()
+
+
+def test_supervisor_restarts_crashed_child(tmp_path):
+    marker = tmp_path / "crashed"
+
+    def crash_once():
+        if not marker.exists():
+            marker.touch()
+            os._exit(3)
+
+    restarts = supervisor.consumer_restarts_total._value.get()
+    exit_code, _ = _run(Supervisor(crash_once, processes=1))
+
+    assert marker.exists()
+    assert supervisor.consumer_restarts_total._value.get() == restarts + 1
+    assert exit_code == 0
+
+
+def _crash_then_run(marker, crashes):
+    def target():
+        count = len(marker.read_text()) if marker.exists() else 0
+        if count < crashes:
+            marker.write_text("x" * (count + 1))
+            os._exit(3)
+        time.sleep(60)
+
+    return target
+
+
+def _stop_after(sup, seconds):
+    timer = threading.Timer(seconds, sup._stopping.set)
+    timer.start()
+    return timer
+
+
+def test_supervisor_restores_health_after_child_recovers(tmp_path):
+    sup = Supervisor(_crash_then_run(tmp_path / "crashes", 2), 1, max_consecutive_failures=2)
+    with (
+        patch.object(supervisor, "MAX_RESTART_BACKOFF_SEC", 0),
+        patch.object(supervisor, "STABLE_RUN_SEC", 1.5),
+    ):
+        _stop_after(sup, 5.5)
+        exit_code, health = _run(sup)
+
+    health.set_unhealthy.assert_called_once()
+    health.set_healthy.assert_called_once()
+    assert exit_code == 0
+
+
+def test_supervisor_clean_shutdown_after_a_crash_exits_zero(tmp_path):
+    sup = Supervisor(_crash_then_run(tmp_path / "crashes", 1), 1)
+    with patch.object(supervisor, "MAX_RESTART_BACKOFF_SEC", 0):
+        _stop_after(sup, 2.5)
+        exit_code, health = _run(sup)
+
+    health.set_unhealthy.assert_not_called()
+    assert exit_code == 0
+
+
+def test_supervisor_exits_non_zero_while_child_is_crash_looping(tmp_path):
+    sup = Supervisor(_crash_then_run(tmp_path / "crashes", 100), 1, max_consecutive_failures=2)
+    with patch.object(supervisor, "MAX_RESTART_BACKOFF_SEC", 0):
+        _stop_after(sup, 2.5)
+        exit_code, health = _run(sup)
+
+    health.set_unhealthy.assert_called()
+    assert exit_code == 1
+
+
+def test_supervisor_rejects_non_positive_process_count():
+    with pytest.raises(ValueError):
+        Supervisor(lambda: None, processes=0)
@@ -0,0 +1,85 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.visibility_heartbeat import VisibilityHeartbeat
+
+
+def test_heartbeat_extends_tracked_handles_in_batches():
+    sqs = MagicMock()
+    sqs.change_message_visibility_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": e["Id"]} for e in Entries]
+    }
+    heartbeat = VisibilityHeartbeat(sqs, "queue-url", visibility_timeout=60, interval_sec=20)
+    for i in range(12):
+        heartbeat.track(f"h{i}")
+    heartbeat.untrack("h0")
+
+    assert heartbeat.beat() == 11
+    batches = [c.kwargs["Entries"] for c in sqs.change_message_visibility_batch.call_args_list]
+    assert [len(b) for b in batches] == [10, 1]
+    assert all(e["VisibilityTimeout"] == 60 for b in batches for e in b)
+    assert "h0" not in {e["ReceiptHandle"] for b in batches for e in b}
+
+
+def test_heartbeat_forgets_handles_sqs_rejects():
+    sqs = MagicMock()
+    sqs.change_message_visibility_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "ReceiptHandleIsInvalid"}],
+    }
+    heartbeat = VisibilityHeartbeat(sqs, "queue-url", visibility_timeout=60, interval_sec=20)
+    heartbeat.track("a")
+    heartbeat.track("b")
+    rejected = sqs.change_message_visibility_batch.return_value["Failed"][0]
+    heartbeat.beat()
+
+    entries = sqs.change_message_visibility_batch.call_args.kwargs["Entries"]
+    assert len(heartbeat) == 1
+    assert entries[int(rejected["Id"])]["ReceiptHandle"] not in heartbeat._handles
+
+
+def test_untrack_waits_for_in_flight_beat():
+    untrackers = []
+
+    def extend(QueueUrl, Entries):
+        untracker = threading.Thread(target=heartbeat.untrack, args=(Entries[0]["ReceiptHandle"],))
+        untracker.start()
+        untracker.join(timeout=0.1)
+        untrackers.append(untracker)
+        assert untracker.is_alive()
+        return {"Successful": [{"Id": e["Id"]} for e in Entries]}
+
+    sqs = MagicMock()
+    sqs.change_message_visibility_batch.side_effect = extend
+    heartbeat = VisibilityHeartbeat(sqs, "queue-url", visibility_timeout=60, interval_sec=20)
+    heartbeat.track("a")
+
+    assert heartbeat.beat() == 1
+    untrackers[0].join(timeout=5)
+    assert len(heartbeat) == 0
+
+
+def test_heartbeat_skips_handles_settled_after_snapshot():
+    settled = []
+
+    def extend(QueueUrl, Entries):
+        if not settled:
+            settled.extend(heartbeat._handles - {e["ReceiptHandle"] for e in Entries})
+            heartbeat._discard(settled)
+        return {"Successful": [{"Id": e["Id"]} for e in Entries]}
+
+    sqs = MagicMock()
+    sqs.change_message_visibility_batch.side_effect = extend
+    heartbeat = VisibilityHeartbeat(sqs, "queue-url", visibility_timeout=60, interval_sec=20)
+    for i in range(12):
+        heartbeat.track(f"h{i}")
+
+    assert heartbeat.beat() == 10
+    sqs.change_message_visibility_batch.assert_called_once()
+
+
+def test_heartbeat_requires_interval_below_timeout():
+    with pytest.raises(ValueError):
+        VisibilityHeartbeat(MagicMock(), "queue-url", visibility_timeout=30, interval_sec=30)
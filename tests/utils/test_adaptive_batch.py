@@ -0,0 +1,31 @@
+import pytest
+
+from app.utils.adaptive_batch import AdaptiveBatchController
+
+
+def test_grows_after_full_batches_within_target():
+    controller = AdaptiveBatchController(4, 1, 6, target_latency_sec=1.0)
+    assert controller.observe(4, 0.1) == 5
+    assert controller.observe(5, 0.1) == 6
+    assert controller.observe(6, 0.1) == 6
+
+
+def test_partial_batches_do_not_grow():
+    controller = AdaptiveBatchController(4, 1, 10, target_latency_sec=1.0)
+    assert controller.observe(2, 0.01) == 4
+
+
+def test_halves_when_target_is_breached():
+    controller = AdaptiveBatchController(8, 3, 10, target_latency_sec=1.0)
+    assert controller.observe(8, 2.0) == 4
+    assert controller.observe(4, 2.0) == 3
+
+
+def test_does_not_grow_past_predicted_latency():
+    controller = AdaptiveBatchController(4, 1, 10, target_latency_sec=1.0)
+    assert controller.observe(4, 0.9) == 4
+
+
+def test_rejects_invalid_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveBatchController(1, 5, 2, target_latency_sec=1.0)
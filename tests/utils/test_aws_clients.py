@@ -0,0 +1,38 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.utils import aws_clients
+
+
+def test_get_client_caches_per_service_region_and_endpoint():
+    aws_clients.clear_clients()
+    session = MagicMock()
+    session.client.side_effect = lambda *args, **kwargs: MagicMock()
+    with patch.object(aws_clients.boto3.session, "Session", return_value=session):
+        sqs = aws_clients.get_client("sqs", "us-east-1")
+        assert aws_clients.get_client("sqs", "us-east-1") is sqs
+        assert aws_clients.get_client("sqs", "eu-west-1") is not sqs
+        assert aws_clients.get_client("sqs", "us-east-1", "http://localhost:4566") is not sqs
+        assert aws_clients.get_client("s3", "us-east-1") is not sqs
+
+    assert session.client.call_count == 4
+    config = session.client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 50
+    aws_clients.clear_clients()
+
+
+def test_get_client_builds_once_under_concurrency():
+    aws_clients.clear_clients()
+    session = MagicMock()
+    with patch.object(aws_clients.boto3.session, "Session", return_value=session):
+        threads = [
+            threading.Thread(target=aws_clients.get_client, args=("sqs", "us-east-1"))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    session.client.assert_called_once()
+    aws_clients.clear_clients()
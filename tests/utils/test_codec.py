@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils import codec
+
+
+@pytest.fixture(params=sorted(codec._BACKENDS))
+def backend(request, monkeypatch):
+    dumps, loads = codec._BACKENDS[request.param]
+    monkeypatch.setattr(codec, "_dumps", dumps)
+    monkeypatch.setattr(codec, "_loads", loads)
+    return request.param
+
+
+def test_round_trip(backend):
+    payload = {"symbol": "AAPL", "close": [1.5, 2.0], "name": "Société"}
+    assert codec.loads(codec.dumps(payload)) == payload
+    assert codec.loads(codec.dumps_str(payload, indent=True)) == payload
+
+
+def test_dumps_is_compact(backend):
+    assert (
+        codec.dumps({"symbol": "AAPL", "close": [1.5, 2]}) == b'{"symbol":"AAPL","close":[1.5,2]}'
+    )
+
+
+def test_nan_and_numpy_encode_consistently(backend):
+    payload = {
+        "tenkan_sen": float("nan"),
+        "kijun_sen": np.float64(math.inf),
+        "series": np.array([1.0, np.nan]),
+        "count": np.int64(3),
+    }
+    assert codec.loads(codec.dumps(payload)) == {
+        "tenkan_sen": None,
+        "kijun_sen": None,
+        "series": [1.0, None],
+        "count": 3,
+    }
+
+
+def test_loads_accepts_stdlib_nan_tokens(backend):
+    assert math.isnan(codec.loads('{"value": NaN}')["value"])
+
+
+def test_encoded_batch_encodes_once_and_shares_bytes(backend):
+    messages = [{"symbol": "AAPL", "close": 1.5}, {"symbol": "MSFT", "close": float("nan")}]
+    batch = codec.EncodedBatch(messages)
+
+    assert batch.bodies() is batch.bodies()
+    assert codec.loads(batch.array()) == codec.loads(codec.dumps(messages))
+    assert [codec.loads(text) for text in batch.pretty()] == [
+        codec.loads(b) for b in batch.bodies()
+    ]
@@ -0,0 +1,48 @@
+import pytest
+
+from app.utils import compression
+
+
+@pytest.fixture
+def gzip_enabled(monkeypatch):
+    monkeypatch.setattr(compression, "ENCODING", "gzip")
+    monkeypatch.setattr(compression, "MIN_BYTES", 100)
+
+
+def test_small_bodies_are_not_compressed(gzip_enabled):
+    assert compression.compress(b"{}") == (b"{}", None)
+
+
+def test_gzip_round_trip(gzip_enabled):
+    body = b'{"close": [' + b"101.5, " * 200 + b"1]}"
+    compressed, encoding = compression.compress(body)
+    assert encoding == "gzip"
+    assert len(compressed) < len(body)
+    assert compression.decompress(compressed, encoding) == body
+
+
+def test_text_round_trip_with_sqs_attributes(gzip_enabled):
+    body = b'{"symbol": "AAPL", "data": [' + b'{"Close": 1.0}, ' * 100 + b"{}]}"
+    text, encoding = compression.compress_text(body)
+    message = {"Body": text, "MessageAttributes": compression.sqs_encoding_attributes(encoding)}
+
+    assert compression.sqs_encoding(message) == "gzip"
+    assert compression.decompress_text(message["Body"], compression.sqs_encoding(message)) == body
+
+
+def test_uncompressed_messages_pass_through():
+    assert compression.decompress(b"{}", None) == b"{}"
+    assert compression.decompress_text("{}", "identity") == b"{}"
+    assert compression.sqs_encoding({"Body": "{}"}) is None
+
+
+def test_charset_and_unknown_labels_are_read_as_uncompressed():
+    assert compression.decompress(b"{}", "utf-8") == b"{}"
+    assert compression.decompress(b"{}", "br") == b"{}"
+    assert compression.decompress_text("{}", "UTF-8") == b"{}"
+
+
+def test_zstd_without_zstandard_is_rejected(monkeypatch):
+    monkeypatch.setattr(compression, "HAS_ZSTANDARD", False)
+    with pytest.raises(ValueError):
+        compression.decompress(b"x", "zstd")
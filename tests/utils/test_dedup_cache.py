@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from app.utils.dedup_cache import DedupCache
+
+
+def test_dedup_cache_remembers_processed_keys():
+    cache = DedupCache(max_entries=10, ttl_sec=60)
+    assert not cache.seen("a")
+    cache.add("a")
+    assert cache.seen("a")
+
+
+def test_dedup_cache_evicts_least_recently_used():
+    cache = DedupCache(max_entries=2, ttl_sec=60)
+    cache.add("a")
+    cache.add("b")
+    cache.add("c")
+    assert not cache.seen("a")
+    assert cache.seen("b") and cache.seen("c")
+
+
+def test_dedup_cache_expires_keys():
+    cache = DedupCache(max_entries=10, ttl_sec=0.01)
+    cache.add("a")
+    time.sleep(0.02)
+    assert not cache.seen("a")
+
+
+def test_dedup_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    cache = DedupCache(max_entries=10, ttl_sec=60, path=path)
+    cache.add("a")
+    cache.close()
+
+    reloaded = DedupCache(max_entries=10, ttl_sec=60, path=path)
+    assert reloaded.seen("a")
+    reloaded.close()
+
+
+def test_dedup_cache_commits_keys_on_flush(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    cache = DedupCache(max_entries=10, ttl_sec=60, path=path)
+    reader = sqlite3.connect(path)
+    cache.add("a")
+    cache.add("b")
+    assert reader.execute("SELECT COUNT(*) FROM processed").fetchone() == (0,)
+
+    cache.flush()
+    assert reader.execute("SELECT COUNT(*) FROM processed").fetchone() == (2,)
+    reader.close()
+    cache.close()
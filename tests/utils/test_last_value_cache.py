@@ -0,0 +1,74 @@
+import time
+
+from app.utils.last_value_cache import LastValueCache
+
+
+def _publish(cache, payload, destination=("q", "ex")):
+    kept, _, updates = cache.filter(payload, [str(m).encode() for m in payload], destination)
+    cache.record(updates)
+    return kept
+
+
+def test_last_value_cache_suppresses_unchanged_results():
+    cache = LastValueCache(heartbeat_sec=60, max_entries=10)
+    result = {"symbol": "AAPL", "timeframe": "1d", "tenkan": 1.0}
+    assert _publish(cache, [result]) == [result]
+    assert _publish(cache, [dict(result)]) == []
+
+    changed = {**result, "tenkan": 2.0}
+    other_timeframe = {**result, "timeframe": "1h"}
+    assert _publish(cache, [changed, other_timeframe]) == [changed, other_timeframe]
+
+
+def test_last_value_cache_ignores_timestamp_and_older_bars():
+    cache = LastValueCache(heartbeat_sec=60, max_entries=10)
+    first = {
+        "symbol": "AAPL",
+        "timeframe": "1d",
+        "timestamp": "2026-10-19T10:00:00",
+        "metadata": {"run": 1},
+        "analysis": [{"tenkan": 1.0}, {"tenkan": 2.0, "timestamp": "2026-10-19T10:00:00"}],
+    }
+    rerun = {
+        **first,
+        "timestamp": "2026-10-19T10:05:00",
+        "metadata": {"run": 2},
+        "analysis": [{"tenkan": 0.5}, {"tenkan": 2.0, "timestamp": "2026-10-19T10:05:00"}],
+    }
+    assert _publish(cache, [first]) == [first]
+    assert _publish(cache, [rerun]) == []
+
+    moved = {**rerun, "analysis": [{"tenkan": 2.0}, {"tenkan": 3.0}]}
+    assert _publish(cache, [moved]) == [moved]
+
+
+def test_last_value_cache_republishes_after_heartbeat():
+    cache = LastValueCache(heartbeat_sec=0.01, max_entries=10)
+    result = {"symbol": "AAPL", "timeframe": "1d"}
+    _publish(cache, [result])
+    time.sleep(0.02)
+    assert _publish(cache, [result]) == [result]
+
+
+def test_last_value_cache_only_remembers_recorded_results():
+    cache = LastValueCache(heartbeat_sec=60, max_entries=10)
+    result = {"symbol": "AAPL", "timeframe": "1d"}
+    cache.filter([result], [b"1"], "q")  # publish failed, nothing recorded
+    assert cache.filter([result], [b"1"], "q")[0] == [result]
+
+
+def test_last_value_cache_always_publishes_results_without_symbol():
+    cache = LastValueCache(heartbeat_sec=60, max_entries=10)
+    _publish(cache, [{"seq": 1}])
+    assert _publish(cache, [{"seq": 1}]) == [{"seq": 1}]
+    assert len(cache) == 0
+
+
+def test_last_value_cache_always_publishes_results_with_non_scalar_keys():
+    cache = LastValueCache(heartbeat_sec=60, max_entries=10)
+    valid = {"symbol": "AAPL", "timeframe": "1d", "tenkan": 1.0}
+    odd = [{"symbol": "AAPL", "timeframe": {}}, {"symbol": ["AAPL"], "timeframe": "1d"}]
+
+    assert _publish(cache, [valid, *odd]) == [valid, *odd]
+    assert _publish(cache, [dict(valid), *odd]) == odd
+    assert len(cache) == 1
@@ -1,6 +1,12 @@
 import unittest
+from unittest.mock import patch
 
+from app.outbox import PartialPublishError
 from app.output_handler import OutputDispatcher
+from app.queue_handler import MessageOutcome
+from app.queue_sender import ConfirmFailedError
+from app.rabbitmq_publisher import PublishNotConfirmedError
+from app.utils.codec import EncodedBatch
 from app.utils.types import OutputMode
 
 
@@ -14,6 +20,81 @@ class TestOutputDispatcherBasic(unittest.TestCase):
         method = dispatcher._get_dispatch_method(OutputMode.LOG)
         self.assertTrue(callable(method))
 
+    def test_unconfirmed_queue_output_retries_batch(self):
+        dispatcher = OutputDispatcher()
+        dispatcher.output_modes = ["QUEUE"]
+        with (
+            patch(
+                "app.output_handler.publish_to_queue",
+                side_effect=PublishNotConfirmedError("nacked"),
+            ),
+            patch("app.output_handler.config_shared.get_paper_trading_enabled", return_value=False),
+        ):
+            with patch("tenacity.nap.time.sleep"):
+                outcomes = dispatcher.send([{"a": 1}, {"b": 2}])
+        self.assertEqual(outcomes, [MessageOutcome.RETRY, MessageOutcome.RETRY])
+
+    def test_unconfirmed_queue_output_is_not_published_again(self):
+        dispatcher = OutputDispatcher()
+        dispatcher.output_modes = ["QUEUE"]
+        error = ConfirmFailedError("1 of 2 message(s) not confirmed", [1])
+        with (
+            patch("app.output_handler.publish_to_queue", side_effect=error) as publish,
+            patch("app.output_handler.config_shared.get_paper_trading_enabled", return_value=False),
+        ):
+            outcomes = dispatcher.send([{"a": 1}, {"b": 2}])
+        publish.assert_called_once()
+        self.assertEqual(outcomes, [MessageOutcome.SUCCESS, MessageOutcome.RETRY])
+
+    def test_failed_queue_output_retries_batch(self):
+        dispatcher = OutputDispatcher()
+        dispatcher.output_modes = ["QUEUE"]
+        with (
+            patch("app.output_handler.publish_to_queue", side_effect=ConnectionError("down")),
+            patch("app.output_handler.config_shared.get_paper_trading_enabled", return_value=False),
+        ):
+            with patch("tenacity.nap.time.sleep"):
+                outcomes = dispatcher.send([{"a": 1}, {"b": 2}])
+        self.assertEqual(outcomes, [MessageOutcome.RETRY, MessageOutcome.RETRY])
+
+    def test_partly_published_output_settles_each_message(self):
+        dispatcher = OutputDispatcher()
+        dispatcher.output_modes = ["QUEUE"]
+        error = PartialPublishError("partly failed", unsent=[1], rejected=[2])
+        with (
+            patch("app.output_handler.publish_to_queue", side_effect=error),
+            patch("app.output_handler.config_shared.get_paper_trading_enabled", return_value=False),
+        ):
+            with patch("tenacity.nap.time.sleep"):
+                outcomes = dispatcher.send([{"a": 1}, {"b": 2}, {"c": 3}])
+        self.assertEqual(
+            outcomes,
+            [MessageOutcome.SUCCESS, MessageOutcome.RETRY, MessageOutcome.DEAD_LETTER],
+        )
+
+    def test_malformed_input_is_dead_lettered(self):
+        dispatcher = OutputDispatcher()
+        dispatcher.output_modes = ["QUEUE"]
+        with (
+            patch("app.output_handler.publish_to_queue") as publish,
+            patch("app.output_handler.config_shared.get_paper_trading_enabled", return_value=False),
+        ):
+            outcomes = dispatcher.send([{"a": 1}, "not a dict", {"b": object()}])
+        self.assertEqual(
+            outcomes,
+            [MessageOutcome.SUCCESS, MessageOutcome.DEAD_LETTER, MessageOutcome.DEAD_LETTER],
+        )
+        self.assertEqual(publish.call_args.args[0], [{"a": 1}])
+
+    def test_log_output_redacts_sensitive_fields(self):
+        dispatcher = OutputDispatcher()
+        batch = EncodedBatch([{"symbol": "AAPL"}, {"api_key": "secret-value"}])
+        with patch("app.output_handler.logger") as logger:
+            dispatcher._output_to_log(batch)
+        logged = [c.args[1] for c in logger.info.call_args_list]
+        self.assertEqual(logged[0], batch.pretty()[0])
+        self.assertNotIn("secret-value", logged[1])
+
 
 if __name__ == "__main__":
     unittest.main()
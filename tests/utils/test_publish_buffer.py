@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.publish_buffer import PublishBuffer
+
+
+def _recorder():
+    calls = []
+    lock = threading.Lock()
+
+    def publish(messages, destination):
+        with lock:
+            calls.append((destination, list(messages)))
+
+    return calls, publish
+
+
+def test_publish_buffer_flushes_after_linger():
+    calls, publish = _recorder()
+    buffer = PublishBuffer(
+        publish, max_messages=100, max_bytes=10_000, linger_sec=0.02, capacity=100
+    )
+    buffer.submit([1, 2], "q", [1, 1])
+
+    deadline = time.monotonic() + 1
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    buffer.close()
+
+    assert calls == [("q", [1, 2])]
+
+
+def test_publish_buffer_splits_on_count_and_bytes():
+    calls, publish = _recorder()
+    buffer = PublishBuffer(publish, max_messages=3, max_bytes=9, linger_sec=60, capacity=100)
+    buffer.submit(list(range(7)), "q", [1, 1, 1, 1, 1, 8, 1])
+
+    assert buffer.flush(timeout=1)
+    buffer.close()
+
+    assert [m for _, m in calls] == [[0, 1, 2], [3, 4], [5, 6]]
+
+
+def test_publish_buffer_keeps_order_across_destinations():
+    calls, publish = _recorder()
+    buffer = PublishBuffer(publish, max_messages=10, max_bytes=100, linger_sec=60, capacity=100)
+    buffer.submit([1, 2], "a", [1, 1])
+    buffer.submit([3], "b", [1])
+    buffer.submit([4], "a", [1])
+
+    assert buffer.flush(timeout=1)
+    buffer.close()
+
+    assert calls == [("a", [1, 2]), ("b", [3]), ("a", [4])]
+
+
+def test_publish_buffer_drops_messages_that_keep_failing_to_publish():
+    attempts = []
+
+    def publish(messages, destination):
+        attempts.append(list(messages))
+        raise RuntimeError("broker down")
+
+    buffer = PublishBuffer(
+        publish,
+        max_messages=10,
+        max_bytes=100,
+        linger_sec=60,
+        capacity=100,
+        attempts=3,
+        retry_backoff_sec=0,
+    )
+    buffer.submit([1, 2], "q", [1, 1])
+
+    assert buffer.flush(timeout=1)
+    assert len(buffer) == 0
+    buffer.close()
+
+    assert attempts == [[1, 2]] * 3
+
+
+def test_publish_buffer_retries_failed_publish_with_backoff():
+    calls, record = _recorder()
+    failures = [RuntimeError("broker down")]
+
+    def publish(messages, destination):
+        if failures:
+            raise failures.pop()
+        record(messages, destination)
+
+    buffer = PublishBuffer(
+        publish,
+        max_messages=10,
+        max_bytes=100,
+        linger_sec=60,
+        capacity=100,
+        attempts=2,
+        retry_backoff_sec=0.01,
+    )
+    buffer.submit([1, 2], "q", [1, 1])
+
+    assert buffer.flush(timeout=1)
+    buffer.close()
+
+    assert calls == [("q", [1, 2])]
+
+
+def test_publish_buffer_spills_failed_publish_without_retrying():
+    attempts = []
+    spilled, spill = _recorder()
+
+    def publish(messages, destination):
+        attempts.append(list(messages))
+        raise RuntimeError("broker down")
+
+    buffer = PublishBuffer(
+        publish,
+        max_messages=10,
+        max_bytes=100,
+        linger_sec=60,
+        capacity=100,
+        attempts=3,
+        retry_backoff_sec=60,
+        spill=spill,
+    )
+    buffer.submit([1, 2], "q", [1, 1])
+
+    assert buffer.flush(timeout=1)
+    buffer.close()
+
+    assert attempts == [[1, 2]]
+    assert spilled == [("q", [1, 2])]
+
+
+def test_publish_buffer_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        PublishBuffer(lambda m, d: None, max_messages=0, max_bytes=1, linger_sec=0, capacity=1)
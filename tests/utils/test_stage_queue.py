@@ -0,0 +1,26 @@
+import pytest
+
+from app.utils.stage_queue import StageQueue
+
+
+def test_stage_queue_fifo_batches():
+    stage = StageQueue("test_fifo", 5)
+    for i in range(4):
+        assert stage.put(i)
+    assert stage.get_batch(3, timeout=0) == [0, 1, 2]
+    assert stage.get_batch(3, timeout=0) == [3]
+    assert stage.get_batch(3, timeout=0) == []
+
+
+def test_stage_queue_put_times_out_when_full():
+    stage = StageQueue("test_full", 2)
+    assert stage.put("a")
+    assert stage.put("b")
+    assert stage.free_slots() == 0
+    assert stage.put("c", timeout=0.01) is False
+    assert stage.wait_for_capacity(timeout=0.01) == 0
+
+
+def test_stage_queue_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        StageQueue("test_invalid", 0)